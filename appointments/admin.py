@@ -1,5 +1,33 @@
 from django.contrib import admin
-from .models import Appointment
+from .models import Appointment, AppointmentNotification, AppointmentTransition, WaitlistEntry
 
 # Register your models here.
 admin.site.register(Appointment)
+
+@admin.register(AppointmentNotification)
+class AppointmentNotificationAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'subject', 'created_at', 'sent_at')
+    list_filter = ('sent_at',)
+    search_fields = ('patient__username', 'subject')
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'doctor', 'earliest_date', 'latest_date', 'status', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('patient__username', 'doctor__username')
+
+@admin.register(AppointmentTransition)
+class AppointmentTransitionAdmin(admin.ModelAdmin):
+    list_display = ('appointment', 'doctor', 'from_status', 'to_status', 'duration', 'created_at')
+    list_filter = ('to_status',)
+    search_fields = ('doctor__username',)
+
+    # Append-only: rows are written with the status changes they record
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,77 @@
+"""
+Batch confirm or decline of a doctor's pending appointments.
+
+The whole batch runs in one transaction with a fixed number of queries
+however many appointments it covers: one SELECT, one bulk_update, the
+status transition log, one DoctorPatient bulk_create(ignore_conflicts) for
+confirmations, and for declines one slot calendar re-sync over the affected
+dates. bulk_update bypasses Appointment.save() and the post_save handlers,
+so transitions, the slot cache, calendar and waitlist are brought up to date
+here instead.
+"""
+
+from typing import Dict, Iterable
+
+from django.db import transaction
+
+from doctors.models import DoctorPatient
+from doctors.slot_cache import get_slot_cache
+from doctors.slot_calendar import refresh_doctor_days
+
+from .models import Appointment
+from .transitions import record_transitions
+from .waitlist import offer_slots
+
+CONFIRM = 'confirm'
+DECLINE = 'decline'
+
+# Per-item outcomes returned by update_statuses
+CONFIRMED = 'confirmed'
+DECLINED = 'declined'
+NOT_FOUND = 'not_found'
+NOT_PENDING = 'not_pending'
+
+STATUS_BY_ACTION = {CONFIRM: Appointment.CONFIRMED, DECLINE: Appointment.CANCELLED}
+OUTCOME_BY_ACTION = {CONFIRM: CONFIRMED, DECLINE: DECLINED}
+
+
+def update_statuses(doctor_user_id: int, appointment_ids: Iterable[int], action: str,
+                    message: str = '') -> Dict[int, str]:
+    """
+    Confirm or decline the doctor's pending appointments among
+    ``appointment_ids``. Returns an outcome per requested id.
+    """
+    ids = set(appointment_ids)
+    with transaction.atomic():
+        appointments = list(
+            Appointment.objects.select_for_update().filter(doctor_id=doctor_user_id, pk__in=ids)
+        )
+        outcomes = {pk: NOT_FOUND for pk in ids}
+        changed = []
+        for appointment in appointments:
+            if appointment.status != Appointment.PENDING:
+                outcomes[appointment.pk] = NOT_PENDING
+                continue
+            appointment.status = STATUS_BY_ACTION[action]
+            if action == DECLINE and message:
+                appointment.doctor_message = message
+            outcomes[appointment.pk] = OUTCOME_BY_ACTION[action]
+            changed.append(appointment)
+        if not changed:
+            return outcomes
+
+        Appointment.objects.bulk_update(changed, ['status', 'doctor_message'])
+        record_transitions(changed, {appointment.pk: Appointment.PENDING for appointment in changed})
+        if action == CONFIRM:
+            DoctorPatient.objects.bulk_create(
+                [DoctorPatient(doctor_id=doctor_user_id, patient_id=patient_id)
+                 for patient_id in {appointment.patient_id for appointment in changed}],
+                ignore_conflicts=True,
+            )
+        else:
+            dates = {appointment.date for appointment in changed}
+            get_slot_cache().invalidate(doctor_user_id, dates)
+            refresh_doctor_days(doctor_user_id, dates)
+            slots = [(appointment.date, appointment.time) for appointment in changed]
+            transaction.on_commit(lambda: offer_slots(doctor_user_id, slots))
+    return outcomes
@@ -0,0 +1,109 @@
+"""
+Atomic appointment booking.
+
+A booking claims its row in the materialized slot calendar and inserts the
+appointment in one transaction. The unique_active_appointment_slot
+constraint backs this up at the database level, so two concurrent bookings
+of the same doctor, date and time can never both succeed.
+"""
+
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from doctors.availability import BOOKED, CLOSED, NOT_A_SLOT, OUTSIDE_SCHEDULE, TIME_OFF, slot_minutes
+from doctors.closures import facility_closures
+from doctors.models import Doctor, Slot
+from doctors.slot_cache import get_slot_cache
+from doctors.slot_calendar import SlotUnavailable, calendar_horizon, claim_slot, refresh_doctor_days
+
+from .models import Appointment
+
+CONFLICT_MESSAGE = "This slot has just been booked. Please select another time."
+
+# Reason codes returned by check_booking, in addition to the availability ones
+PAST = 'past'
+TOO_FAR_AHEAD = 'too_far_ahead'
+NO_DOCTOR_PROFILE = 'no_doctor_profile'
+
+REASON_MESSAGES = {
+    PAST: "You cannot book appointments in the past.",
+    TOO_FAR_AHEAD: "Appointments cannot be booked that far ahead.",
+    NO_DOCTOR_PROFILE: "The selected user does not have a valid doctor profile.",
+    OUTSIDE_SCHEDULE: "The doctor is not scheduled to work at the selected date and time.",
+    NOT_A_SLOT: "Please choose one of the doctor's available appointment times.",
+    TIME_OFF: "The doctor has scheduled time off and is not available at the selected date and time.",
+    CLOSED: "The hospital is closed at the selected date and time.",
+    BOOKED: "The doctor already has an appointment at this time. Please select another slot.",
+}
+
+REASON_BY_STATE = {
+    Slot.State.OPEN: None,
+    Slot.State.BOOKED: BOOKED,
+    Slot.State.BLOCKED: TIME_OFF,
+}
+
+
+def check_booking(doctor_user_id, date, time):
+    """
+    Return None if the doctor can be booked at ``date`` and ``time``,
+    otherwise a reason code from REASON_MESSAGES.
+
+    The common case is one indexed lookup of the slot row. Only when there
+    is no row (not a slot, outside working hours, no doctor profile or a
+    doctor-day never materialized) is the availability engine consulted to
+    tell the reasons apart.
+    """
+    if timezone.make_aware(datetime.datetime.combine(date, time)) < timezone.now():
+        return PAST
+    first, last = calendar_horizon()
+    if date > last:
+        return TOO_FAR_AHEAD
+
+    state = Slot.objects.filter(doctor_id=doctor_user_id, date=date, time=time).values_list('state', flat=True).first()
+    if state in (Slot.State.BLOCKED, Slot.State.OPEN):
+        # Tell a facility closure from the doctor's own time off, and catch
+        # open rows of a closure whose re-sync has not run yet; the closure
+        # calendar is cached
+        start = timezone.make_aware(datetime.datetime.combine(date, time))
+        if facility_closures().overlaps(start, start + datetime.timedelta(minutes=slot_minutes())):
+            return CLOSED
+    if state is not None:
+        return REASON_BY_STATE[state]
+
+    try:
+        return get_slot_cache().get_day(doctor_user_id, date).check(time)
+    except Doctor.DoesNotExist:
+        return NO_DOCTOR_PROFILE
+
+
+def active_conflicts(doctor_user_id, date, time):
+    return Appointment.objects.filter(doctor_id=doctor_user_id, date=date, time=time).exclude(status=Appointment.CANCELLED)
+
+
+def book_appointment(appointment):
+    """
+    Save a new appointment if its slot is free. Raises SlotUnavailable for
+    the loser of a race, whether the slot row or the constraint stopped it,
+    and its subclass OutsideCalendar for a date beyond the slot calendar.
+    """
+    stale_slot = False
+    try:
+        with transaction.atomic():
+            if not claim_slot(appointment.doctor_id, appointment.date, appointment.time):
+                raise SlotUnavailable(CONFLICT_MESSAGE)
+            appointment._slot_claimed = True
+            try:
+                with transaction.atomic():
+                    appointment.save()
+            except IntegrityError:
+                if not active_conflicts(appointment.doctor_id, appointment.date, appointment.time).exists():
+                    raise
+                # The slot row said open but an active appointment holds it
+                stale_slot = True
+                raise SlotUnavailable(CONFLICT_MESSAGE)
+    finally:
+        if stale_slot:
+            refresh_doctor_days(appointment.doctor_id, [appointment.date])
+    return appointment
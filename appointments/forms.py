@@ -1,16 +1,26 @@
 from django import forms
-from .models import Appointment
+from .models import Appointment, WaitlistEntry
 from users.models import User
 from django.utils import timezone
-from datetime import datetime, timedelta
-from doctors.models import Doctor, DoctorSchedule, TimeOff
+from datetime import timedelta
+from doctors.models import Doctor
+from .booking import REASON_MESSAGES, active_conflicts, book_appointment, check_booking
 
 class AppointmentBookingForm(forms.ModelForm):
+    # Declared outside Meta.fields: the queryset already checks the user is a
+    # doctor, and leaving the model field out of the form keeps model
+    # validation from querying the ForeignKey again. clean() assigns it.
+    doctor = forms.ModelChoiceField(
+        queryset=User.objects.filter(role='DOCTOR'),
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+
+    field_order = ['doctor', 'date', 'time', 'notes']
+
     class Meta:
         model = Appointment
-        fields = ['doctor', 'date', 'time', 'notes']
+        fields = ['date', 'time', 'notes']
         widgets = {
-            'doctor': forms.Select(attrs={'class': 'form-control'}),
             'date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'time': forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Any specific concerns or notes for the doctor'}),
@@ -21,8 +31,6 @@ class AppointmentBookingForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         if self.patient:
             self.instance.patient = self.patient
-        # Use User model for queryset, only doctors
-        self.fields['doctor'].queryset = User.objects.filter(role='DOCTOR')
         # Set minimum date to today
         self.fields['date'].widget.attrs['min'] = timezone.now().date().isoformat()
         # Set maximum date to 3 months from now
@@ -34,57 +42,16 @@ class AppointmentBookingForm(forms.ModelForm):
         date = cleaned_data.get('date')
         time = cleaned_data.get('time')
         doctor_user = cleaned_data.get('doctor')
+        if doctor_user:
+            self.instance.doctor = doctor_user
 
         if not (date and time and doctor_user):
             return cleaned_data
 
-        # --- VALIDATION LOGIC ---
-
-        # 1. Check if appointment is in the past
-        appointment_datetime = timezone.make_aware(datetime.combine(date, time))
-        if appointment_datetime < timezone.now():
-            raise forms.ValidationError("You cannot book appointments in the past.")
-
-        try:
-            doctor = doctor_user.doctor
-        except Doctor.DoesNotExist:
-            raise forms.ValidationError("The selected user does not have a valid doctor profile.")
-
-        # 2. Check for doctor's time off
-        if TimeOff.objects.filter(
-            doctor=doctor,
-            start_datetime__lte=appointment_datetime,
-            end_datetime__gte=appointment_datetime
-        ).exists():
-            raise forms.ValidationError(
-                "The doctor has scheduled time off and is not available at the selected date and time."
-            )
-
-        # 3. Check against the doctor's weekly schedule for unavailability
-        day_of_week = date.weekday()  # Monday is 0, Sunday is 6
-        unavailable_slots = DoctorSchedule.objects.filter(
-            doctor=doctor,
-            day_of_week=day_of_week,
-            start_time__lte=time,
-            end_time__gte=time
-        )
-
-        if unavailable_slots.exists():
-            # Find the specific slot for a more informative error message
-            slot = unavailable_slots.first()
-            raise forms.ValidationError(
-                f"The doctor is unavailable from {slot.start_time.strftime('%I:%M %p')} to "
-                f"{slot.end_time.strftime('%I:%M %p')} on this day."
-            )
-
-        # 4. Check for existing appointments (double-booking)
-        if Appointment.objects.filter(
-            doctor=doctor_user,
-            date=date,
-            time=time,
-            status__in=['CONFIRMED', 'PENDING']
-        ).exists():
-            raise forms.ValidationError("The doctor already has an appointment at this time. Please select another slot.")
+        # One combined availability check; the reason code is kept on the error
+        reason = check_booking(doctor_user.pk, date, time)
+        if reason:
+            raise forms.ValidationError(REASON_MESSAGES[reason], code=reason)
 
         return cleaned_data
 
@@ -94,7 +61,7 @@ class AppointmentBookingForm(forms.ModelForm):
         if isinstance(instance.doctor, Doctor):
             instance.doctor = instance.doctor.user
         if commit:
-            instance.save()
+            book_appointment(instance)
             self.save_m2m()
         return instance
 
@@ -123,6 +90,48 @@ class AppointmentUpdateForm(forms.ModelForm):
                 ('CANCELLED', 'Cancel Appointment'),
             ]
 
+    def clean_status(self):
+        status = self.cleaned_data.get('status')
+        # Reviving a cancelled appointment must not collide with a later booking of its slot
+        if (
+            self.instance.pk
+            and self.instance.status == Appointment.CANCELLED
+            and status != Appointment.CANCELLED
+            and active_conflicts(self.instance.doctor_id, self.instance.date, self.instance.time).exists()
+        ):
+            raise forms.ValidationError("This time slot has since been booked by another patient.")
+        return status
+
+class WaitlistForm(forms.ModelForm):
+    class Meta:
+        model = WaitlistEntry
+        fields = ['doctor', 'earliest_date', 'latest_date']
+        widgets = {
+            'doctor': forms.Select(attrs={'class': 'form-control'}),
+            'earliest_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'latest_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.patient = kwargs.pop('patient', None)
+        super().__init__(*args, **kwargs)
+        if self.patient:
+            self.instance.patient = self.patient
+        self.fields['doctor'].queryset = User.objects.filter(role='DOCTOR')
+        self.fields['earliest_date'].widget.attrs['min'] = timezone.now().date().isoformat()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        earliest_date = cleaned_data.get('earliest_date')
+        latest_date = cleaned_data.get('latest_date')
+
+        if earliest_date and earliest_date < timezone.now().date():
+            raise forms.ValidationError("The waiting window cannot start in the past.")
+        if earliest_date and latest_date and earliest_date > latest_date:
+            raise forms.ValidationError("The latest date must be on or after the earliest date.")
+
+        return cleaned_data
+
 class AppointmentFilterForm(forms.Form):
     date_from = forms.DateField(
         required=False,
@@ -0,0 +1,91 @@
+"""
+Impact of a doctor's new time off on appointments already booked.
+
+The affected appointments are found with one range query over the dates the
+time off touches; applying the time off cancels them with one UPDATE,
+records their status transitions and queues one notification per patient
+appointment with bulk INSERTs, so the cost does not grow in queries with the
+length of the vacation.
+
+Only the doctor's schedule page cancels appointments: it previews
+affected_appointments and cancels them through apply_time_off once the
+doctor confirms. Time off saved any other way (the admin, a script) blocks
+the slots but leaves existing appointments alone.
+"""
+
+import datetime
+from typing import List
+
+from django.db import transaction
+from django.utils import timezone
+
+from doctors.availability import slot_minutes
+
+from .models import Appointment, AppointmentNotification
+from .transitions import record_transitions
+
+CANCELLATION_MESSAGE = "Cancelled because the doctor is unavailable at this time. Please book another appointment."
+
+# Rows per bulk INSERT and ids per IN (...) list
+BATCH_SIZE = 500
+
+
+def affected_appointments(doctor_user_id: int, start: datetime.datetime, end: datetime.datetime) -> List[Appointment]:
+    """Active appointments of the doctor whose slot overlaps [start, end), in date and time order."""
+    start = timezone.localtime(start)
+    end = timezone.localtime(end)
+    length = datetime.timedelta(minutes=slot_minutes())
+    appointments = Appointment.objects.filter(
+        doctor_id=doctor_user_id,
+        date__range=(start.date(), end.date()),
+        status__in=Appointment.ACTIVE_STATUSES,
+    ).select_related('patient').order_by('date', 'time')
+    affected = []
+    for appointment in appointments:
+        begins = timezone.make_aware(datetime.datetime.combine(appointment.date, appointment.time))
+        # Only the first and last days can hold appointments outside the block
+        if start < begins + length and begins < end:
+            affected.append(appointment)
+    return affected
+
+
+def cancel_overlapped(time_off) -> List[Appointment]:
+    """
+    Cancel the active appointments a saved ``time_off`` overlaps and queue a
+    notification for each patient, in one transaction. Returns the
+    cancelled appointments.
+    """
+    with transaction.atomic():
+        # Runs after the save: the doctors.signals handlers block the slots,
+        # so no booking can land in the block while the overlapping
+        # appointments are cancelled. Every cancelled slot overlaps the block
+        # and stays blocked, so the bulk UPDATE needs no further slot refresh
+        # and there is nothing to offer the waitlist.
+        appointments = affected_appointments(time_off.doctor.user_id, time_off.start_datetime, time_off.end_datetime)
+        ids = [appointment.pk for appointment in appointments]
+        previous = {appointment.pk: appointment.status for appointment in appointments}
+        for index in range(0, len(ids), BATCH_SIZE):
+            Appointment.objects.filter(pk__in=ids[index:index + BATCH_SIZE]).update(
+                status=Appointment.CANCELLED, doctor_message=CANCELLATION_MESSAGE
+            )
+        for appointment in appointments:
+            appointment.status = Appointment.CANCELLED
+            appointment.doctor_message = CANCELLATION_MESSAGE
+        record_transitions(appointments, previous)
+        AppointmentNotification.objects.bulk_create([
+            AppointmentNotification(
+                patient_id=appointment.patient_id,
+                appointment_id=appointment.pk,
+                subject=f"Your appointment on {appointment.date:%d %b %Y} at {appointment.time:%H:%M} was cancelled",
+                message=CANCELLATION_MESSAGE,
+            )
+            for appointment in appointments
+        ], batch_size=BATCH_SIZE)
+    return appointments
+
+
+def apply_time_off(time_off) -> List[Appointment]:
+    """Save ``time_off`` and cancel the appointments it overlaps, in one transaction; returns them."""
+    with transaction.atomic():
+        time_off.save()
+        return cancel_overlapped(time_off)
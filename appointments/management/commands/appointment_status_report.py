@@ -0,0 +1,46 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from appointments.transitions import cancellation_rates, confirmation_latency, no_show_rates
+from users.models import User
+
+
+def percent(rate):
+    return '-' if rate is None else f'{rate:.1%}'
+
+
+class Command(BaseCommand):
+    help = 'Per-doctor confirmation latency, cancellation and no-show rates from the appointment transition log'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Length of the reporting period ending now (default: 30)'
+        )
+
+    def handle(self, *args, **options):
+        end = timezone.now()
+        start = end - datetime.timedelta(days=options['days'])
+        latency = {row['doctor_id']: row for row in confirmation_latency(start, end)}
+        cancellations = {row['doctor_id']: row for row in cancellation_rates(start, end)}
+        no_shows = {row['doctor_id']: row for row in no_show_rates(timezone.localtime(start).date(), timezone.localdate())}
+
+        doctor_ids = sorted(set(latency) | set(cancellations) | set(no_shows))
+        names = dict(User.objects.filter(pk__in=doctor_ids).values_list('pk', 'username'))
+        self.stdout.write(
+            f'{"doctor":<20} {"confirmed":>9} {"avg wait":>10} {"booked":>7} {"cancelled":>10} {"no-shows":>9}'
+        )
+        for doctor_id in doctor_ids:
+            confirmed = latency.get(doctor_id, {})
+            average = confirmed.get('average_seconds')
+            wait = '-' if average is None else str(datetime.timedelta(seconds=round(average)))
+            cancelled = cancellations.get(doctor_id, {'booked': 0, 'rate': None})
+            self.stdout.write(
+                f'{names.get(doctor_id, doctor_id):<20} {confirmed.get("confirmed", 0):>9} {wait:>10} '
+                f'{cancelled["booked"]:>7} {percent(cancelled["rate"]):>10} '
+                f'{percent(no_shows.get(doctor_id, {}).get("rate")):>9}'
+            )
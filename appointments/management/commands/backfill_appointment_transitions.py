@@ -0,0 +1,73 @@
+from auditlog.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from appointments.models import Appointment, AppointmentTransition
+from appointments.transitions import BATCH_SIZE, status_code
+
+# Statuses written before they were normalized (see migration 0006)
+LEGACY_STATUSES = {
+    'pending': Appointment.PENDING,
+    'approved': Appointment.CONFIRMED,
+    'confirmed': Appointment.CONFIRMED,
+    'cancelled': Appointment.CANCELLED,
+    'canceled': Appointment.CANCELLED,
+    'completed': Appointment.COMPLETED,
+}
+
+
+def canonical(status):
+    if status in (None, 'None', ''):
+        return None
+    return LEGACY_STATUSES.get(status.lower())
+
+
+class Command(BaseCommand):
+    help = 'Build the appointment transition log from the audit log for appointments that have none yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the transitions without writing them'
+        )
+
+    def handle(self, *args, **options):
+        logged = set(AppointmentTransition.objects.values_list('appointment_id', flat=True).distinct())
+        doctors = dict(Appointment.objects.values_list('pk', 'doctor_id'))
+        entries = LogEntry.objects.filter(
+            content_type=ContentType.objects.get_for_model(Appointment),
+            action__in=[LogEntry.Action.CREATE, LogEntry.Action.UPDATE],
+        ).order_by('timestamp', 'pk')
+
+        # The audit log JSON is parsed once here; reports read the table
+        transitions = []
+        entered = {}
+        for entry in entries.iterator(chunk_size=BATCH_SIZE):
+            pk = int(entry.object_pk) if entry.object_pk.isdigit() else None
+            change = entry.changes_dict.get('status')
+            if pk not in doctors or pk in logged or not change:
+                continue
+            previous, status = canonical(change[0]), canonical(change[1])
+            if status is None or (entry.action == LogEntry.Action.UPDATE and previous in (None, status)):
+                continue
+            if entry.action == LogEntry.Action.CREATE:
+                previous = None
+            transitions.append(AppointmentTransition(
+                appointment_id=pk,
+                doctor_id=doctors[pk],
+                from_status=status_code(previous),
+                to_status=status_code(status),
+                duration=int((entry.timestamp - entered[pk]).total_seconds()) if pk in entered else None,
+                created_at=entry.timestamp,
+            ))
+            entered[pk] = entry.timestamp
+
+        if not options['dry_run']:
+            with transaction.atomic():
+                AppointmentTransition.objects.bulk_create(transitions, batch_size=BATCH_SIZE)
+        verb = 'Found' if options['dry_run'] else 'Wrote'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(transitions)} transition(s) for {len(entered)} appointment(s)'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from appointments.waitlist import expire_entries
+
+
+class Command(BaseCommand):
+    help = 'Mark waitlist entries whose date window has ended as expired (run nightly)'
+
+    def handle(self, *args, **options):
+        expired = expire_entries()
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} waitlist entr{"y" if expired == 1 else "ies"}.'))
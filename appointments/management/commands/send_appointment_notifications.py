@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.mail import get_connection, send_mass_mail
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from appointments.models import AppointmentNotification
+
+
+class Command(BaseCommand):
+    help = 'Email queued appointment notifications to patients in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Notifications per batch (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        sent = 0
+        while True:
+            batch = list(
+                AppointmentNotification.objects.filter(sent_at__isnull=True)
+                .select_related('patient')
+                .order_by('created_at')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            messages = [
+                (notification.subject, notification.message, settings.DEFAULT_FROM_EMAIL, [notification.patient.email])
+                for notification in batch if notification.patient.email
+            ]
+            # One SMTP connection for the whole run; a failure leaves the batch queued
+            send_mass_mail(messages, connection=connection)
+            AppointmentNotification.objects.filter(pk__in=[notification.pk for notification in batch]).update(
+                sent_at=timezone.now()
+            )
+            sent += len(messages)
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} notification(s)'))
@@ -0,0 +1,131 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from appointments.booking import book_appointment
+from appointments.models import Appointment
+from doctors.models import Slot
+from doctors.slot_calendar import SlotUnavailable, sync_slots
+from doctors.synthetic import create_synthetic_doctors, isolated_cache
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Book appointments from many threads at once and check that no slot is ever double-booked'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=16,
+            help='Number of booking threads (default: 16)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5.0,
+            help='Seconds to run for (default: 5)'
+        )
+        parser.add_argument(
+            '--doctors',
+            type=int,
+            default=20,
+            help='Number of synthetic doctors (default: 20)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Days of slots per doctor (default: 30)'
+        )
+        parser.add_argument(
+            '--hot-slots',
+            type=int,
+            default=0,
+            help='Aim every thread at this many slots only, to maximise collisions (default: all slots)'
+        )
+        parser.add_argument(
+            '--constraint-only',
+            action='store_true',
+            help='Insert without claiming the slot row, leaving the unique constraint as the only guard'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the synthetic data instead of deleting it afterwards'
+        )
+
+    def handle(self, *args, **options):
+        with isolated_cache():
+            self._run(options)
+
+    def _run(self, options):
+        prefix = f'stress_{int(time.time())}'
+        start_date = timezone.localdate() + timezone.timedelta(days=1)
+        with transaction.atomic():
+            doctors = list(create_synthetic_doctors(options['doctors'], start_date, options['days'], prefix=prefix))
+            patient = User.objects.get(username=f'{prefix}_patient')
+            # Only the schedules matter here: clear the random bookings the fixture adds
+            Appointment.objects.filter(patient=patient).delete()
+            sync_slots(doctors, start_date, start_date + timezone.timedelta(days=options['days'] - 1))
+        doctor_ids = [doctor.user_id for doctor in doctors]
+        slots = list(Slot.objects.filter(doctor_id__in=doctor_ids, state=Slot.State.OPEN).values_list('doctor_id', 'date', 'time'))
+        if options['hot_slots']:
+            slots = slots[:options['hot_slots']]
+        self.stdout.write(f'{len(slots)} open slots, {options["threads"]} threads, {options["duration"]:.0f} s')
+
+        counts = {'booked': 0, 'conflicts': 0, 'locked': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local = {'booked': 0, 'conflicts': 0, 'locked': 0}
+            try:
+                while time.perf_counter() < deadline:
+                    doctor_id, date, slot_time = rng.choice(slots)
+                    appointment = Appointment(patient=patient, doctor_id=doctor_id, date=date, time=slot_time)
+                    try:
+                        if options['constraint_only']:
+                            with transaction.atomic():
+                                appointment.save()
+                        else:
+                            book_appointment(appointment)
+                        local['booked'] += 1
+                    except (SlotUnavailable, IntegrityError):
+                        local['conflicts'] += 1
+                    except OperationalError:
+                        local['locked'] += 1
+            finally:
+                connection.close()
+                with lock:
+                    for key, value in local.items():
+                        counts[key] += value
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        active = Appointment.objects.filter(doctor_id__in=doctor_ids).exclude(status=Appointment.CANCELLED)
+        double_booked = active.values('doctor_id', 'date', 'time').annotate(count=Count('id')).filter(count__gt=1).count()
+        booked_rows = Slot.objects.filter(doctor_id__in=doctor_ids, state=Slot.State.BOOKED).count()
+
+        self.stdout.write(
+            f'{counts["booked"]} bookings ({counts["booked"] / elapsed:,.0f}/sec), '
+            f'{counts["conflicts"]} conflicts, {counts["locked"]} lock timeouts; '
+            f'{active.count()} active appointments, {booked_rows} booked slot rows'
+        )
+        if not options['keep']:
+            User.objects.filter(username__startswith=f'{prefix}_').delete()
+        if double_booked:
+            raise CommandError(f'{double_booked} slots were double-booked.')
+        self.stdout.write(self.style.SUCCESS('No double bookings.'))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:21
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def cancel_double_bookings(apps, schema_editor):
+    """Keep the earliest active appointment of each double-booked slot and cancel the rest."""
+    Appointment = apps.get_model('appointments', 'Appointment')
+    active = Appointment.objects.exclude(status__in=['CANCELLED', 'cancelled'])
+    duplicates = (
+        active.values('doctor_id', 'date', 'time')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+    )
+    for slot in duplicates:
+        ids = list(
+            active.filter(doctor_id=slot['doctor_id'], date=slot['date'], time=slot['time'])
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        Appointment.objects.filter(id__in=ids[1:]).update(
+            status='CANCELLED',
+            doctor_message='Cancelled automatically: this time slot was double-booked.',
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_appointment_doctor_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['CANCELLED', 'cancelled']), _negated=True), fields=('doctor', 'date', 'time'), name='unique_active_appointment_slot'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_appointmentnotification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('earliest_date', models.DateField()),
+                ('latest_date', models.DateField()),
+                ('status', models.CharField(choices=[('WAITING', 'Waiting'), ('OFFERED', 'Offered'), ('WITHDRAWN', 'Withdrawn')], default='WAITING', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('appointment', models.ForeignKey(blank=True, help_text='The appointment offered from the waitlist.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entries', to='appointments.appointment')),
+                ('doctor', models.ForeignKey(limit_choices_to={'role': 'DOCTOR'}, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries_as_doctor', to=settings.AUTH_USER_MODEL)),
+                ('patient', models.ForeignKey(limit_choices_to={'role': 'PATIENT'}, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Waitlist entries',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['doctor', 'status', 'created_at'], name='appointment_doctor__e513e7_idx')],
+            },
+        ),
+    ]
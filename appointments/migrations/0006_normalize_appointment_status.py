@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Legacy spellings written by older views, matched case-insensitively
+CANONICAL_STATUSES = {
+    'pending': 'PENDING',
+    'approved': 'CONFIRMED',
+    'confirmed': 'CONFIRMED',
+    'cancelled': 'CANCELLED',
+    'canceled': 'CANCELLED',
+    'completed': 'COMPLETED',
+}
+
+
+def normalize_statuses(apps, schema_editor):
+    """Rewrite every appointment status to its canonical upper-case value."""
+    Appointment = apps.get_model('appointments', 'Appointment')
+    for legacy, canonical in CANONICAL_STATUSES.items():
+        Appointment.objects.filter(status__iexact=legacy).exclude(status=canonical).update(status=canonical)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_waitlistentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_statuses, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='appointment',
+            name='unique_active_appointment_slot',
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'status', 'date', 'time'], name='appointment_doctor__18c1da_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'CANCELLED'), _negated=True), fields=('doctor', 'date', 'time'), name='unique_active_appointment_slot'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_normalize_appointment_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Pending'), (2, 'Confirmed'), (3, 'Cancelled'), (4, 'Completed')], help_text='Empty when the appointment was created.', null=True)),
+                ('to_status', models.PositiveSmallIntegerField(choices=[(1, 'Pending'), (2, 'Confirmed'), (3, 'Cancelled'), (4, 'Completed')])),
+                ('duration', models.PositiveIntegerField(blank=True, help_text='Seconds spent in the previous status.', null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='appointments.appointment')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_transitions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['doctor', 'to_status', 'created_at'], name='appointment_doctor__b0bf1e_idx'), models.Index(fields=['appointment', 'created_at'], name='appointment_appoint_c090ff_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_appointmenttransition'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='waitlistentry',
+            name='appointment_doctor__e513e7_idx',
+        ),
+        migrations.AlterField(
+            model_name='waitlistentry',
+            name='status',
+            field=models.CharField(choices=[('WAITING', 'Waiting'), ('OFFERED', 'Offered'), ('WITHDRAWN', 'Withdrawn'), ('EXPIRED', 'Expired')], default='WAITING', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['doctor', 'status', 'latest_date', 'created_at'], name='appointment_doctor__a599a7_idx'),
+        ),
+    ]
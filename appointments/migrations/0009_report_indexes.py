@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0008_waitlist_expiry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointmenttransition',
+            name='appointment_doctor__b0bf1e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'date'], name='appointment_status_53df83_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmenttransition',
+            index=models.Index(fields=['to_status', 'created_at'], name='appointment_to_stat_8f06fc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmenttransition',
+            index=models.Index(fields=['from_status', 'created_at'], name='appointment_from_st_48cee5_idx'),
+        ),
+    ]
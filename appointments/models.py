@@ -1,21 +1,205 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
 from users.models import User
 
+class InvalidStatusTransition(Exception):
+    """Raised when an appointment is saved with a status change the state machine does not allow."""
+
 class Appointment(models.Model):
+    PENDING = 'PENDING'
+    CONFIRMED = 'CONFIRMED'
+    CANCELLED = 'CANCELLED'
+    COMPLETED = 'COMPLETED'
+
     STATUS_CHOICES = [
-        ('PENDING', 'Pending'),
-        ('CONFIRMED', 'Confirmed'),
-        ('CANCELLED', 'Cancelled'),
-        ('COMPLETED', 'Completed'),
+        (PENDING, 'Pending'),
+        (CONFIRMED, 'Confirmed'),
+        (CANCELLED, 'Cancelled'),
+        (COMPLETED, 'Completed'),
     ]
 
+    # Allowed status changes. A cancelled appointment can be revived as long
+    # as its slot is still free (see AppointmentUpdateForm); completed is final.
+    TRANSITIONS = {
+        PENDING: {CONFIRMED, CANCELLED},
+        CONFIRMED: {CANCELLED, COMPLETED},
+        CANCELLED: {PENDING, CONFIRMED},
+        COMPLETED: set(),
+    }
+
+    ACTIVE_STATUSES = [PENDING, CONFIRMED]
+
     patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='appointments_as_patient', limit_choices_to={'role': 'PATIENT'})
     doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='appointments_as_doctor', limit_choices_to={'role': 'DOCTOR'})
     date = models.DateField(help_text='Appointment date')
     time = models.TimeField(help_text='Appointment time')
-    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
     notes = models.TextField(blank=True, help_text='Additional notes (optional)')
     doctor_message = models.TextField(blank=True, null=True, help_text='Optional message from the doctor when declining/cancelling.')
 
+    class Meta:
+        constraints = [
+            # At most one active (not cancelled) appointment per doctor and slot
+            models.UniqueConstraint(
+                fields=['doctor', 'date', 'time'],
+                condition=~Q(status='CANCELLED'),
+                name='unique_active_appointment_slot',
+            ),
+        ]
+        indexes = [
+            # Dashboards and availability: a doctor's appointments by status and date
+            models.Index(fields=['doctor', 'status', 'date', 'time']),
+            # Reports across all doctors, e.g. no-show rates over a date range
+            models.Index(fields=['status', 'date']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored status, to validate the next change against, and the
+        # stored slot, so the post_save handlers can tell what moved
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_slot = instance.slot_key()
+        return instance
+
+    def slot_key(self):
+        """(doctor_id, date, time) of the slot this appointment holds, or None if a field was deferred."""
+        key = tuple(self.__dict__.get(field) for field in ('doctor_id', 'date', 'time'))
+        return None if None in key else key
+
+    def can_transition(self, status):
+        loaded = getattr(self, '_loaded_status', None)
+        return loaded is None or status == loaded or status in self.TRANSITIONS.get(loaded, set())
+
+    def transition_error(self, status):
+        labels = dict(self.STATUS_CHOICES)
+        return (
+            f"A {labels.get(self._loaded_status, self._loaded_status).lower()} appointment "
+            f"cannot be changed to {labels.get(status, status).lower()}."
+        )
+
+    def transition_to(self, status):
+        """Set a new status, raising InvalidStatusTransition if the change is not allowed."""
+        if not self.can_transition(status):
+            raise InvalidStatusTransition(self.transition_error(status))
+        self.status = status
+
+    def clean(self):
+        if not self.can_transition(self.status):
+            raise ValidationError({'status': self.transition_error(self.status)})
+
+    def save(self, *args, **kwargs):
+        from .transitions import record_transitions
+
+        if not self.can_transition(self.status):
+            raise InvalidStatusTransition(self.transition_error(self.status))
+        previous = None if self._state.adding else getattr(self, '_loaded_status', None)
+        changed = self._state.adding or (previous is not None and previous != self.status)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if changed:
+                record_transitions([self], {self.pk: previous})
+        self._loaded_status = self.status
+        self._loaded_slot = self.slot_key()
+
     def __str__(self):
         return f"Appointment: {self.patient.username} with {self.doctor.username} on {self.date} at {self.time}"
+
+class AppointmentNotification(models.Model):
+    """
+    A message queued for a patient about one of their appointments, e.g. a
+    cancellation caused by the doctor's time off. Rows are written in bulk
+    and sent in batches by the ``send_appointment_notifications`` command.
+    """
+    patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='appointment_notifications')
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='notifications')
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['sent_at', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Notification to {self.patient.username}: {self.subject}"
+
+class WaitlistEntry(models.Model):
+    """
+    A patient waiting for any slot with a doctor between two dates. When an
+    appointment in the window is cancelled, the oldest waiting entry is
+    booked into the freed slot without asking first; OFFERED marks an entry
+    that was booked this way (see appointments.waitlist).
+    """
+    class Status(models.TextChoices):
+        WAITING = 'WAITING', 'Waiting'
+        OFFERED = 'OFFERED', 'Offered'
+        WITHDRAWN = 'WITHDRAWN', 'Withdrawn'
+        EXPIRED = 'EXPIRED', 'Expired'
+
+    patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries', limit_choices_to={'role': 'PATIENT'})
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries_as_doctor', limit_choices_to={'role': 'DOCTOR'})
+    earliest_date = models.DateField()
+    latest_date = models.DateField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.WAITING)
+    appointment = models.ForeignKey(Appointment, on_delete=models.SET_NULL, blank=True, null=True, related_name='waitlist_entries', help_text='The appointment offered from the waitlist.')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name_plural = 'Waitlist entries'
+        indexes = [
+            # Matching a freed slot: a range scan over one doctor's waiting
+            # entries whose window has not ended; those are then sorted by
+            # created_at
+            models.Index(fields=['doctor', 'status', 'latest_date', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.patient.username} waiting for {self.doctor.username} ({self.earliest_date} to {self.latest_date})"
+
+class AppointmentTransition(models.Model):
+    """
+    One appointment status change, appended in the same transaction as the
+    change itself. Statuses are stored as small integers and ``duration`` is
+    the time spent in the previous status, so reports such as confirmation
+    latency are indexed aggregates (see appointments.transitions). Rows are
+    never updated or deleted.
+    """
+    class Status(models.IntegerChoices):
+        PENDING = 1, 'Pending'
+        CONFIRMED = 2, 'Confirmed'
+        CANCELLED = 3, 'Cancelled'
+        COMPLETED = 4, 'Completed'
+
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='transitions')
+    # Copied from the appointment so per-doctor reports need no join
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='appointment_transitions')
+    from_status = models.PositiveSmallIntegerField(choices=Status.choices, blank=True, null=True, help_text='Empty when the appointment was created.')
+    to_status = models.PositiveSmallIntegerField(choices=Status.choices)
+    duration = models.PositiveIntegerField(blank=True, null=True, help_text='Seconds spent in the previous status.')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # Reports over a period: changes into a status, e.g. PENDING -> CONFIRMED latency
+            models.Index(fields=['to_status', 'created_at']),
+            # Bookings made in a period (from_status is empty on creation)
+            models.Index(fields=['from_status', 'created_at']),
+            # The previous transition of an appointment, for ``duration``
+            models.Index(fields=['appointment', 'created_at']),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Appointment transitions are append-only.')
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Appointment {self.appointment_id}: {self.get_from_status_display() or 'created'} -> {self.get_to_status_display()}"
@@ -0,0 +1,26 @@
+"""
+Offer slots freed by cancellations to the waitlist.
+
+Appointment.from_db keeps the stored status and slot on the instance; a
+change from an active status to cancelled schedules a waitlist offer for
+that slot once the cancellation is committed.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Appointment
+from .waitlist import offer_slot
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_cancelled(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_loaded_slot', None)
+    previous_status = getattr(instance, '_loaded_status', None)
+    if created or previous is None or previous_status is None:
+        return
+    if previous_status != Appointment.CANCELLED and instance.status == Appointment.CANCELLED:
+        doctor_id, date, time = previous
+        transaction.on_commit(lambda: offer_slot(doctor_id, date, time))
+
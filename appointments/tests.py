@@ -1,3 +1,271 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from appointments.booking import book_appointment
+from appointments.forms import AppointmentBookingForm
+from appointments.impact import CANCELLATION_MESSAGE, affected_appointments, apply_time_off, cancel_overlapped
+from appointments.models import Appointment, AppointmentNotification, AppointmentTransition, WaitlistEntry
+from appointments.waitlist import WAITLIST_NOTE, expire_entries, offer_slot
+from doctors.closures import facility_closures
+from doctors.models import Doctor, DoctorSchedule, Slot, TimeOff
+from doctors.slot_calendar import SlotUnavailable, refresh_doctor_days
+from users.models import User
+
+
+class BookingTestCase(TestCase):
+    """A doctor working 09:00-17:00 every day, one patient, and tomorrow's slots materialized."""
+
+    def setUp(self):
+        cache.clear()
+        self.doctor = User.objects.create(username='doctor', role='DOCTOR')
+        self.profile = Doctor.objects.create(user=self.doctor, specialization='Cardiology', license_number='L-1')
+        DoctorSchedule.objects.bulk_create([
+            DoctorSchedule(doctor=self.profile, day_of_week=day, start_time=datetime.time(9), end_time=datetime.time(17))
+            for day in range(7)
+        ])
+        self.patient = User.objects.create(username='patient', role='PATIENT')
+        self.date = timezone.localdate() + datetime.timedelta(days=1)
+        refresh_doctor_days(self.doctor.pk, [self.date])
+
+    def at(self, time):
+        return timezone.make_aware(datetime.datetime.combine(self.date, time))
+
+    def book(self, time, patient=None, status=Appointment.PENDING):
+        return Appointment.objects.create(
+            patient=patient or self.patient, doctor=self.doctor, date=self.date, time=time, status=status
+        )
+
+
+class BookingValidationQueryTests(BookingTestCase):
+    """Validating a booking is the doctor field's query and one slot row lookup."""
+
+    def setUp(self):
+        super().setUp()
+        self.book(datetime.time(10))
+        TimeOff.objects.create(doctor=self.profile, start_datetime=self.at(datetime.time(14)), end_datetime=self.at(datetime.time(15)))
+        # The closure calendar is cached process-wide; warm it as a running server would have
+        facility_closures()
+
+    def validate(self, time):
+        form = AppointmentBookingForm(
+            {'doctor': self.doctor.pk, 'date': self.date.isoformat(), 'time': time, 'notes': ''},
+            patient=self.patient,
+        )
+        with self.assertNumQueries(2):
+            valid = form.is_valid()
+        return valid, [error.code for error in form.non_field_errors().as_data()]
+
+    def test_open_slot(self):
+        self.assertEqual(self.validate('11:00'), (True, []))
+
+    def test_booked_slot(self):
+        self.assertEqual(self.validate('10:00'), (False, ['booked']))
+
+    def test_time_off(self):
+        self.assertEqual(self.validate('14:30'), (False, ['time_off']))
+
+    def test_valid_form_books_the_doctor(self):
+        form = AppointmentBookingForm(
+            {'doctor': self.doctor.pk, 'date': self.date.isoformat(), 'time': '11:00', 'notes': ''},
+            patient=self.patient,
+        )
+        self.assertTrue(form.is_valid())
+        appointment = form.save()
+        self.assertEqual((appointment.doctor, appointment.patient), (self.doctor, self.patient))
+
+
+class BookAppointmentTests(BookingTestCase):
+    """book_appointment lets exactly one active appointment hold a slot."""
+
+    def new(self, time, patient=None):
+        return Appointment(patient=patient or self.patient, doctor=self.doctor, date=self.date, time=time)
+
+    def test_second_booking_of_a_slot_is_rejected(self):
+        other = User.objects.create(username='other', role='PATIENT')
+        book_appointment(self.new(datetime.time(10)))
+        with self.assertRaises(SlotUnavailable):
+            book_appointment(self.new(datetime.time(10), other))
+        self.assertEqual(Appointment.objects.filter(date=self.date, time=datetime.time(10)).count(), 1)
+
+    def test_constraint_catches_a_stale_open_slot(self):
+        book_appointment(self.new(datetime.time(10)))
+        # The slot row wrongly says open, so the claim succeeds and only the constraint stops the insert
+        Slot.objects.filter(doctor=self.doctor, date=self.date, time=datetime.time(10)).update(state=Slot.State.OPEN)
+        other = User.objects.create(username='other', role='PATIENT')
+        with self.assertRaises(SlotUnavailable):
+            book_appointment(self.new(datetime.time(10), other))
+        self.assertEqual(Appointment.objects.filter(date=self.date, time=datetime.time(10)).count(), 1)
+        # The stale row is re-synced on the way out
+        slot = Slot.objects.get(doctor=self.doctor, date=self.date, time=datetime.time(10))
+        self.assertEqual(slot.state, Slot.State.BOOKED)
+
+    def test_rebooking_after_cancellation(self):
+        appointment = book_appointment(self.new(datetime.time(10)))
+        appointment.transition_to(Appointment.CANCELLED)
+        appointment.save()
+        other = User.objects.create(username='other', role='PATIENT')
+        rebooked = book_appointment(self.new(datetime.time(10), other))
+        self.assertEqual(rebooked.status, Appointment.PENDING)
+        self.assertEqual(
+            sorted(Appointment.objects.filter(date=self.date, time=datetime.time(10)).values_list('status', flat=True)),
+            [Appointment.CANCELLED, Appointment.PENDING],
+        )
+
+    def test_constraint_allows_cancelled_duplicates_only(self):
+        self.book(datetime.time(10), status=Appointment.CANCELLED)
+        self.book(datetime.time(10), status=Appointment.CANCELLED)
+        self.book(datetime.time(10))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.book(datetime.time(10), status=Appointment.CONFIRMED)
+
+
+class DoubleBookingMigrationTests(TransactionTestCase):
+    """Migration 0003 cancels all but the earliest active appointment of a double-booked slot."""
+
+    migrate_from = [('appointments', '0002_appointment_doctor_message')]
+    migrate_to = [('appointments', '0003_unique_active_appointment_slot')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        self.apps = executor.loader.project_state(self.migrate_from).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_cancelled(self):
+        # Only appointments are rolled back; the users table is current
+        Appointment = self.apps.get_model('appointments', 'Appointment')
+        doctor = User.objects.create(username='doctor', role='DOCTOR')
+        patients = [User.objects.create(username=f'patient{i}', role='PATIENT') for i in range(4)]
+        date = datetime.date(2025, 1, 6)
+        first, second, cancelled, elsewhere = (
+            Appointment.objects.create(patient_id=patient.pk, doctor_id=doctor.pk, date=date, time=time, status=status)
+            for patient, time, status in zip(patients, (datetime.time(10),) * 3 + (datetime.time(11),),
+                                             ('pending', 'CONFIRMED', 'cancelled', 'PENDING'))
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        Appointment = executor.loader.project_state(self.migrate_to).apps.get_model('appointments', 'Appointment')
+
+        statuses = dict(Appointment.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {
+            first.pk: 'pending',
+            second.pk: 'CANCELLED',
+            cancelled.pk: 'cancelled',
+            elsewhere.pk: 'PENDING',
+        })
+
+
+class TimeOffImpactTests(BookingTestCase):
+    """Time off cancels the appointments it overlaps only once the doctor confirms it."""
+
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create(username='other', role='PATIENT')
+        self.starts_before = self.book(datetime.time(9, 30))
+        self.inside = self.book(datetime.time(10), other, status=Appointment.CONFIRMED)
+        self.already_cancelled = self.book(datetime.time(10, 30), status=Appointment.CANCELLED)
+        self.after = self.book(datetime.time(11))
+        self.next_day = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, date=self.date + datetime.timedelta(days=1), time=datetime.time(10)
+        )
+        self.time_off = TimeOff(doctor=self.profile, start_datetime=self.at(datetime.time(9, 45)), end_datetime=self.at(datetime.time(10, 45)))
+
+    def test_affected_appointments(self):
+        affected = affected_appointments(self.doctor.pk, self.time_off.start_datetime, self.time_off.end_datetime)
+        self.assertEqual(affected, [self.starts_before, self.inside])
+
+    def test_saving_time_off_alone_cancels_nothing(self):
+        self.time_off.save()
+        self.assertFalse(Appointment.objects.filter(status=Appointment.CANCELLED).exclude(pk=self.already_cancelled.pk).exists())
+
+    def test_apply_time_off_cancels_and_notifies(self):
+        cancelled = apply_time_off(self.time_off)
+        self.assertEqual(cancelled, [self.starts_before, self.inside])
+        self.assertIsNotNone(self.time_off.pk)
+        statuses = dict(Appointment.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[self.starts_before.pk], Appointment.CANCELLED)
+        self.assertEqual(statuses[self.inside.pk], Appointment.CANCELLED)
+        self.assertEqual(statuses[self.after.pk], Appointment.PENDING)
+        self.assertEqual(statuses[self.next_day.pk], Appointment.PENDING)
+        self.assertEqual(
+            sorted(AppointmentNotification.objects.values_list('appointment_id', 'message')),
+            [(self.starts_before.pk, CANCELLATION_MESSAGE), (self.inside.pk, CANCELLATION_MESSAGE)],
+        )
+        self.assertEqual(
+            sorted(AppointmentTransition.objects.filter(to_status=AppointmentTransition.Status.CANCELLED, from_status__isnull=False)
+                   .values_list('appointment_id', 'from_status')),
+            [(self.starts_before.pk, AppointmentTransition.Status.PENDING), (self.inside.pk, AppointmentTransition.Status.CONFIRMED)],
+        )
+
+    def test_cancel_overlapped_query_count(self):
+        self.time_off.save()
+        with self.assertNumQueries(7):
+            cancel_overlapped(self.time_off)
+
+
+class WaitlistTests(BookingTestCase):
+    """A freed slot is booked for the oldest waiting entry whose window covers it."""
+
+    def setUp(self):
+        super().setUp()
+        self.first = User.objects.create(username='first', role='PATIENT')
+        self.second = User.objects.create(username='second', role='PATIENT')
+
+    def wait(self, patient, earliest, latest):
+        return WaitlistEntry.objects.create(patient=patient, doctor=self.doctor, earliest_date=earliest, latest_date=latest)
+
+    def test_cancellation_books_oldest_matching_entry(self):
+        today = timezone.localdate()
+        outside = self.wait(self.second, today + datetime.timedelta(days=2), today + datetime.timedelta(days=5))
+        oldest = self.wait(self.first, today, self.date)
+        newer = self.wait(self.second, self.date, self.date)
+        appointment = self.book(datetime.time(10))
+        appointment.status = Appointment.CANCELLED
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+
+        oldest.refresh_from_db()
+        self.assertEqual(oldest.status, WaitlistEntry.Status.OFFERED)
+        booked = oldest.appointment
+        self.assertEqual((booked.patient, booked.date, booked.time, booked.status, booked.notes),
+                         (self.first, self.date, datetime.time(10), Appointment.PENDING, WAITLIST_NOTE))
+        self.assertTrue(AppointmentNotification.objects.filter(patient=self.first, appointment=booked).exists())
+        for entry in (outside, newer):
+            entry.refresh_from_db()
+            self.assertEqual(entry.status, WaitlistEntry.Status.WAITING)
+
+    def test_patient_booked_at_that_time_is_passed_over(self):
+        other = User.objects.create(username='other', role='DOCTOR')
+        Appointment.objects.create(patient=self.first, doctor=other, date=self.date, time=datetime.time(10))
+        self.wait(self.first, self.date, self.date)
+        entry = self.wait(self.second, self.date, self.date)
+        self.assertEqual(offer_slot(self.doctor.pk, self.date, datetime.time(10)).patient, self.second)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, WaitlistEntry.Status.OFFERED)
+
+    def test_taken_slot_keeps_entry_waiting(self):
+        self.book(datetime.time(10), patient=self.second)
+        entry = self.wait(self.first, self.date, self.date)
+        self.assertIsNone(offer_slot(self.doctor.pk, self.date, datetime.time(10)))
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.appointment), (WaitlistEntry.Status.WAITING, None))
+
+    def test_expire_entries(self):
+        today = timezone.localdate()
+        ended = self.wait(self.first, today - datetime.timedelta(days=3), today - datetime.timedelta(days=1))
+        live = self.wait(self.second, today - datetime.timedelta(days=3), today)
+        self.assertEqual(expire_entries(today), 1)
+        ended.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual((ended.status, live.status), (WaitlistEntry.Status.EXPIRED, WaitlistEntry.Status.WAITING))
+        self.assertIsNone(offer_slot(self.doctor.pk, self.date, datetime.time(10)))
@@ -0,0 +1,112 @@
+"""
+Appointment status transition log and the reports built on it.
+
+Every status change appends one AppointmentTransition row in the same
+transaction: Appointment.save() records single changes and the bulk paths
+(batch confirm/decline, time-off cancellations) call record_transitions
+with the statuses they replaced. Reports are aggregates over range scans of
+the (to_status, created_at) and (from_status, created_at) indexes, and of
+Appointment's (status, date) index, instead of parsing audit log JSON.
+"""
+
+import datetime
+from typing import Dict, Iterable, Optional
+
+from django.db.models import Avg, Count, Exists, Max, OuterRef, Q
+from django.utils import timezone
+
+from .models import Appointment, AppointmentTransition
+
+# Ids per IN (...) list and rows per bulk INSERT
+BATCH_SIZE = 500
+
+Status = AppointmentTransition.Status
+
+
+def status_code(status: Optional[str]) -> Optional[int]:
+    return None if status is None else Status[status].value
+
+
+def record_transitions(appointments: Iterable[Appointment], previous: Dict[int, Optional[str]],
+                       now: datetime.datetime = None):
+    """
+    Append a transition for each of ``appointments`` from its status in
+    ``previous`` (keyed by pk, None for a new appointment) to its current
+    status. Costs one query for the previous transition times of existing
+    appointments and one bulk INSERT.
+    """
+    appointments = list(appointments)
+    now = now or timezone.now()
+    existing = [appointment.pk for appointment in appointments if previous.get(appointment.pk) is not None]
+    entered = {}
+    for index in range(0, len(existing), BATCH_SIZE):
+        entered.update(
+            AppointmentTransition.objects.filter(appointment_id__in=existing[index:index + BATCH_SIZE])
+            .values('appointment_id').annotate(last=Max('created_at')).values_list('appointment_id', 'last')
+        )
+    AppointmentTransition.objects.bulk_create([
+        AppointmentTransition(
+            appointment_id=appointment.pk,
+            doctor_id=appointment.doctor_id,
+            from_status=status_code(previous.get(appointment.pk)),
+            to_status=status_code(appointment.status),
+            duration=int((now - entered[appointment.pk]).total_seconds()) if appointment.pk in entered else None,
+            created_at=now,
+        )
+        for appointment in appointments
+    ], batch_size=BATCH_SIZE)
+
+
+def confirmation_latency(start: datetime.datetime, end: datetime.datetime):
+    """Per doctor: appointments confirmed in [start, end) and the average seconds they waited as pending."""
+    return (
+        AppointmentTransition.objects.filter(
+            to_status=Status.CONFIRMED, from_status=Status.PENDING, created_at__gte=start, created_at__lt=end
+        )
+        .values('doctor_id')
+        .annotate(confirmed=Count('id'), average_seconds=Avg('duration'))
+        .order_by('doctor_id')
+    )
+
+
+def cancellation_rates(start: datetime.datetime, end: datetime.datetime):
+    """
+    Per doctor: appointments booked in [start, end), how many of those have
+    been cancelled since, and the cancelled share of that cohort.
+    """
+    cancelled = AppointmentTransition.objects.filter(
+        appointment_id=OuterRef('appointment_id'), to_status=Status.CANCELLED
+    )
+    rows = (
+        AppointmentTransition.objects.filter(from_status__isnull=True, created_at__gte=start, created_at__lt=end)
+        .annotate(was_cancelled=Exists(cancelled))
+        .values('doctor_id')
+        .annotate(booked=Count('id'), cancelled=Count('id', filter=Q(was_cancelled=True)))
+        .order_by('doctor_id')
+    )
+    return [dict(row, rate=row['cancelled'] / row['booked'] if row['booked'] else None) for row in rows]
+
+
+def no_show_rates(start_date: datetime.date, end_date: datetime.date):
+    """
+    Per doctor: confirmed appointments dated between the two dates
+    (inclusive) that were marked completed and those still only confirmed
+    once their day has passed, i.e. no-shows. Reads the appointments'
+    current status over the (status, date) index.
+    """
+    end_date = min(end_date, timezone.localdate() - datetime.timedelta(days=1))
+    rows = (
+        Appointment.objects.filter(
+            status__in=[Appointment.CONFIRMED, Appointment.COMPLETED], date__range=(start_date, end_date)
+        )
+        .values('doctor_id')
+        .annotate(
+            completed=Count('id', filter=Q(status=Appointment.COMPLETED)),
+            no_shows=Count('id', filter=Q(status=Appointment.CONFIRMED)),
+        )
+        .order_by('doctor_id')
+    )
+    return [
+        dict(row, rate=row['no_shows'] / (row['completed'] + row['no_shows']))
+        for row in rows
+    ]
@@ -9,4 +9,6 @@ urlpatterns = [
     path('<int:pk>/', views.appointment_detail, name='appointment_detail'),
     path('<int:pk>/cancel/', views.appointment_cancel, name='appointment_cancel'),
     path('doctor/schedule/', views.doctor_schedule, name='doctor_schedule'),
+    path('waitlist/', views.waitlist, name='waitlist'),
+    path('waitlist/<int:pk>/leave/', views.waitlist_leave, name='waitlist_leave'),
 ] 
\ No newline at end of file
@@ -3,9 +3,10 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Q
-from .models import Appointment
-from .forms import AppointmentBookingForm, AppointmentUpdateForm, AppointmentFilterForm
+from .models import Appointment, WaitlistEntry
+from .forms import AppointmentBookingForm, AppointmentUpdateForm, AppointmentFilterForm, WaitlistForm
 from users.models import User
+from doctors.slot_calendar import SlotUnavailable
 
 def is_patient(user):
     return user.is_authenticated and user.role == 'PATIENT'
@@ -55,10 +56,14 @@ def appointment_book(request):
     if request.method == 'POST':
         form = AppointmentBookingForm(request.POST, patient=request.user)
         if form.is_valid():
-            appointment = form.save()
-            print('Appointment saved:', appointment)
-            messages.success(request, 'Appointment booked successfully. Waiting for doctor confirmation.')
-            return redirect('appointments:appointment_list')
+            try:
+                appointment = form.save()
+            except SlotUnavailable as e:
+                form.add_error(None, str(e))
+            else:
+                print('Appointment saved:', appointment)
+                messages.success(request, 'Appointment booked successfully. Waiting for doctor confirmation.')
+                return redirect('appointments:appointment_list')
         else:
             print('Form errors:', form.errors, form.non_field_errors())
     else:
@@ -113,12 +118,12 @@ def appointment_cancel(request, pk):
         messages.error(request, "You don't have permission to cancel this appointment.")
         return redirect('appointments:appointment_list')
 
-    if appointment.status in ['CANCELLED', 'COMPLETED']:
+    if appointment.status == Appointment.CANCELLED or not appointment.can_transition(Appointment.CANCELLED):
         messages.error(request, "This appointment cannot be cancelled.")
         return redirect('appointments:appointment_list')
 
     if request.method == 'POST':
-        appointment.status = 'CANCELLED'
+        appointment.transition_to(Appointment.CANCELLED)
         appointment.save()
         messages.success(request, 'Appointment cancelled successfully.')
         return redirect('appointments:appointment_list')
@@ -139,14 +144,14 @@ def doctor_schedule(request):
     upcoming_appointments = Appointment.objects.filter(
         doctor=doctor,
         date__gte=today,
-        status__in=['CONFIRMED', 'PENDING']
+        status__in=Appointment.ACTIVE_STATUSES
     ).order_by('date', 'time')
 
     # Get today's appointments
     today_appointments = Appointment.objects.filter(
         doctor=doctor,
         date=today,
-        status__in=['CONFIRMED', 'PENDING']
+        status__in=Appointment.ACTIVE_STATUSES
     ).order_by('time')
 
     context = {
@@ -155,3 +160,35 @@ def doctor_schedule(request):
         'today': today,
     }
     return render(request, 'appointments/doctor_schedule.html', context)
+
+@login_required
+@user_passes_test(is_patient)
+def waitlist(request):
+    if request.method == 'POST':
+        form = WaitlistForm(request.POST, patient=request.user)
+        if form.is_valid():
+            form.save()
+            messages.success(request, "You have joined the waitlist. We will book the first matching slot that opens up.")
+            return redirect('appointments:waitlist')
+    else:
+        form = WaitlistForm(patient=request.user)
+
+    entries = WaitlistEntry.objects.filter(patient=request.user).select_related('doctor', 'appointment').order_by('-created_at')
+    context = {
+        'form': form,
+        'entries': entries,
+    }
+    return render(request, 'appointments/waitlist.html', context)
+
+@login_required
+@user_passes_test(is_patient)
+def waitlist_leave(request, pk):
+    if request.method == 'POST':
+        updated = WaitlistEntry.objects.filter(
+            pk=pk, patient=request.user, status=WaitlistEntry.Status.WAITING
+        ).update(status=WaitlistEntry.Status.WITHDRAWN)
+        if updated:
+            messages.success(request, "You have left the waitlist.")
+        else:
+            messages.error(request, "This waitlist entry is no longer waiting.")
+    return redirect('appointments:waitlist')
@@ -0,0 +1,121 @@
+"""
+Waitlist backfill.
+
+When an appointment is cancelled, the freed slot is booked outright for the
+oldest waiting entry whose date window covers it: there is no offer to
+accept. The patient gets a PENDING appointment and a notification, and
+declines by cancelling it, which frees the slot for the next entry. This
+keeps a slot from sitting unbooked while an offer waits for an answer; the
+entry's OFFERED status means "booked from the waitlist".
+
+An entry is claimed with a conditional UPDATE WAITING -> OFFERED and the
+slot is booked through book_appointment in the same transaction, so
+concurrent cancellations never hand one entry two slots or one slot two
+patients. Candidates come from one query that range-scans the
+(doctor, status, latest_date, created_at) index over the doctor's waiting
+entries whose window has not ended, then sorts those by created_at before
+the LIMIT: the index cannot give created_at order across latest_date
+values, so the cost grows with the doctor's live waiting entries, though
+not with other doctors' entries or with ended, withdrawn and offered ones.
+Ended entries are marked EXPIRED by ``manage.py expire_waitlist``. A patient
+who already has an appointment at the freed time is passed over.
+"""
+
+import datetime
+from typing import Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from doctors.slot_calendar import SlotUnavailable
+
+from .booking import book_appointment
+from .models import Appointment, AppointmentNotification, WaitlistEntry
+
+# Entries tried per freed slot when concurrent cancellations claim the first ones
+OFFER_CANDIDATES = 5
+
+WAITLIST_NOTE = 'Booked automatically from the waitlist.'
+
+
+def offer_slot(doctor_user_id: int, date: datetime.date, time: datetime.time) -> Optional[Appointment]:
+    """
+    Book the freed slot for the first matching waitlist entry and notify the
+    patient. Returns the new appointment, or None if nobody matched or the
+    slot was taken in the meantime.
+    """
+    if timezone.make_aware(datetime.datetime.combine(date, time)) < timezone.now():
+        return None
+    candidates = list(
+        WaitlistEntry.objects.filter(
+            doctor_id=doctor_user_id,
+            status=WaitlistEntry.Status.WAITING,
+            earliest_date__lte=date,
+            latest_date__gte=date,
+        ).order_by('created_at', 'pk').values_list('pk', 'patient_id')[:OFFER_CANDIDATES]
+    )
+    if not candidates:
+        return None
+    busy = set(
+        Appointment.objects.filter(
+            patient_id__in=[patient_id for _, patient_id in candidates],
+            date=date,
+            time=time,
+            status__in=Appointment.ACTIVE_STATUSES,
+        ).values_list('patient_id', flat=True)
+    )
+    for entry_id, patient_id in candidates:
+        if patient_id in busy:
+            # Already booked elsewhere at this time; keep waiting for another slot
+            continue
+        try:
+            with transaction.atomic():
+                if not WaitlistEntry.objects.filter(pk=entry_id, status=WaitlistEntry.Status.WAITING).update(
+                    status=WaitlistEntry.Status.OFFERED
+                ):
+                    # Claimed by a concurrent cancellation; try the next one
+                    continue
+                appointment = book_appointment(Appointment(
+                    patient_id=patient_id,
+                    doctor_id=doctor_user_id,
+                    date=date,
+                    time=time,
+                    status=Appointment.PENDING,
+                    notes=WAITLIST_NOTE,
+                ))
+                WaitlistEntry.objects.filter(pk=entry_id).update(appointment=appointment)
+                AppointmentNotification.objects.create(
+                    patient_id=patient_id,
+                    appointment=appointment,
+                    subject=f"A slot opened up on {date:%d %b %Y} at {time:%H:%M}",
+                    message="An appointment slot you were waiting for became available and has been booked for you. "
+                            "Cancel it from your appointments if it no longer suits you.",
+                )
+                return appointment
+        except SlotUnavailable:
+            # Someone booked the slot first, or it lies beyond the slot
+            # calendar; the entry claim was rolled back
+            return None
+    return None
+
+
+def offer_slots(doctor_user_id: int, slots: Iterable[Tuple[datetime.date, datetime.time]]):
+    """Offer several freed slots of one doctor, skipping the lot with one query if nobody waits for those dates."""
+    slots = sorted(slots)
+    if not slots or not WaitlistEntry.objects.filter(
+        doctor_id=doctor_user_id,
+        status=WaitlistEntry.Status.WAITING,
+        earliest_date__lte=slots[-1][0],
+        latest_date__gte=slots[0][0],
+    ).exists():
+        return
+    for date, time in slots:
+        offer_slot(doctor_user_id, date, time)
+
+
+def expire_entries(today: datetime.date = None) -> int:
+    """Mark waiting entries whose window ended before ``today`` as expired; returns how many."""
+    today = today or timezone.localdate()
+    return WaitlistEntry.objects.filter(
+        status=WaitlistEntry.Status.WAITING, latest_date__lt=today
+    ).update(status=WaitlistEntry.Status.EXPIRED)
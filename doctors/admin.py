@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Doctor, DoctorSpecialty, DoctorSchedule, TimeOff
+from .models import Doctor, DoctorSpecialty, DoctorSchedule, TimeOff, FacilityClosure, Slot
 
 @admin.register(Doctor)
 class DoctorAdmin(admin.ModelAdmin):
@@ -21,4 +21,17 @@ class TimeOffAdmin(admin.ModelAdmin):
     list_filter = ('doctor',)
     search_fields = ('doctor__user__username', 'reason')
 
+@admin.register(FacilityClosure)
+class FacilityClosureAdmin(admin.ModelAdmin):
+    list_display = ('reason', 'start_datetime', 'end_datetime')
+    search_fields = ('reason',)
+    date_hierarchy = 'start_datetime'
+
+@admin.register(Slot)
+class SlotAdmin(admin.ModelAdmin):
+    list_display = ('doctor', 'date', 'time', 'state')
+    list_filter = ('state', 'date')
+    search_fields = ('doctor__username',)
+    date_hierarchy = 'date'
+
 admin.site.register(DoctorSpecialty)
@@ -0,0 +1,265 @@
+"""
+Availability engine for doctors' appointment slots.
+
+Working hours, time off and booked appointments are loaded for a set of
+doctors and a date range in a fixed number of queries. Free slots are then
+computed per doctor-day with interval arithmetic on minutes since midnight.
+"""
+
+import datetime
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+Interval = Tuple[int, int]
+
+MINUTES_PER_DAY = 24 * 60
+
+# Reason codes returned by DayAvailability.check
+OUTSIDE_SCHEDULE = 'outside_schedule'
+NOT_A_SLOT = 'not_a_slot'
+TIME_OFF = 'time_off'
+CLOSED = 'closed'
+BOOKED = 'booked'
+
+
+def slot_minutes() -> int:
+    return getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30)
+
+
+def to_minutes(value: datetime.time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def from_minutes(minutes: int) -> datetime.time:
+    return datetime.time(minutes // 60, minutes % 60)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort intervals and merge the ones that overlap or touch."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(intervals: List[Interval], removed: List[Interval]) -> List[Interval]:
+    """Return ``intervals`` minus ``removed``; both must be merged and sorted."""
+    if not removed:
+        return intervals
+    result: List[Interval] = []
+    index = 0
+    for start, end in intervals:
+        while index < len(removed) and removed[index][1] <= start:
+            index += 1
+        cursor = start
+        position = index
+        while position < len(removed) and removed[position][0] < end:
+            removed_start, removed_end = removed[position]
+            if removed_start > cursor:
+                result.append((cursor, removed_start))
+            cursor = max(cursor, removed_end)
+            position += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def overlaps(intervals: List[Interval], start: int, end: int) -> bool:
+    """Return True if [start, end) overlaps any of the merged, sorted ``intervals``."""
+    index = bisect_right(intervals, (start, MINUTES_PER_DAY + 1)) - 1
+    if index >= 0 and intervals[index][1] > start:
+        return True
+    return index + 1 < len(intervals) and intervals[index + 1][0] < end
+
+
+def containing(intervals: List[Interval], start: int, end: int) -> Optional[Interval]:
+    """Return the interval of the merged, sorted ``intervals`` that holds [start, end), if any."""
+    index = bisect_right(intervals, (start, MINUTES_PER_DAY + 1)) - 1
+    if index >= 0 and intervals[index][0] <= start and end <= intervals[index][1]:
+        return intervals[index]
+    return None
+
+
+def weekly_hours(doctor_ids: Iterable[int]) -> Dict[Tuple[int, int], List[Interval]]:
+    """
+    Merged working intervals per (doctor id, weekday), read in one query.
+    A day may have several schedule blocks (split shifts); blocks marked
+    unavailable are left out.
+    """
+    from doctors.models import DoctorSchedule
+
+    working: Dict[Tuple[int, int], List[Interval]] = defaultdict(list)
+    for doctor_id, weekday, start, end in DoctorSchedule.objects.filter(
+        doctor_id__in=list(doctor_ids), is_available=True
+    ).values_list('doctor_id', 'day_of_week', 'start_time', 'end_time'):
+        working[(doctor_id, weekday)].append((to_minutes(start), to_minutes(end)))
+    for key, intervals in working.items():
+        working[key] = merge_intervals(intervals)
+    return working
+
+
+def split_by_day(start: datetime.datetime, end: datetime.datetime, first_date: datetime.date,
+                 last_date: datetime.date) -> Iterator[Tuple[datetime.date, Interval]]:
+    """Yield (local date, minute interval) pieces of [start, end) that fall between the two dates."""
+    start = timezone.localtime(start)
+    end = timezone.localtime(end)
+    date = max(start.date(), first_date)
+    last = min(end.date(), last_date)
+    while date <= last:
+        day_start = to_minutes(start.time()) if date == start.date() else 0
+        day_end = to_minutes(end.time()) if date == end.date() else MINUTES_PER_DAY
+        if day_start < day_end:
+            yield date, (day_start, day_end)
+        date += datetime.timedelta(days=1)
+
+
+class DayAvailability:
+    """
+    One doctor's working hours, time off and bookings on one date, plus the
+    facility closures of that date, as merged lists of (start, end) minute
+    intervals.
+    """
+
+    def __init__(self, date: datetime.date, working: List[Interval], time_off: List[Interval],
+                 booked: List[Interval], length: int, closed: Optional[List[Interval]] = None):
+        self.date = date
+        self.working = working
+        self.time_off = time_off
+        self.booked = booked
+        self.length = length
+        self.closed = closed or []
+
+    def free_intervals(self) -> List[Interval]:
+        free = subtract_intervals(subtract_intervals(self.working, self.closed), self.time_off)
+        return subtract_intervals(free, self.booked)
+
+    def slot_starts(self) -> List[int]:
+        """Return the start of every free slot, aligned to the start of its working block."""
+        starts = []
+        blocks = self.working
+        block = 0
+        for start, end in self.free_intervals():
+            while blocks[block][1] < end:
+                block += 1
+            origin = blocks[block][0]
+            first = origin + -(-(start - origin) // self.length) * self.length
+            starts.extend(range(first, end - self.length + 1, self.length))
+        return starts
+
+    def slots(self) -> List[datetime.time]:
+        return [from_minutes(minutes) for minutes in self.slot_starts()]
+
+    def grid(self) -> List[int]:
+        """Return the start of every slot in working hours, free or not."""
+        starts = []
+        for start, end in self.working:
+            starts.extend(range(start, end - self.length + 1, self.length))
+        return starts
+
+    def check(self, time: datetime.time) -> Optional[str]:
+        """Return None if a slot starting at ``time`` is free, otherwise a reason code."""
+        start = to_minutes(time)
+        end = start + self.length
+        block = containing(self.working, start, end)
+        if block is None:
+            return OUTSIDE_SCHEDULE
+        if (start - block[0]) % self.length:
+            return NOT_A_SLOT
+        return self.conflict(start)
+
+    def conflict(self, start: int) -> Optional[str]:
+        """Return CLOSED, TIME_OFF or BOOKED if the slot starting ``start`` minutes after midnight clashes, else None."""
+        end = start + self.length
+        if overlaps(self.closed, start, end):
+            return CLOSED
+        if overlaps(self.time_off, start, end):
+            return TIME_OFF
+        if overlaps(self.booked, start, end):
+            return BOOKED
+        return None
+
+    def is_free(self, time: datetime.time) -> bool:
+        return self.check(time) is None
+
+
+class Availability:
+    """
+    Availability of a set of doctors over an inclusive date range.
+
+    Construction runs at most three queries (schedules, time off,
+    appointments) no matter how many doctors or days are covered, and none
+    for time off already in the time-off index. Facility closures come from
+    their own cache. ``day`` and ``slots`` are then answered from memory.
+    """
+
+    def __init__(self, doctors: Iterable, start_date: datetime.date, end_date: datetime.date,
+                 length: Optional[int] = None):
+        from appointments.models import Appointment
+        from doctors.closures import closed_by_date
+        from doctors.time_off_index import get_time_off_index
+
+        self.start_date = start_date
+        self.end_date = end_date
+        self.length = length or slot_minutes()
+        self.doctors = {doctor.pk: doctor for doctor in doctors}
+        doctor_ids = list(self.doctors)
+        doctor_by_user = {doctor.user_id: doctor.pk for doctor in self.doctors.values()}
+
+        # (doctor id, weekday) -> working intervals
+        self._working = weekly_hours(doctor_ids)
+
+        # (doctor id, date) -> time off intervals, clipped to each local day
+        self._time_off: Dict[Tuple[int, datetime.date], List[Interval]] = defaultdict(list)
+        range_start = timezone.make_aware(datetime.datetime.combine(start_date, datetime.time.min))
+        range_end = timezone.make_aware(datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min))
+        for doctor_id, index in get_time_off_index().for_doctors(doctor_ids).items():
+            for start, end in index.overlapping(range_start, range_end):
+                for date, interval in split_by_day(start, end, start_date, end_date):
+                    self._time_off[(doctor_id, date)].append(interval)
+        for key, intervals in self._time_off.items():
+            self._time_off[key] = merge_intervals(intervals)
+
+        # date -> facility closure intervals, shared by every doctor
+        self._closed = closed_by_date(start_date, end_date)
+
+        # (doctor id, date) -> booked intervals
+        self._booked: Dict[Tuple[int, datetime.date], List[Interval]] = defaultdict(list)
+        for user_id, date, time in Appointment.objects.filter(
+            doctor_id__in=list(doctor_by_user), date__range=(start_date, end_date)
+        ).exclude(status=Appointment.CANCELLED).values_list('doctor_id', 'date', 'time'):
+            start = to_minutes(time)
+            self._booked[(doctor_by_user[user_id], date)].append((start, start + self.length))
+        for key, intervals in self._booked.items():
+            self._booked[key] = merge_intervals(intervals)
+
+    def dates(self) -> List[datetime.date]:
+        days = (self.end_date - self.start_date).days + 1
+        return [self.start_date + datetime.timedelta(days=offset) for offset in range(days)]
+
+    def day(self, doctor_id: int, date: datetime.date) -> DayAvailability:
+        return DayAvailability(
+            date,
+            self._working.get((doctor_id, date.weekday()), []),
+            self._time_off.get((doctor_id, date), []),
+            self._booked.get((doctor_id, date), []),
+            self.length,
+            self._closed.get(date, []),
+        )
+
+    def slots(self, doctor_id: int, date: datetime.date) -> List[datetime.time]:
+        return self.day(doctor_id, date).slots()
+
+
+def day_availability(doctor, date: datetime.date) -> DayAvailability:
+    """Return a single doctor-day, loaded in at most three queries."""
+    return Availability([doctor], date, date).day(doctor.pk, date)
@@ -0,0 +1,40 @@
+"""
+System checks for the availability caches.
+
+Signal handlers invalidate the slot cache, time-off index and closure
+calendar only in the backend the writing process sees. A process-local
+backend therefore leaves other workers serving stale availability until the
+entries expire, so such a backend is only accepted with short timeouts.
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+# Longest entry lifetime (seconds) accepted for a process-local backend
+LOCAL_TIMEOUT_LIMIT = 300
+
+
+@register(Tags.caches)
+def check_slot_cache_backend(app_configs, **kwargs):
+    alias = getattr(settings, 'SLOT_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_BACKENDS:
+        return []
+    timeouts = {
+        name: getattr(settings, name, 3600)
+        for name in ('SLOT_CACHE_TIMEOUT', 'TIME_OFF_INDEX_TIMEOUT', 'FACILITY_CLOSURE_CACHE_TIMEOUT')
+    }
+    too_long = sorted(name for name, timeout in timeouts.items() if timeout > LOCAL_TIMEOUT_LIMIT)
+    if not too_long:
+        return []
+    return [Warning(
+        f"The '{alias}' cache is local to each process, so other workers keep stale availability for up to "
+        f"{max(timeouts.values())} seconds after a change.",
+        hint=f"Point CACHE_URL at a shared backend, or set {', '.join(too_long)} to {LOCAL_TIMEOUT_LIMIT} or less.",
+        id='doctors.W001',
+    )]
@@ -0,0 +1,57 @@
+"""
+Facility-wide closures (public holidays, building works) shared by every
+doctor.
+
+The whole closure calendar is one small MergedIntervals kept under a single
+key in the slot cache's backend, so availability reads it once per date range
+however many doctors are involved, instead of every doctor carrying a TimeOff
+row per holiday. Slot cache entries do not include closures; they are
+applied when an entry is read, so changing a closure only drops this one key
+(and re-syncs the slot calendar, see doctors.signals).
+"""
+
+import datetime
+from collections import defaultdict
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from doctors.availability import Interval, merge_intervals, split_by_day
+from doctors.time_off_index import MergedIntervals
+
+CLOSURES_KEY = 'facility-closures'
+
+
+def _cache():
+    return caches[getattr(settings, 'SLOT_CACHE_ALIAS', 'default')]
+
+
+def facility_closures() -> MergedIntervals:
+    """Every facility closure, merged; loaded in one query on a cache miss."""
+    from doctors.models import FacilityClosure
+
+    closures = _cache().get(CLOSURES_KEY)
+    if closures is None:
+        closures = MergedIntervals.from_rows(FacilityClosure.objects.values_list('start_datetime', 'end_datetime'))
+        _cache().set(CLOSURES_KEY, closures, getattr(settings, 'FACILITY_CLOSURE_CACHE_TIMEOUT', 3600))
+    return closures
+
+
+def closed_by_date(start_date: datetime.date, end_date: datetime.date) -> Dict[datetime.date, List[Interval]]:
+    """Closed minute intervals per local date between the two dates (inclusive)."""
+    range_start = timezone.make_aware(datetime.datetime.combine(start_date, datetime.time.min))
+    range_end = timezone.make_aware(datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min))
+    closed = defaultdict(list)
+    for start, end in facility_closures().overlapping(range_start, range_end):
+        for date, interval in split_by_day(start, end, start_date, end_date):
+            closed[date].append(interval)
+    return {date: merge_intervals(intervals) for date, intervals in closed.items()}
+
+
+def invalidate_closures():
+    """Drop the cached closure calendar, now and again on commit."""
+    _cache().delete(CLOSURES_KEY)
+    transaction.on_commit(lambda: _cache().delete(CLOSURES_KEY))
@@ -0,0 +1,111 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from appointments.models import Appointment
+from doctors.availability import Availability
+from doctors.models import Doctor, DoctorSchedule, TimeOff
+from doctors.synthetic import create_synthetic_doctors, isolated_cache
+from users.models import User
+
+
+def legacy_available_slots(doctor_id, date_obj):
+    """The per-doctor, per-day lookup the available_slots view used to do."""
+    user = User.objects.get(pk=doctor_id, role='DOCTOR')
+    doctor = Doctor.objects.get(user=user)
+    try:
+        schedule = DoctorSchedule.objects.get(doctor=doctor, day_of_week=date_obj.weekday(), is_available=True)
+    except DoctorSchedule.DoesNotExist:
+        return []
+    if TimeOff.objects.filter(
+        doctor=doctor,
+        start_datetime__lte=timezone.make_aware(datetime.datetime.combine(date_obj, schedule.end_time)),
+        end_datetime__gte=timezone.make_aware(datetime.datetime.combine(date_obj, schedule.start_time)),
+    ).exists():
+        return []
+    booked_times = set(Appointment.objects.filter(doctor=user, date=date_obj).values_list('time', flat=True))
+    slots = []
+    slot_length = datetime.timedelta(minutes=30)
+    current_time = datetime.datetime.combine(date_obj, schedule.start_time)
+    end_time = datetime.datetime.combine(date_obj, schedule.end_time)
+    while current_time + slot_length <= end_time:
+        slot_str = current_time.strftime('%H:%M')
+        if slot_str not in booked_times:
+            slots.append(slot_str)
+        current_time += slot_length
+    return slots
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the availability engine against per-doctor, per-day lookups on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--doctors',
+            type=int,
+            default=500,
+            help='Number of synthetic doctors (default: 500)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Number of days in the range (default: 90)'
+        )
+        parser.add_argument(
+            '--legacy-doctors',
+            type=int,
+            default=10,
+            help='Doctors to time with the per-day lookups; the total is extrapolated (default: 10)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1234,
+            help='Random seed for the synthetic data (default: 1234)'
+        )
+
+    def handle(self, *args, **options):
+        start_date = timezone.localdate() + datetime.timedelta(days=1)
+        end_date = start_date + datetime.timedelta(days=options['days'] - 1)
+
+        with isolated_cache(), transaction.atomic():
+            doctors = list(create_synthetic_doctors(options['doctors'], start_date, options['days'], options['seed']))
+            self.stdout.write(
+                f'Created {len(doctors)} doctors, {DoctorSchedule.objects.count()} schedules, '
+                f'{TimeOff.objects.count()} time-off blocks, {Appointment.objects.count()} appointments'
+            )
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                availability = Availability(doctors, start_date, end_date)
+                loaded = time.perf_counter() - start
+                slot_count = sum(
+                    len(availability.slots(doctor.pk, date)) for doctor in doctors for date in availability.dates()
+                )
+                elapsed = time.perf_counter() - start
+            doctor_days = len(doctors) * options['days']
+            self.stdout.write(
+                f'    engine: {elapsed * 1000:,.0f} ms for {doctor_days:,} doctor-days '
+                f'({loaded * 1000:,.0f} ms loading, {len(queries)} queries), {slot_count:,} free slots'
+            )
+
+            sample = doctors[:options['legacy_doctors']]
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                for doctor in sample:
+                    for date in availability.dates():
+                        legacy_available_slots(doctor.user_id, date)
+                elapsed = time.perf_counter() - start
+            sample_days = len(sample) * options['days']
+            if sample_days:
+                self.stdout.write(
+                    f'    legacy: {elapsed * 1000:,.0f} ms for {sample_days:,} doctor-days '
+                    f'({len(queries)} queries), ~{elapsed / sample_days * doctor_days:,.1f} s extrapolated'
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,97 @@
+import datetime
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from doctors.availability import Availability
+from doctors.search import AvailabilityWindows, earliest_slots
+from doctors.slot_cache import get_slot_cache
+from doctors.synthetic import SPECIALTIES, create_synthetic_doctors, isolated_cache
+from doctors.views import filter_by_specialty
+
+
+def full_scan_earliest_slots(doctors, count, days=90):
+    """Load the whole horizon for every doctor and sort it, for comparison."""
+    now = timezone.localtime()
+    availability = Availability(doctors, now.date(), now.date() + datetime.timedelta(days=days))
+    found = []
+    for doctor in doctors:
+        for date in availability.dates():
+            for slot in availability.slots(doctor.pk, date):
+                if (date, slot) >= (now.date(), now.time().replace(second=0, microsecond=0)):
+                    found.append((date, slot, doctor.user_id))
+    return sorted(found)[:count]
+
+
+class Command(BaseCommand):
+    help = 'Measure earliest-available-slot search latency across a specialty on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--doctors',
+            type=int,
+            default=600,
+            help='Number of synthetic doctors (default: 600)'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=20,
+            help='Timed searches per case (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        from doctors.models import Doctor, DoctorSchedule
+
+        with isolated_cache() as cache, transaction.atomic():
+            create_synthetic_doctors(options['doctors'], timezone.localdate(), 90)
+            for specialty in (SPECIALTIES[0], None):
+                doctors = Doctor.objects.all()
+                if specialty:
+                    doctors = filter_by_specialty(doctors, specialty)
+                doctors = list(doctors)
+                label = f'{specialty or "all specialties"} ({len(doctors)} doctors)'
+                for count in (1, 10, 50):
+                    expected = full_scan_earliest_slots(doctors, count)
+                    for cached in (False, True):
+                        timings = []
+                        for _ in range(options['runs']):
+                            if not cached:
+                                cache.clear()
+                            with CaptureQueriesContext(connection) as queries:
+                                start = time.perf_counter()
+                                found = earliest_slots(doctors, count)
+                                timings.append(time.perf_counter() - start)
+                        if found != expected:
+                            raise CommandError(f'{label}, N={count}: merge result differs from the full scan')
+                        self.stdout.write(
+                            f'{label:>36} N={count:<3} {"warm" if cached else "cold"} cache: '
+                            f'median {statistics.median(timings) * 1000:7.1f} ms, {len(queries)} queries'
+                        )
+                start = time.perf_counter()
+                full_scan_earliest_slots(doctors, 10)
+                self.stdout.write(f'{label:>36} full 90-day scan: {(time.perf_counter() - start) * 1000:7.1f} ms')
+
+            # Doctors with no free slot must not pull later windows in
+            doctors = list(filter_by_specialty(Doctor.objects.all(), SPECIALTIES[0]))
+            DoctorSchedule.objects.filter(doctor__in=doctors[:len(doctors) // 2]).delete()
+            cache.clear()
+            loaded = []
+
+            def loader(*args):
+                loaded.append(args)
+                return get_slot_cache().availability(*args)
+
+            found = earliest_slots(doctors, 10, loader=loader)
+            today = timezone.localdate()
+            if found != full_scan_earliest_slots(doctors, 10):
+                raise CommandError('Idle doctors: merge result differs from the full scan')
+            self.stdout.write(
+                f'{len(doctors) // 2} of {len(doctors)} {SPECIALTIES[0]} doctors without hours, N=10: '
+                f'{len(loaded)} of {len(AvailabilityWindows(doctors, today, today + datetime.timedelta(days=90), 7))} windows loaded'
+            )
+            transaction.set_rollback(True)
@@ -0,0 +1,114 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from doctors.models import TimeOff
+from doctors.synthetic import create_synthetic_doctors, isolated_cache
+from doctors.time_off_index import MergedIntervals, get_time_off_index
+
+
+def filter_overlaps(doctor_id, start, end):
+    """The per-slot overlap filter the booking checks used to run."""
+    return TimeOff.objects.filter(doctor_id=doctor_id, start_datetime__lt=end, end_datetime__gt=start).exists()
+
+
+def filter_overlapping(doctor_id, start, end):
+    rows = TimeOff.objects.filter(
+        doctor_id=doctor_id, start_datetime__lt=end, end_datetime__gt=start
+    ).values_list('start_datetime', 'end_datetime')
+    return MergedIntervals.from_rows(rows).overlapping(start, end)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the time-off interval index against TimeOff overlap filters on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--doctors',
+            type=int,
+            default=20,
+            help='Number of synthetic doctors (default: 20)'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=2000,
+            help='Time-off rows per doctor, spread over the past years (default: 2000)'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=2000,
+            help='Overlap checks per case (default: 2000)'
+        )
+
+    def _time(self, label, function, probes):
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for probe in probes:
+                start = time.perf_counter()
+                function(*probe)
+                timings.append(time.perf_counter() - start)
+        self.stdout.write(
+            f'{label:>32}: median {statistics.median(timings) * 1e6:8.1f} us, '
+            f'{len(queries) / len(probes):.1f} queries per check'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(4321)
+        now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        with isolated_cache(), transaction.atomic():
+            doctor_ids = list(create_synthetic_doctors(options['doctors'], timezone.localdate(), 90).values_list('pk', flat=True))
+            rows = []
+            for doctor_id in doctor_ids:
+                for _ in range(options['rows']):
+                    begin = now - datetime.timedelta(hours=rng.randrange(5 * 365 * 24))
+                    rows.append(TimeOff(
+                        doctor_id=doctor_id,
+                        start_datetime=begin,
+                        end_datetime=begin + datetime.timedelta(hours=rng.choice((1, 4, 24))),
+                        reason='Benchmark',
+                    ))
+            TimeOff.objects.bulk_create(rows, batch_size=1000)
+            self.stdout.write(f'{len(doctor_ids)} doctors, {TimeOff.objects.count()} time-off rows')
+
+            slots = []
+            ranges = []
+            for _ in range(options['queries']):
+                doctor_id = rng.choice(doctor_ids)
+                start = now + datetime.timedelta(minutes=30 * rng.randrange(-5 * 365 * 48, 90 * 48))
+                slots.append((doctor_id, start, start + datetime.timedelta(minutes=30)))
+                ranges.append((doctor_id, start, start + datetime.timedelta(days=90)))
+
+            index = get_time_off_index()
+            for doctor_id in doctor_ids:
+                index.invalidate(doctor_id)
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                indexes = index.for_doctors(doctor_ids)
+            self.stdout.write(
+                f'{"index load (all doctors)":>32}: {(time.perf_counter() - start) * 1000:8.1f} ms, '
+                f'{len(queries)} queries, {sum(len(entry) for entry in indexes.values())} merged intervals'
+            )
+
+            for doctor_id, begin, end in slots:
+                if filter_overlaps(doctor_id, begin, end) != indexes[doctor_id].overlaps(begin, end):
+                    raise CommandError(f'Slot check differs for doctor {doctor_id} at {begin}')
+            for doctor_id, begin, end in ranges[:200]:
+                if filter_overlapping(doctor_id, begin, end) != indexes[doctor_id].overlapping(begin, end):
+                    raise CommandError(f'Range check differs for doctor {doctor_id} from {begin}')
+
+            self._time('slot check, filter', filter_overlaps, slots)
+            self._time('slot check, index', lambda d, s, e: index.for_doctor(d).overlaps(s, e), slots)
+            self._time('90-day range, filter', filter_overlapping, ranges)
+            self._time('90-day range, index', lambda d, s, e: index.for_doctor(d).overlapping(s, e), ranges)
+
+            for doctor_id in doctor_ids:
+                index.invalidate(doctor_id)
+            transaction.set_rollback(True)
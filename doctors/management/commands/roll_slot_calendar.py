@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from doctors.models import Doctor, Slot
+from doctors.slot_calendar import DOCTOR_BATCH_SIZE, calendar_horizon, sync_all_slots
+
+
+class Command(BaseCommand):
+    help = 'Roll the materialized slot calendar forward: drop past slots and sync every doctor over the booking horizon (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DOCTOR_BATCH_SIZE,
+            help=f'Doctors synced per batch (default: {DOCTOR_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        first, last = calendar_horizon()
+        removed, _ = Slot.objects.filter(date__lt=first).delete()
+        self.stdout.write(f'Removed {removed} past slots.')
+
+        totals = sync_all_slots(first, last, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Synced {Doctor.objects.count()} doctors from {first} to {last}: '
+            f'{totals["created"]} slots created, {totals["updated"]} updated, {totals["deleted"]} deleted.'
+        ))
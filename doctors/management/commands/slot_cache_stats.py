@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from doctors.slot_cache import get_slot_cache
+
+
+class Command(BaseCommand):
+    help = 'Show the slot cache hit/miss counters recorded by every worker sharing the cache backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after printing them'
+        )
+
+    def handle(self, *args, **options):
+        slot_cache = get_slot_cache()
+        stats = slot_cache.stats()
+        backend = settings.CACHES[slot_cache.alias]['BACKEND']
+        self.stdout.write(f' backend: {backend} (entries kept {slot_cache.timeout} s)')
+        self.stdout.write(f'    hits: {stats["hits"]:,}')
+        self.stdout.write(f'  misses: {stats["misses"]:,}')
+        self.stdout.write(f'hit rate: {stats["hit_rate"]:.1%}')
+        if getattr(settings, 'PROCESS_LOCAL_CACHE', False):
+            self.stdout.write(self.style.WARNING(
+                'The cache backend is local to each process: these counters only cover this command.'
+            ))
+        if options['reset']:
+            slot_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
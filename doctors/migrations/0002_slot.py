@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Slot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('state', models.CharField(choices=[('OPEN', 'Open'), ('BOOKED', 'Booked'), ('BLOCKED', 'Blocked')], default='OPEN', max_length=10)),
+                ('doctor', models.ForeignKey(limit_choices_to={'role': 'DOCTOR'}, on_delete=django.db.models.deletion.CASCADE, related_name='slots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['doctor', 'date', 'time'],
+                'indexes': [models.Index(fields=['state', 'date', 'time'], name='doctors_slo_state_a5eb9b_idx')],
+                'unique_together': {('doctor', 'date', 'time')},
+            },
+        ),
+    ]
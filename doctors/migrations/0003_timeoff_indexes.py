@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0002_slot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timeoff',
+            index=models.Index(fields=['doctor', 'start_datetime', 'end_datetime'], name='doctors_tim_doctor__aed92b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeoff',
+            index=models.Index(fields=['doctor', 'end_datetime'], name='doctors_tim_doctor__60e13f_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0003_timeoff_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='doctorschedule',
+            unique_together=set(),
+        ),
+        migrations.AddIndex(
+            model_name='doctorschedule',
+            index=models.Index(fields=['doctor', 'day_of_week', 'start_time'], name='doctors_doc_doctor__e2cefa_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0004_split_shift_schedules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacilityClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_datetime', models.DateTimeField()),
+                ('end_datetime', models.DateTimeField()),
+                ('reason', models.CharField(help_text='e.g., Public holiday, Building maintenance', max_length=255)),
+            ],
+            options={
+                'ordering': ['start_datetime'],
+            },
+        ),
+    ]
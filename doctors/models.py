@@ -20,8 +20,9 @@ class Doctor(models.Model):
 
 class DoctorSchedule(models.Model):
     """
-    Represents a doctor's recurring weekly work schedule.
-    e.g., Dr. Smith works Mondays from 9:00 to 17:00.
+    Represents one block of a doctor's recurring weekly work schedule.
+    e.g., Dr. Smith works Mondays from 9:00 to 12:00 and from 14:00 to 17:00.
+    A day can have any number of blocks as long as they do not overlap.
     """
     class DayOfWeek(models.IntegerChoices):
         MONDAY = 0, _('Monday')
@@ -39,16 +40,36 @@ class DoctorSchedule(models.Model):
     is_available = models.BooleanField(default=True)
 
     class Meta:
-        unique_together = ('doctor', 'day_of_week')
         ordering = ['doctor', 'day_of_week', 'start_time']
+        indexes = [
+            models.Index(fields=['doctor', 'day_of_week', 'start_time']),
+        ]
 
     def __str__(self):
         availability = "Available" if self.is_available else "Unavailable"
         return f"{self.doctor.user.get_full_name()}: {self.get_day_of_week_display()} ({self.start_time.strftime('%H:%M')} - {self.end_time.strftime('%H:%M')}) - {availability}"
 
     def clean(self):
+        # Slots are computed in whole minutes
+        if self.start_time:
+            self.start_time = self.start_time.replace(second=0, microsecond=0)
+        if self.end_time:
+            self.end_time = self.end_time.replace(second=0, microsecond=0)
         if self.start_time and self.end_time and self.start_time >= self.end_time:
             raise ValidationError(_('Start time must be before end time.'))
+        if self.doctor_id is not None and self.day_of_week is not None and self.start_time and self.end_time:
+            clash = DoctorSchedule.objects.filter(
+                doctor_id=self.doctor_id,
+                day_of_week=self.day_of_week,
+                start_time__lt=self.end_time,
+                end_time__gt=self.start_time,
+            ).exclude(pk=self.pk).first()
+            if clash:
+                raise ValidationError(_('This block overlaps your %(day)s block from %(start)s to %(end)s.') % {
+                    'day': clash.get_day_of_week_display(),
+                    'start': clash.start_time.strftime('%H:%M'),
+                    'end': clash.end_time.strftime('%H:%M'),
+                })
 
 class TimeOff(models.Model):
     """
@@ -62,6 +83,10 @@ class TimeOff(models.Model):
 
     class Meta:
         ordering = ['start_datetime']
+        indexes = [
+            models.Index(fields=['doctor', 'start_datetime', 'end_datetime']),
+            models.Index(fields=['doctor', 'end_datetime']),
+        ]
 
     def __str__(self):
         return f"Time Off for {self.doctor.user.get_full_name()}: {self.start_datetime.strftime('%Y-%m-%d %H:%M')} to {self.end_datetime.strftime('%Y-%m-%d %H:%M')}"
@@ -70,6 +95,50 @@ class TimeOff(models.Model):
         if self.start_datetime and self.end_datetime and self.start_datetime >= self.end_datetime:
             raise ValidationError(_('Start datetime must be before end datetime.'))
 
+class FacilityClosure(models.Model):
+    """
+    A period the whole hospital is closed to appointments, for every doctor.
+    e.g., Christmas Day from 00:00 on 2024-12-25 to 00:00 on 2024-12-26.
+    """
+    start_datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField()
+    reason = models.CharField(max_length=255, help_text="e.g., Public holiday, Building maintenance")
+
+    class Meta:
+        ordering = ['start_datetime']
+
+    def __str__(self):
+        return f"{self.reason}: {self.start_datetime.strftime('%Y-%m-%d %H:%M')} to {self.end_datetime.strftime('%Y-%m-%d %H:%M')}"
+
+    def clean(self):
+        if self.start_datetime and self.end_datetime and self.start_datetime >= self.end_datetime:
+            raise ValidationError(_('Start datetime must be before end datetime.'))
+
+class Slot(models.Model):
+    """
+    One bookable slot of the materialized slot calendar, kept for every doctor
+    over the booking horizon by doctors.slot_calendar.
+    """
+    class State(models.TextChoices):
+        OPEN = 'OPEN', _('Open')
+        BOOKED = 'BOOKED', _('Booked')
+        BLOCKED = 'BLOCKED', _('Blocked')
+
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'DOCTOR'}, related_name='slots')
+    date = models.DateField()
+    time = models.TimeField()
+    state = models.CharField(max_length=10, choices=State.choices, default=State.OPEN)
+
+    class Meta:
+        unique_together = ('doctor', 'date', 'time')
+        ordering = ['doctor', 'date', 'time']
+        indexes = [
+            models.Index(fields=['state', 'date', 'time']),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor.get_full_name()}: {self.date} {self.time.strftime('%H:%M')} ({self.get_state_display()})"
+
 class DoctorSpecialty(models.Model):
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE)
     specialty = models.CharField(max_length=100, default='General Medicine')
@@ -0,0 +1,79 @@
+"""
+Earliest-available-slot search across many doctors.
+
+Availability is read in windows of a few days for all doctors at once, and
+the windows are walked in date order as a shared frontier. Within a window
+each doctor's free slots form a stream ordered by (date, time), and the
+streams are combined with a heap-based k-way merge (heapq.merge). The next
+window is only loaded while fewer than the requested number of slots have
+been found, so doctors without free slots never pull in later windows.
+"""
+
+import datetime
+import heapq
+from itertools import islice
+from typing import Callable, Iterator, List, Tuple
+
+from django.utils import timezone
+
+from doctors.availability import from_minutes, to_minutes
+from doctors.slot_cache import get_slot_cache
+
+SlotMatch = Tuple[datetime.date, datetime.time, int]
+
+
+class AvailabilityWindows:
+    """Consecutive date windows of availability for a set of doctors, loaded on first use."""
+
+    def __init__(self, doctors, start_date: datetime.date, end_date: datetime.date, window_days: int,
+                 loader: Callable = None):
+        self.doctors = doctors
+        self.start_date = start_date
+        self.end_date = end_date
+        self.window_days = window_days
+        self.loader = loader or get_slot_cache().availability
+        self._windows = {}
+
+    def __len__(self):
+        return -(-((self.end_date - self.start_date).days + 1) // self.window_days)
+
+    def __getitem__(self, index: int):
+        if index not in self._windows:
+            first = self.start_date + datetime.timedelta(days=index * self.window_days)
+            last = min(first + datetime.timedelta(days=self.window_days - 1), self.end_date)
+            self._windows[index] = self.loader(self.doctors, first, last)
+        return self._windows[index]
+
+    @property
+    def loaded(self) -> int:
+        return len(self._windows)
+
+
+def window_stream(availability, doctor, not_before: datetime.datetime) -> Iterator[SlotMatch]:
+    """Yield one doctor's free slots in one window in (date, time) order, skipping those before ``not_before``."""
+    today = not_before.date()
+    now_minutes = to_minutes(not_before.time())
+    for date in availability.dates():
+        day = availability.day(doctor.pk, date)
+        for start in day.slot_starts():
+            if date == today and start < now_minutes:
+                continue
+            yield date, from_minutes(start), doctor.user_id
+
+
+def earliest_slots(doctors, count: int, days: int = 90, window_days: int = 7,
+                   loader: Callable = None) -> List[SlotMatch]:
+    """
+    Return up to ``count`` (date, time, doctor user id) tuples: the earliest
+    free slots across ``doctors`` from now until ``days`` days ahead.
+    """
+    doctors = list(doctors)
+    now = timezone.localtime()
+    windows = AvailabilityWindows(doctors, now.date(), now.date() + datetime.timedelta(days=days), window_days, loader)
+    found = []
+    for index in range(len(windows)):
+        if len(found) >= count:
+            break
+        streams = [window_stream(windows[index], doctor, now) for doctor in doctors]
+        found.extend(islice(heapq.merge(*streams), count - len(found)))
+    return found
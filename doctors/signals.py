@@ -0,0 +1,157 @@
+"""
+Keep the slot cache, the time-off index, the facility closure calendar and
+the materialized slot calendar in step with schedules, time off, closures
+and appointments.
+
+pre_save remembers the stored version of an updated schedule, time off or
+closure row so both the old and the new doctor-days are refreshed when a row
+moves. Appointments carry their stored status and slot from
+Appointment.from_db instead, and a save only touches the slot calendar when
+the appointment moves or starts or stops holding its slot: the affected rows
+are flipped with mark_open/mark_booked rather than re-synced.
+"""
+
+import datetime
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from appointments.models import Appointment
+from doctors.closures import invalidate_closures
+from doctors.models import Doctor, DoctorSchedule, FacilityClosure, TimeOff
+from doctors.slot_cache import get_slot_cache
+from doctors.slot_calendar import (
+    calendar_horizon, mark_booked, mark_open, refresh_all_doctor_days, refresh_doctor_days,
+)
+from doctors.time_off_index import get_time_off_index
+
+
+def _doctor_user_id(doctor_id):
+    return Doctor.objects.filter(pk=doctor_id).values_list('user_id', flat=True).first()
+
+
+def _remember_previous(sender, instance, fields):
+    instance._slot_cache_previous = None
+    if instance.pk:
+        instance._slot_cache_previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def _weekday_dates(weekday):
+    first, last = calendar_horizon()
+    date = first + datetime.timedelta(days=(weekday - first.weekday()) % 7)
+    dates = []
+    while date <= last:
+        dates.append(date)
+        date += datetime.timedelta(days=7)
+    return dates
+
+
+def _local_dates(start, end):
+    date = timezone.localtime(start).date()
+    last = timezone.localtime(end).date()
+    dates = []
+    while date <= last:
+        dates.append(date)
+        date += datetime.timedelta(days=1)
+    return dates
+
+
+@receiver(pre_save, sender=DoctorSchedule)
+def remember_schedule(sender, instance, **kwargs):
+    _remember_previous(sender, instance, ('doctor_id', 'day_of_week'))
+
+
+@receiver(post_save, sender=DoctorSchedule)
+@receiver(post_delete, sender=DoctorSchedule)
+def schedule_changed(sender, instance, **kwargs):
+    slot_cache = get_slot_cache()
+    previous = getattr(instance, '_slot_cache_previous', None)
+    for row in (previous, {'doctor_id': instance.doctor_id, 'day_of_week': instance.day_of_week}):
+        user_id = row and _doctor_user_id(row['doctor_id'])
+        if user_id:
+            slot_cache.invalidate_weekday(user_id, row['day_of_week'])
+            refresh_doctor_days(user_id, _weekday_dates(row['day_of_week']))
+
+
+@receiver(pre_save, sender=TimeOff)
+def remember_time_off(sender, instance, **kwargs):
+    _remember_previous(sender, instance, ('doctor_id', 'start_datetime', 'end_datetime'))
+
+
+@receiver(post_save, sender=TimeOff)
+@receiver(post_delete, sender=TimeOff)
+def time_off_changed(sender, instance, **kwargs):
+    slot_cache = get_slot_cache()
+    previous = getattr(instance, '_slot_cache_previous', None)
+    current = {'doctor_id': instance.doctor_id, 'start_datetime': instance.start_datetime, 'end_datetime': instance.end_datetime}
+    for row in (previous, current):
+        if row:
+            get_time_off_index().invalidate(row['doctor_id'])
+        user_id = row and _doctor_user_id(row['doctor_id'])
+        if user_id:
+            slot_cache.invalidate_range(user_id, row['start_datetime'], row['end_datetime'])
+            refresh_doctor_days(user_id, _local_dates(row['start_datetime'], row['end_datetime']))
+
+
+@receiver(pre_save, sender=FacilityClosure)
+def remember_closure(sender, instance, **kwargs):
+    _remember_previous(sender, instance, ('start_datetime', 'end_datetime'))
+
+
+@receiver(post_save, sender=FacilityClosure)
+@receiver(post_delete, sender=FacilityClosure)
+def closure_changed(sender, instance, **kwargs):
+    # Slot cache entries leave closures out, so only the closure calendar and
+    # the materialized slots need refreshing
+    invalidate_closures()
+    previous = getattr(instance, '_slot_cache_previous', None)
+    dates = _local_dates(instance.start_datetime, instance.end_datetime)
+    if previous:
+        dates += _local_dates(previous['start_datetime'], previous['end_datetime'])
+    refresh_all_doctor_days(dates)
+
+
+def _holds_slot(status):
+    return status != Appointment.CANCELLED
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, created, **kwargs):
+    slot_cache = get_slot_cache()
+    current = instance.slot_key()
+    if created:
+        if _holds_slot(instance.status):
+            slot_cache.invalidate(instance.doctor_id, [instance.date])
+            # The booking form claims its slot before saving; this covers other writers
+            if not getattr(instance, '_slot_claimed', False):
+                mark_booked(*current)
+        return
+
+    previous = getattr(instance, '_loaded_slot', None)
+    previous_status = getattr(instance, '_loaded_status', None)
+    if previous is None or previous_status is None:
+        # Not loaded from the database, so what changed is unknown
+        slot_cache.invalidate(instance.doctor_id, [instance.date])
+        refresh_doctor_days(instance.doctor_id, [instance.date])
+        return
+    held, holds = _holds_slot(previous_status), _holds_slot(instance.status)
+    if previous == current and held == holds:
+        # e.g. PENDING -> CONFIRMED: the slot is booked either way
+        return
+    days = set()
+    if held:
+        mark_open(*previous)
+        days.add(previous[:2])
+    if holds:
+        mark_booked(*current)
+        days.add(current[:2])
+    for doctor_id, date in days:
+        slot_cache.invalidate(doctor_id, [date])
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    if _holds_slot(instance.status):
+        get_slot_cache().invalidate(instance.doctor_id, [instance.date])
+        mark_open(instance.doctor_id, instance.date, instance.time)
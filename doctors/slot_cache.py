@@ -0,0 +1,311 @@
+"""
+Cache of per-doctor-day availability in the configured Django cache backend.
+
+Each doctor-day is stored as three bitmaps over the minutes of the day
+(working hours, time off, booked), so "is this slot free" and the list of
+free slots are answered without touching the database on a hit. Entries are
+keyed by the doctor's user id and only kept for dates in
+[today, today + SLOT_CACHE_HORIZON_DAYS]; other dates are always computed.
+Facility closures are not part of an entry: they are applied from
+doctors.closures when the entry is read.
+
+Signal handlers in doctors.signals invalidate exactly the doctor-days
+affected by a saved or deleted DoctorSchedule, TimeOff or Appointment.
+Invalidation never deletes an entry: every doctor-day has a version token
+in the cache, replaced with a fresh one on invalidation, and an entry
+records the token that was current when its fill started. A fill that read
+the database before an invalidation therefore lands under a dead token and
+is ignored, where an unconditional set would have overwritten the newer
+state with the older one. Bulk operations
+(QuerySet.update, bulk_create) bypass signals, and a process-local backend
+only sees its own process's deletions; SLOT_CACHE_TIMEOUT bounds how long
+such changes can go unnoticed, so it should be short unless the backend is
+shared (see doctors.checks).
+
+Hit/miss counters are kept in the same backend, so with a shared backend
+they cover every worker; ``manage.py slot_cache_stats`` prints them.
+"""
+
+import datetime
+import threading
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from doctors.availability import Availability, DayAvailability, Interval, slot_minutes
+from doctors.closures import closed_by_date
+
+
+def intervals_to_bitmap(intervals: Iterable[Interval]) -> int:
+    bits = 0
+    for start, end in intervals:
+        bits |= ((1 << (end - start)) - 1) << start
+    return bits
+
+
+def bitmap_to_intervals(bits: int) -> List[Interval]:
+    intervals = []
+    offset = 0
+    while bits:
+        zeros = (bits & -bits).bit_length() - 1
+        bits >>= zeros
+        offset += zeros
+        ones = (~bits & (bits + 1)).bit_length() - 1
+        intervals.append((offset, offset + ones))
+        bits >>= ones
+        offset += ones
+    return intervals
+
+
+class SlotCache:
+    """
+    Read-through cache of DayAvailability objects with hit/miss counters.
+    """
+
+    STATS_KEYS = {'hits': 'doctor-slots-stats:hits', 'misses': 'doctor-slots-stats:misses'}
+
+    def __init__(self, alias: str = 'default', timeout: int = 3600, horizon_days: int = 90):
+        self.alias = alias
+        self.timeout = timeout
+        self.horizon_days = horizon_days
+
+    @classmethod
+    def from_settings(cls) -> 'SlotCache':
+        return cls(
+            alias=getattr(settings, 'SLOT_CACHE_ALIAS', 'default'),
+            timeout=getattr(settings, 'SLOT_CACHE_TIMEOUT', 3600),
+            horizon_days=getattr(settings, 'SLOT_CACHE_HORIZON_DAYS', 90),
+        )
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, doctor_user_id: int, date: datetime.date, length: Optional[int] = None) -> str:
+        return f'doctor-slots:{length or slot_minutes()}:{doctor_user_id}:{date.isoformat()}'
+
+    def version_key(self, doctor_user_id: int, date: datetime.date) -> str:
+        # Shared by every slot length, so one invalidation covers them all
+        return f'doctor-slots-version:{doctor_user_id}:{date.isoformat()}'
+
+    def horizon(self) -> Tuple[datetime.date, datetime.date]:
+        today = timezone.localdate()
+        return today, today + datetime.timedelta(days=self.horizon_days)
+
+    def cacheable(self, date: datetime.date) -> bool:
+        first, last = self.horizon()
+        return first <= date <= last
+
+    def get_day(self, doctor_user_id: int, date: datetime.date) -> DayAvailability:
+        """
+        Return one doctor-day. Raises Doctor.DoesNotExist on a miss for an
+        unknown doctor.
+        """
+        from doctors.models import Doctor
+
+        length = slot_minutes()
+        versions = {}
+        if self.cacheable(date):
+            entries, versions = self._lookup([(doctor_user_id, date)], length)
+            if entries:
+                self._count(hits=1)
+                return self._decode(date, entries[(doctor_user_id, date)], length, closed_by_date(date, date).get(date))
+        self._count(misses=1)
+        doctor = Doctor.objects.get(user_id=doctor_user_id)
+        day = Availability([doctor], date, date, length).day(doctor.pk, date)
+        self._store({(doctor_user_id, date): day}, versions, length)
+        return day
+
+    def availability(self, doctors: Iterable, start_date: datetime.date, end_date: datetime.date) -> 'CachedAvailability':
+        """Return a CachedAvailability for the doctors and inclusive range, filling misses in one batch."""
+        return CachedAvailability(self, doctors, start_date, end_date)
+
+    def invalidate(self, doctor_user_id: int, dates: Iterable[datetime.date]):
+        """Replace the version tokens of the given doctor-days, now and again on commit."""
+        keys = [self.version_key(doctor_user_id, date) for date in dates if self.cacheable(date)]
+        if not keys:
+            return
+        self._bump(keys)
+        # A read between now and the commit may cache the old state again
+        transaction.on_commit(lambda: self._bump(keys))
+
+    def invalidate_weekday(self, doctor_user_id: int, weekday: int):
+        first, last = self.horizon()
+        offset = (weekday - first.weekday()) % 7
+        dates = []
+        date = first + datetime.timedelta(days=offset)
+        while date <= last:
+            dates.append(date)
+            date += datetime.timedelta(days=7)
+        self.invalidate(doctor_user_id, dates)
+
+    def invalidate_range(self, doctor_user_id: int, start: datetime.datetime, end: datetime.datetime):
+        """Invalidate every local date touched by [start, end]."""
+        first, last = self.horizon()
+        date = max(timezone.localtime(start).date(), first)
+        end_date = min(timezone.localtime(end).date(), last)
+        dates = []
+        while date <= end_date:
+            dates.append(date)
+            date += datetime.timedelta(days=1)
+        self.invalidate(doctor_user_id, dates)
+
+    def stats(self) -> Dict[str, float]:
+        """Return the hit/miss counters recorded in the cache backend and the hit rate."""
+        counters = self.cache.get_many(list(self.STATS_KEYS.values()))
+        hits, misses = (counters.get(key, 0) for key in self.STATS_KEYS.values())
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
+
+    def reset_stats(self):
+        self.cache.delete_many(list(self.STATS_KEYS.values()))
+
+    def _bump(self, version_keys: List[str]):
+        self.cache.set_many({key: uuid.uuid4().hex for key in version_keys}, self.timeout)
+
+    def _lookup(self, days: List[Tuple[int, datetime.date]], length: int):
+        """
+        Return the valid entries and the current version tokens of ``days``
+        ((doctor user id, date) pairs), reading both in one round trip.
+        Doctor-days without a token get one with ``add``, so a concurrent
+        invalidation is never overwritten, and have no valid entry.
+        """
+        keys = {}
+        for day in days:
+            keys[self.key(*day, length)] = keys[self.version_key(*day)] = day
+        found = self.cache.get_many(list(keys))
+        versions, unversioned = {}, []
+        for key, day in keys.items():
+            if key.startswith('doctor-slots-version:'):
+                if key in found:
+                    versions[day] = found[key]
+                else:
+                    unversioned.append(key)
+        for key in unversioned:
+            self.cache.add(key, uuid.uuid4().hex, self.timeout)
+        if unversioned:
+            for key, version in self.cache.get_many(unversioned).items():
+                versions[keys[key]] = version
+        entries = {
+            keys[key]: entry[1:] for key, entry in found.items()
+            if not key.startswith('doctor-slots-version:') and entry[0] == versions.get(keys[key])
+        }
+        return entries, versions
+
+    def _store(self, days: Dict[Tuple[int, datetime.date], DayAvailability], versions: Dict, length: int):
+        """Cache freshly loaded doctor-days under the version tokens read before loading them."""
+        self.cache.set_many({
+            self.key(*key, length): (versions[key],) + self._encode(day)
+            for key, day in days.items() if key in versions
+        }, self.timeout)
+
+    def _count(self, hits: int = 0, misses: int = 0):
+        # One increment per lookup batch, in the backend so every worker adds up
+        for name, count in (('hits', hits), ('misses', misses)):
+            if not count:
+                continue
+            key = self.STATS_KEYS[name]
+            try:
+                self.cache.incr(key, count)
+            except ValueError:
+                if not self.cache.add(key, count, None):
+                    self.cache.incr(key, count)
+
+    @staticmethod
+    def _encode(day: DayAvailability) -> Tuple[int, int, int]:
+        return (
+            intervals_to_bitmap(day.working),
+            intervals_to_bitmap(day.time_off),
+            intervals_to_bitmap(day.booked),
+        )
+
+    @staticmethod
+    def _decode(date: datetime.date, entry: Tuple[int, int, int], length: int,
+                closed: Optional[List[Interval]] = None) -> DayAvailability:
+        working, time_off, booked = entry
+        return DayAvailability(
+            date,
+            bitmap_to_intervals(working),
+            bitmap_to_intervals(time_off),
+            bitmap_to_intervals(booked),
+            length,
+            closed,
+        )
+
+
+class CachedAvailability:
+    """
+    The Availability interface (``dates``, ``day``, ``slots``, ``doctors``,
+    ``length``) served from the slot cache. Doctor-days missing from the cache
+    are loaded together with a single Availability for the missing doctors.
+    """
+
+    def __init__(self, slot_cache: SlotCache, doctors: Iterable, start_date: datetime.date, end_date: datetime.date):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.length = slot_minutes()
+        self.doctors = {doctor.pk: doctor for doctor in doctors}
+        self._days: Dict[Tuple[int, datetime.date], DayAvailability] = {}
+        closed = closed_by_date(start_date, end_date)
+
+        by_user = {doctor.user_id: doctor.pk for doctor in self.doctors.values()}
+        entries, versions = slot_cache._lookup([
+            (doctor.user_id, date)
+            for doctor in self.doctors.values()
+            for date in self.dates()
+            if slot_cache.cacheable(date)
+        ], self.length)
+        for (user_id, date), entry in entries.items():
+            self._days[(by_user[user_id], date)] = slot_cache._decode(date, entry, self.length, closed.get(date))
+
+        missing = [
+            (doctor.pk, date) for doctor in self.doctors.values() for date in self.dates()
+            if (doctor.pk, date) not in self._days
+        ]
+        slot_cache._count(hits=len(self._days), misses=len(missing))
+        if not missing:
+            return
+
+        missing_doctors = {doctor_id for doctor_id, _ in missing}
+        missing_dates = [date for _, date in missing]
+        loaded = Availability(
+            [self.doctors[doctor_id] for doctor_id in missing_doctors], min(missing_dates), max(missing_dates), self.length
+        )
+        fills = {}
+        for doctor_id, date in missing:
+            day = loaded.day(doctor_id, date)
+            self._days[(doctor_id, date)] = day
+            fills[(self.doctors[doctor_id].user_id, date)] = day
+        slot_cache._store(fills, versions, self.length)
+
+    def dates(self) -> List[datetime.date]:
+        days = (self.end_date - self.start_date).days + 1
+        return [self.start_date + datetime.timedelta(days=offset) for offset in range(days)]
+
+    def day(self, doctor_id: int, date: datetime.date) -> DayAvailability:
+        return self._days[(doctor_id, date)]
+
+    def slots(self, doctor_id: int, date: datetime.date) -> List[datetime.time]:
+        return self.day(doctor_id, date).slots()
+
+
+_slot_cache: Optional[SlotCache] = None
+_slot_cache_lock = threading.Lock()
+
+
+def get_slot_cache() -> SlotCache:
+    """Return the process-wide slot cache, creating it from settings on first use."""
+    global _slot_cache
+    if _slot_cache is None:
+        with _slot_cache_lock:
+            if _slot_cache is None:
+                _slot_cache = SlotCache.from_settings()
+    return _slot_cache
@@ -0,0 +1,187 @@
+"""
+Materialized slot calendar.
+
+Every doctor has one Slot row per slot of working hours over the booking
+horizon [today, today + SLOT_CALENDAR_DAYS], with the state computed by the
+availability engine. Rows are synced in bulk by the ``roll_slot_calendar``
+command and per doctor by the signal handlers in doctors.signals; a booking
+claims its row with a single conditional UPDATE.
+"""
+
+import datetime
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from doctors.availability import BOOKED, CLOSED, TIME_OFF, Availability, from_minutes
+
+STATE_BY_CONFLICT = {None: 'OPEN', CLOSED: 'BLOCKED', TIME_OFF: 'BLOCKED', BOOKED: 'BOOKED'}
+
+# Rows per INSERT and ids per IN (...) list, well under SQLite's variable limit
+BATCH_SIZE = 1000
+
+# Doctors synced together when the whole calendar is re-synced
+DOCTOR_BATCH_SIZE = 50
+
+
+def _batches(items):
+    for index in range(0, len(items), BATCH_SIZE):
+        yield items[index:index + BATCH_SIZE]
+
+
+class SlotUnavailable(Exception):
+    """Raised when a booking loses the race for its slot."""
+
+
+class OutsideCalendar(SlotUnavailable):
+    """Raised when a booking falls outside the materialized calendar's horizon."""
+
+
+def calendar_horizon() -> Tuple[datetime.date, datetime.date]:
+    today = timezone.localdate()
+    return today, today + datetime.timedelta(days=getattr(settings, 'SLOT_CALENDAR_DAYS', 90))
+
+
+def sync_slots(doctors: Iterable, start_date: datetime.date, end_date: datetime.date) -> Dict[str, int]:
+    """
+    Bring the Slot rows of ``doctors`` between the two dates (inclusive) in
+    line with their schedules, time off and appointments. The number of
+    queries depends only on how many rows change; returns how many rows were created, updated and
+    deleted.
+    """
+    from doctors.models import Slot
+
+    availability = Availability(doctors, start_date, end_date)
+    desired = {}
+    for doctor in availability.doctors.values():
+        for date in availability.dates():
+            day = availability.day(doctor.pk, date)
+            for start in day.grid():
+                desired[(doctor.user_id, date, from_minutes(start))] = STATE_BY_CONFLICT[day.conflict(start)]
+
+    existing = {
+        (doctor_id, date, time): (pk, state)
+        for pk, doctor_id, date, time, state in Slot.objects.filter(
+            doctor_id__in=[doctor.user_id for doctor in availability.doctors.values()],
+            date__range=(start_date, end_date),
+        ).values_list('pk', 'doctor_id', 'date', 'time', 'state')
+    }
+
+    created = [
+        Slot(doctor_id=doctor_id, date=date, time=time, state=state)
+        for (doctor_id, date, time), state in desired.items()
+        if (doctor_id, date, time) not in existing
+    ]
+    deleted = [pk for key, (pk, _) in existing.items() if key not in desired]
+    updated = defaultdict(list)
+    for key, (pk, state) in existing.items():
+        if key in desired and desired[key] != state:
+            updated[desired[key]].append(pk)
+
+    Slot.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    for batch in _batches(deleted):
+        Slot.objects.filter(pk__in=batch).delete()
+    for state, pks in updated.items():
+        for batch in _batches(pks):
+            Slot.objects.filter(pk__in=batch).update(state=state)
+    return {
+        'created': len(created),
+        'updated': sum(len(pks) for pks in updated.values()),
+        'deleted': len(deleted),
+    }
+
+
+def refresh_doctor_days(doctor_user_id: int, dates: Iterable[datetime.date]):
+    """Re-sync one doctor's rows over the span of ``dates`` that falls in the horizon."""
+    from doctors.models import Doctor
+
+    first, last = calendar_horizon()
+    dates = [date for date in dates if first <= date <= last]
+    doctor = Doctor.objects.filter(user_id=doctor_user_id).first()
+    if dates and doctor is not None:
+        sync_slots([doctor], min(dates), max(dates))
+
+
+def sync_all_slots(start_date: datetime.date, end_date: datetime.date,
+                   batch_size: int = DOCTOR_BATCH_SIZE) -> Dict[str, int]:
+    """sync_slots for every doctor, ``batch_size`` doctors at a time; returns the summed counts."""
+    from doctors.models import Doctor
+
+    doctors = list(Doctor.objects.order_by('pk'))
+    totals = {'created': 0, 'updated': 0, 'deleted': 0}
+    for index in range(0, len(doctors), batch_size):
+        counts = sync_slots(doctors[index:index + batch_size], start_date, end_date)
+        for key, value in counts.items():
+            totals[key] += value
+    return totals
+
+
+def refresh_all_doctor_days(dates: Iterable[datetime.date]):
+    """
+    Re-sync every doctor's rows over the span of ``dates`` in the horizon,
+    e.g. after a facility closure changes. The sync runs in doctor batches
+    once the change commits, so it never holds the write transaction open;
+    check_booking consults the closure calendar itself in the meantime.
+    """
+    first, last = calendar_horizon()
+    dates = [date for date in dates if first <= date <= last]
+    if dates:
+        start, end = min(dates), max(dates)
+        transaction.on_commit(lambda: sync_all_slots(start, end))
+
+
+def mark_booked(doctor_user_id: int, date: datetime.date, time: datetime.time) -> bool:
+    """Flip an open slot to booked with one conditional UPDATE; return False if it was not open."""
+    from doctors.models import Slot
+
+    return bool(Slot.objects.filter(
+        doctor_id=doctor_user_id, date=date, time=time, state=Slot.State.OPEN
+    ).update(state=Slot.State.BOOKED))
+
+
+def mark_open(doctor_user_id: int, date: datetime.date, time: datetime.time) -> bool:
+    """
+    Flip a booked slot back to open with one conditional UPDATE; return False
+    if it was not booked. Blocked rows stay blocked: closures and time off
+    take precedence over bookings in sync_slots.
+    """
+    from doctors.models import Slot
+
+    return bool(Slot.objects.filter(
+        doctor_id=doctor_user_id, date=date, time=time, state=Slot.State.BOOKED
+    ).update(state=Slot.State.OPEN))
+
+
+def claim_slot(doctor_user_id: int, date: datetime.date, time: datetime.time) -> bool:
+    """
+    Mark an open slot as booked; return False if it is not open. The first
+    claim for a doctor-day that has never been materialized syncs it first.
+    Raises OutsideCalendar for a date outside calendar_horizon(), which has
+    no rows to claim.
+    """
+    from doctors.models import Slot
+
+    first, last = calendar_horizon()
+    if not first <= date <= last:
+        raise OutsideCalendar(
+            f"Appointments can only be booked between {first:%d %b %Y} and {last:%d %b %Y}."
+        )
+    if mark_booked(doctor_user_id, date, time):
+        return True
+    if Slot.objects.filter(doctor_id=doctor_user_id, date=date).exists():
+        return False
+    refresh_doctor_days(doctor_user_id, [date])
+    return mark_booked(doctor_user_id, date, time)
+
+
+def open_slots(start_date: datetime.date, end_date: datetime.date, doctor_user_ids: Optional[Iterable[int]] = None):
+    """Open slots between two dates, in (date, time) order; an indexed range scan."""
+    from doctors.models import Slot
+
+    slots = Slot.objects.filter(state=Slot.State.OPEN, date__range=(start_date, end_date))
+    if doctor_user_ids is not None:
+        slots = slots.filter(doctor_id__in=doctor_user_ids)
+    return slots.order_by('date', 'time')
@@ -0,0 +1,111 @@
+"""
+Synthetic doctors, schedules, time off and appointments for the benchmark
+commands. Callers are expected to run inside a transaction they roll back,
+and inside isolated_cache(): a rollback frees the synthetic doctors' ids
+for reuse, so cache entries written for them must never reach the
+configured cache, where a real doctor could be served them later.
+"""
+
+import contextlib
+import datetime
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from appointments.models import Appointment
+from doctors.models import Doctor, DoctorSchedule, DoctorSpecialty, TimeOff
+from users.models import User
+
+SYNTHETIC_CACHE_ALIAS = 'synthetic'
+
+SPECIALTIES = ['Cardiology', 'Dermatology', 'General Medicine', 'Neurology', 'Paediatrics', 'Orthopaedics']
+
+
+@contextlib.contextmanager
+def isolated_cache():
+    """
+    Point the slot cache, the time-off index and the closure calendar at a
+    private process-local cache for the duration, and empty it on exit.
+    Yields that cache.
+    """
+    from doctors import slot_cache, time_off_index
+
+    configured = {**settings.CACHES, SYNTHETIC_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'synthetic-doctors',
+    }}
+    # The process-wide instances keep the alias they were created with
+    saved = slot_cache._slot_cache, time_off_index._time_off_index
+    slot_cache._slot_cache = time_off_index._time_off_index = None
+    try:
+        with override_settings(CACHES=configured, SLOT_CACHE_ALIAS=SYNTHETIC_CACHE_ALIAS):
+            try:
+                yield caches[SYNTHETIC_CACHE_ALIAS]
+            finally:
+                caches[SYNTHETIC_CACHE_ALIAS].clear()
+    finally:
+        slot_cache._slot_cache, time_off_index._time_off_index = saved
+
+
+def create_synthetic_doctors(count, start_date, days, seed=1234, prefix='bench'):
+    """
+    Create ``count`` doctors working weekdays, each with a couple of time-off
+    blocks and a few booked appointments per week over ``days`` days from
+    ``start_date``. Returns the Doctor queryset.
+    """
+    rng = random.Random(seed)
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}_doctor_{i}', role='DOCTOR', password='!', first_name='Doctor', last_name=str(i))
+        for i in range(count)
+    ])
+    patient = User.objects.create(username=f'{prefix}_patient', role='PATIENT', password='!')
+    doctors = Doctor.objects.bulk_create([
+        Doctor(user=user, specialization=SPECIALTIES[i % len(SPECIALTIES)], license_number=f'{prefix}-{i}')
+        for i, user in enumerate(users)
+    ])
+    DoctorSpecialty.objects.bulk_create([
+        DoctorSpecialty(doctor=doctor, specialty=doctor.specialization) for doctor in doctors
+    ])
+
+    schedules = []
+    time_offs = []
+    appointments = []
+    for doctor in doctors:
+        start_hour = rng.choice((8, 9, 10))
+        for weekday in range(5):
+            schedules.append(DoctorSchedule(
+                doctor=doctor,
+                day_of_week=weekday,
+                start_time=datetime.time(start_hour),
+                end_time=datetime.time(start_hour + 8),
+            ))
+        for _ in range(2):
+            offset = rng.randrange(days)
+            begin = timezone.make_aware(datetime.datetime.combine(
+                start_date + datetime.timedelta(days=offset), datetime.time(rng.randrange(8, 16))
+            ))
+            time_offs.append(TimeOff(
+                doctor=doctor,
+                start_datetime=begin,
+                end_datetime=begin + datetime.timedelta(hours=rng.choice((2, 4, 24, 72))),
+                reason='Benchmark',
+            ))
+        for offset in range(days):
+            date = start_date + datetime.timedelta(days=offset)
+            if date.weekday() >= 5:
+                continue
+            for slot in rng.sample(range(16), rng.randrange(3)):
+                appointments.append(Appointment(
+                    patient=patient,
+                    doctor_id=doctor.user_id,
+                    date=date,
+                    time=datetime.time(start_hour + slot // 2, slot % 2 * 30),
+                    status=rng.choice(('PENDING', 'CONFIRMED', 'CANCELLED')),
+                ))
+    DoctorSchedule.objects.bulk_create(schedules)
+    TimeOff.objects.bulk_create(time_offs)
+    Appointment.objects.bulk_create(appointments)
+    return Doctor.objects.filter(pk__in=[doctor.pk for doctor in doctors])
@@ -1,3 +1,123 @@
+import datetime
+
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from appointments.models import Appointment
+from doctors.availability import Availability, slot_minutes
+from doctors.models import Doctor, DoctorSchedule, Slot
+from doctors.slot_cache import get_slot_cache
+from doctors.slot_calendar import refresh_doctor_days
+from doctors.synthetic import create_synthetic_doctors, isolated_cache
+from doctors.time_off_index import get_time_off_index
+from users.models import User
+
+
+class AppointmentSlotSyncTests(TestCase):
+    """Appointment saves flip only the slot rows they affect."""
+
+    def setUp(self):
+        cache.clear()
+        self.doctor = User.objects.create(username='doctor', role='DOCTOR')
+        profile = Doctor.objects.create(user=self.doctor, specialization='Cardiology', license_number='L-1')
+        DoctorSchedule.objects.bulk_create([
+            DoctorSchedule(doctor=profile, day_of_week=day, start_time=datetime.time(9), end_time=datetime.time(17))
+            for day in range(7)
+        ])
+        self.patient = User.objects.create(username='patient', role='PATIENT')
+        self.date = timezone.localdate() + datetime.timedelta(days=1)
+        refresh_doctor_days(self.doctor.pk, [self.date])
+        self.appointment = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, date=self.date, time=datetime.time(10)
+        )
+
+    def state(self, time):
+        return Slot.objects.get(doctor=self.doctor, date=self.date, time=time).state
+
+    def test_create_books_slot(self):
+        self.assertEqual(self.state(datetime.time(10)), Slot.State.BOOKED)
+
+    def test_confirm_leaves_slot_calendar_alone(self):
+        appointment = Appointment.objects.get(pk=self.appointment.pk)
+        appointment.status = Appointment.CONFIRMED
+        with CaptureQueriesContext(connection) as queries:
+            appointment.save()
+        touched = [query['sql'] for query in queries if 'doctors_' in query['sql']]
+        self.assertEqual(touched, [])
+        self.assertEqual(self.state(datetime.time(10)), Slot.State.BOOKED)
+
+    def test_cancel_and_revive_flip_one_slot(self):
+        appointment = Appointment.objects.get(pk=self.appointment.pk)
+        appointment.status = Appointment.CANCELLED
+        appointment.save()
+        self.assertEqual(self.state(datetime.time(10)), Slot.State.OPEN)
+        appointment.status = Appointment.PENDING
+        appointment.save()
+        self.assertEqual(self.state(datetime.time(10)), Slot.State.BOOKED)
+
+    def test_move_opens_old_slot_and_books_new_one(self):
+        appointment = Appointment.objects.get(pk=self.appointment.pk)
+        appointment.time = datetime.time(11)
+        appointment.save()
+        self.assertEqual(self.state(datetime.time(10)), Slot.State.OPEN)
+        self.assertEqual(self.state(datetime.time(11)), Slot.State.BOOKED)
+
+    def test_delete_opens_slot(self):
+        self.appointment.delete()
+        self.assertEqual(self.state(datetime.time(10)), Slot.State.OPEN)
+
+
+class IsolatedCacheTests(TestCase):
+    """Synthetic benchmark data never reaches the configured cache."""
+
+    def test_entries_stay_in_private_cache(self):
+        cache.clear()
+        with isolated_cache() as private, transaction.atomic():
+            doctor = create_synthetic_doctors(2, timezone.localdate(), 3, prefix='iso').first()
+            get_slot_cache().availability([doctor], timezone.localdate(), timezone.localdate())
+            get_time_off_index().for_doctor(doctor.user_id)
+            self.assertTrue(private._cache)
+            transaction.set_rollback(True)
+        self.assertFalse(private._cache)
+        self.assertFalse(cache._cache)
+        self.assertEqual(get_slot_cache().alias, 'default')
+
+
+class SlotCacheVersionTests(TestCase):
+    """A fill that started before an invalidation never serves the older state."""
+
+    def setUp(self):
+        cache.clear()
+        self.doctor = User.objects.create(username='doctor', role='DOCTOR')
+        self.profile = Doctor.objects.create(user=self.doctor, specialization='Cardiology', license_number='L-1')
+        DoctorSchedule.objects.bulk_create([
+            DoctorSchedule(doctor=self.profile, day_of_week=day, start_time=datetime.time(9), end_time=datetime.time(17))
+            for day in range(7)
+        ])
+        self.patient = User.objects.create(username='patient', role='PATIENT')
+        self.date = timezone.localdate() + datetime.timedelta(days=1)
+        self.slot_cache = get_slot_cache()
+
+    def test_late_fill_is_ignored(self):
+        length = slot_minutes()
+        day = (self.doctor.pk, self.date)
+        _, versions = self.slot_cache._lookup([day], length)
+        stale = Availability([self.profile], self.date, self.date, length).day(self.profile.pk, self.date)
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=self.date, time=datetime.time(10))
+        self.slot_cache._store({day: stale}, versions, length)
+        self.assertNotIn(datetime.time(10), self.slot_cache.get_day(*day).slots())
+        self.assertNotIn(datetime.time(10), self.slot_cache.availability([self.profile], self.date, self.date).slots(
+            self.profile.pk, self.date
+        ))
 
-# Create your tests here.
+    def test_invalidation_replaces_cached_day(self):
+        self.assertIn(datetime.time(10), self.slot_cache.get_day(self.doctor.pk, self.date).slots())
+        self.slot_cache.reset_stats()
+        self.slot_cache.get_day(self.doctor.pk, self.date)
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=self.date, time=datetime.time(10))
+        self.assertNotIn(datetime.time(10), self.slot_cache.get_day(self.doctor.pk, self.date).slots())
+        self.assertEqual(self.slot_cache.stats()['hits'], 1)
+        self.assertEqual(self.slot_cache.stats()['misses'], 1)
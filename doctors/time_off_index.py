@@ -0,0 +1,152 @@
+"""
+Per-doctor index of time off for overlap queries.
+
+A doctor's TimeOff rows are merged into sorted, disjoint intervals (seconds
+since the epoch) and kept in the slot cache's backend, so "does anything
+overlap [start, end)" and "which parts of [start, end) are blocked" are
+answered with a binary search instead of a filter over every row the doctor
+has accumulated. Only the union of the rows matters for availability, which
+is why a sorted list of merged intervals is enough in place of a full
+interval tree.
+
+An index is loaded on first use, in one query for all requested doctors, and
+dropped by the TimeOff signal handlers in doctors.signals. As with the slot
+cache, bulk operations bypass signals and TIME_OFF_INDEX_TIMEOUT bounds how
+long they can go unnoticed.
+"""
+
+import datetime
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from doctors.availability import merge_intervals
+
+Span = Tuple[datetime.datetime, datetime.datetime]
+
+
+def to_seconds(value: datetime.datetime) -> int:
+    return int(value.timestamp())
+
+
+def from_seconds(value: int) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+
+
+class MergedIntervals:
+    """Datetime spans (one doctor's time off, facility closures) merged for logarithmic overlap queries."""
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]] = ()):
+        merged = merge_intervals(intervals)
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Span]) -> 'MergedIntervals':
+        return cls((to_seconds(start), to_seconds(end)) for start, end in rows)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _first_after(self, start: int) -> int:
+        # Index of the first interval ending after ``start``
+        return bisect_right(self.ends, start)
+
+    def overlaps(self, start: datetime.datetime, end: datetime.datetime) -> bool:
+        """Whether any time off overlaps the half-open range [start, end)."""
+        start, end = to_seconds(start), to_seconds(end)
+        index = self._first_after(start)
+        return index < len(self.starts) and self.starts[index] < end
+
+    def overlapping(self, start: datetime.datetime, end: datetime.datetime) -> List[Span]:
+        """The parts of [start, end) covered by time off, in order."""
+        first, last = to_seconds(start), to_seconds(end)
+        spans = []
+        for index in range(self._first_after(first), bisect_left(self.starts, last)):
+            spans.append((
+                from_seconds(max(self.starts[index], first)),
+                from_seconds(min(self.ends[index], last)),
+            ))
+        return spans
+
+    def __getstate__(self):
+        return self.starts, self.ends
+
+    def __setstate__(self, state):
+        self.starts, self.ends = state
+
+
+class TimeOffIndex:
+    """Read-through cache of MergedIntervals objects keyed by Doctor pk."""
+
+    def __init__(self, alias: str = 'default', timeout: int = 3600):
+        self.alias = alias
+        self.timeout = timeout
+
+    @classmethod
+    def from_settings(cls) -> 'TimeOffIndex':
+        return cls(
+            alias=getattr(settings, 'SLOT_CACHE_ALIAS', 'default'),
+            timeout=getattr(settings, 'TIME_OFF_INDEX_TIMEOUT', 3600),
+        )
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, doctor_id: int) -> str:
+        return f'doctor-time-off:{doctor_id}'
+
+    def for_doctor(self, doctor_id: int) -> MergedIntervals:
+        return self.for_doctors([doctor_id])[doctor_id]
+
+    def for_doctors(self, doctor_ids: Iterable[int]) -> Dict[int, MergedIntervals]:
+        """Return the index of every doctor, loading the missing ones in one query."""
+        from doctors.models import TimeOff
+
+        doctor_ids = list(doctor_ids)
+        cached = self.cache.get_many([self.key(doctor_id) for doctor_id in doctor_ids])
+        indexes = {}
+        missing = []
+        for doctor_id in doctor_ids:
+            entry = cached.get(self.key(doctor_id))
+            if entry is None:
+                missing.append(doctor_id)
+            else:
+                indexes[doctor_id] = entry
+        if missing:
+            rows = defaultdict(list)
+            for doctor_id, start, end in TimeOff.objects.filter(doctor_id__in=missing).values_list(
+                'doctor_id', 'start_datetime', 'end_datetime'
+            ):
+                rows[doctor_id].append((start, end))
+            loaded = {doctor_id: MergedIntervals.from_rows(rows[doctor_id]) for doctor_id in missing}
+            self.cache.set_many({self.key(doctor_id): index for doctor_id, index in loaded.items()}, self.timeout)
+            indexes.update(loaded)
+        return indexes
+
+    def invalidate(self, doctor_id: int):
+        """Drop a doctor's index, now and again on commit."""
+        key = self.key(doctor_id)
+        self.cache.delete(key)
+        # A read between now and the commit may cache the old rows again
+        transaction.on_commit(lambda: self.cache.delete(key))
+
+
+_time_off_index: Optional[TimeOffIndex] = None
+_time_off_index_lock = threading.Lock()
+
+
+def get_time_off_index() -> TimeOffIndex:
+    """Return the process-wide time-off index, creating it from settings on first use."""
+    global _time_off_index
+    if _time_off_index is None:
+        with _time_off_index_lock:
+            if _time_off_index is None:
+                _time_off_index = TimeOffIndex.from_settings()
+    return _time_off_index
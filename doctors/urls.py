@@ -17,11 +17,18 @@ urlpatterns = [
     path('lab-results/', views.lab_results, name='lab_results'),
     path('appointments/', views.appointment_list, name='appointment_list'),
     path('appointments/<int:pk>/', views.appointment_detail, name='appointment_detail'),
+    path('appointments/batch-status/', views.appointment_batch_status, name='appointment_batch_status'),
     path('appointments/<int:pk>/update-status/', views.appointment_update_status, name='appointment_update_status'),
     path('appointments/<int:pk>/approve/', views.appointment_approve, name='appointment_approve'),
     path('appointments/<int:pk>/cancel/', views.appointment_cancel, name='appointment_cancel'),
     path('schedule/', views.manage_schedule, name='manage_schedule'),
+    path('schedules/', views.schedule_list, name='schedule_list'),
+    path('schedules/create/', views.schedule_create, name='schedule_create'),
+    path('schedules/<int:pk>/update/', views.schedule_update, name='schedule_update'),
+    path('schedules/<int:pk>/delete/', views.schedule_delete, name='schedule_delete'),
     path('api/<int:doctor_id>/available-slots/', views.available_slots, name='available_slots'),
+    path('api/available-slots/', views.bulk_available_slots, name='bulk_available_slots'),
+    path('api/earliest-slots/', views.earliest_slots, name='earliest_slots'),
     path('specialties/', views.specialty_list, name='specialty_list'),
     path('specialties/create/', views.specialty_create, name='specialty_create'),
     path('specialties/<int:pk>/delete/', views.specialty_delete, name='specialty_delete'),
@@ -2,7 +2,12 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
+from django.conf import settings
+from django.db.models import Q
 from .models import DoctorSchedule, DoctorSpecialty, Doctor, TimeOff
+from .availability import from_minutes, merge_intervals, to_minutes
+from .slot_cache import get_slot_cache
+from . import search
 from appointments.models import Appointment
 from .forms import DoctorScheduleForm, DoctorSpecialtyForm, DoctorProfileForm, MedicalRecordForm, PrescriptionForm, TimeOffForm
 from users.models import User
@@ -10,10 +15,11 @@ from patients.models import Patient
 from medical_records.models import MedicalRecord
 from lab.models import LabResult
 from prescriptions.models import Prescription
-from django.http import JsonResponse
-from datetime import datetime, timedelta
-import sys
+from django.http import Http404, JsonResponse
+from datetime import datetime
 from appointments.forms import AppointmentUpdateForm
+from appointments import batch
+from appointments.impact import affected_appointments, apply_time_off
 
 def is_doctor(user):
     return user.is_authenticated and user.role == 'DOCTOR'
@@ -29,14 +35,14 @@ def doctor_dashboard(request):
         today_appointments = Appointment.objects.filter(
             doctor=request.user,
             date=today,
-            status__iexact='approved'
+            status=Appointment.CONFIRMED
         ).order_by('time')
         
         # Get upcoming appointments
         upcoming_appointments = Appointment.objects.filter(
             doctor=request.user,
             date__gt=today,
-            status__iexact='approved'
+            status=Appointment.CONFIRMED
         ).order_by('date', 'time')[:5]
         
         # Get recent patients through appointments
@@ -56,23 +62,45 @@ def doctor_dashboard(request):
         messages.error(request, 'Doctor profile not found. Please contact the administrator.')
         return redirect('home')
 
+def schedule_days(schedules):
+    """
+    Group schedule blocks ordered by day and start time into one entry per
+    weekday, with the merged working hours the slot computation will use.
+    """
+    days = []
+    for schedule in schedules:
+        if not days or days[-1]['day_of_week'] != schedule.day_of_week:
+            days.append({
+                'day_of_week': schedule.day_of_week,
+                'label': schedule.get_day_of_week_display(),
+                'blocks': [],
+            })
+        days[-1]['blocks'].append(schedule)
+    for day in days:
+        day['hours'] = [
+            (from_minutes(start), from_minutes(end))
+            for start, end in merge_intervals(
+                (to_minutes(block.start_time), to_minutes(block.end_time))
+                for block in day['blocks'] if block.is_available
+            )
+        ]
+    return days
+
 @login_required
 @user_passes_test(is_doctor)
 def schedule_list(request):
     doctor = Doctor.objects.get(user=request.user)
-    schedules = DoctorSchedule.objects.filter(doctor=doctor).order_by('-date', 'start_time')
-    return render(request, 'doctors/schedule_list.html', {'schedules': schedules})
+    schedules = DoctorSchedule.objects.filter(doctor=doctor).order_by('day_of_week', 'start_time')
+    return render(request, 'doctors/schedule_list.html', {'days': schedule_days(schedules)})
 
 @login_required
 @user_passes_test(is_doctor)
 def schedule_create(request):
     doctor = Doctor.objects.get(user=request.user)
     if request.method == 'POST':
-        form = DoctorScheduleForm(request.POST)
+        form = DoctorScheduleForm(request.POST, instance=DoctorSchedule(doctor=doctor))
         if form.is_valid():
-            schedule = form.save(commit=False)
-            schedule.doctor = doctor
-            schedule.save()
+            form.save()
             messages.success(request, 'Schedule created successfully.')
             return redirect('doctors:schedule_list')
     else:
@@ -270,8 +298,8 @@ def appointment_detail(request, pk):
 @user_passes_test(is_doctor)
 def appointment_approve(request, pk):
     appointment = get_object_or_404(Appointment, pk=pk, doctor=request.user)
-    if appointment.status.lower() == 'pending':
-        appointment.status = 'approved'
+    if appointment.status == Appointment.PENDING:
+        appointment.transition_to(Appointment.CONFIRMED)
         appointment.save()
         from doctors.models import DoctorPatient
         DoctorPatient.objects.get_or_create(doctor=request.user, patient=appointment.patient)
@@ -284,8 +312,8 @@ def appointment_approve(request, pk):
 @user_passes_test(is_doctor)
 def appointment_cancel(request, pk):
     appointment = get_object_or_404(Appointment, pk=pk, doctor=request.user)
-    if appointment.status.lower() == 'pending':
-        appointment.status = 'cancelled'
+    if appointment.status == Appointment.PENDING:
+        appointment.transition_to(Appointment.CANCELLED)
         appointment.save()
         messages.success(request, 'Appointment cancelled successfully.')
     else:
@@ -294,17 +322,44 @@ def appointment_cancel(request, pk):
 
 @login_required
 @user_passes_test(is_doctor)
-def appointment_update_status(request, appointment_id):
-    appointment = get_object_or_404(Appointment, pk=appointment_id, doctor=request.user)
+def appointment_batch_status(request):
+    """Confirm or decline the selected pending appointments in one go."""
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        try:
+            ids = [int(pk) for pk in request.POST.getlist('appointment_ids')]
+        except ValueError:
+            ids = []
+        if action not in (batch.CONFIRM, batch.DECLINE) or not ids:
+            messages.error(request, 'Select at least one appointment and an action.')
+            return redirect('doctors:appointment_list')
+
+        outcomes = batch.update_statuses(request.user.pk, ids, action, request.POST.get('doctor_message', ''))
+        done = [pk for pk, outcome in outcomes.items() if outcome in (batch.CONFIRMED, batch.DECLINED)]
+        if done:
+            verb = 'confirmed' if action == batch.CONFIRM else 'declined'
+            messages.success(request, f'{len(done)} appointment(s) {verb}.')
+        skipped = sorted((pk, outcome) for pk, outcome in outcomes.items() if pk not in done)
+        if skipped:
+            reasons = {batch.NOT_FOUND: 'not found', batch.NOT_PENDING: 'no longer pending'}
+            messages.warning(request, 'Skipped: ' + ', '.join(f'#{pk} ({reasons[outcome]})' for pk, outcome in skipped))
+    return redirect('doctors:appointment_list')
+
+@login_required
+@user_passes_test(is_doctor)
+def appointment_update_status(request, pk):
+    appointment = get_object_or_404(Appointment, pk=pk, doctor=request.user)
     if request.method == 'POST':
         new_status = request.POST.get('status')
-        if new_status in dict(Appointment.STATUS_CHOICES):
-            appointment.status = new_status
+        if new_status not in dict(Appointment.STATUS_CHOICES):
+            messages.error(request, 'Invalid status provided.')
+        elif not appointment.can_transition(new_status):
+            messages.error(request, appointment.transition_error(new_status))
+        else:
+            appointment.transition_to(new_status)
             appointment.save()
             messages.success(request, f'Appointment status updated to {new_status}.')
-        else:
-            messages.error(request, 'Invalid status provided.')
-    return redirect('doctors:appointment_detail', appointment_id=appointment.pk)
+    return redirect('doctors:appointment_detail', pk=appointment.pk)
 
 @login_required
 @user_passes_test(is_doctor)
@@ -352,8 +407,8 @@ def prescription_update(request, prescription_id):
 def manage_schedule(request):
     doctor = get_object_or_404(Doctor, user=request.user)
     
-    # Existing weekly schedule
-    schedules = DoctorSchedule.objects.filter(doctor=doctor).order_by('day_of_week')
+    # Existing weekly schedule, one entry per day with any number of blocks
+    schedules = DoctorSchedule.objects.filter(doctor=doctor).order_by('day_of_week', 'start_time')
     
     # Existing time off
     time_offs = TimeOff.objects.filter(doctor=doctor, end_datetime__gte=timezone.now()).order_by('start_datetime')
@@ -361,37 +416,38 @@ def manage_schedule(request):
     # Forms for adding new entries
     schedule_form = DoctorScheduleForm(prefix='schedule')
     timeoff_form = TimeOffForm(prefix='timeoff')
+    affected = []
 
     if request.method == 'POST':
         if 'submit_schedule' in request.POST:
-            form = DoctorScheduleForm(request.POST, prefix='schedule')
-            if form.is_valid():
-                schedule, created = DoctorSchedule.objects.update_or_create(
-                    doctor=doctor,
-                    day_of_week=form.cleaned_data['day_of_week'],
-                    defaults={
-                        'start_time': form.cleaned_data['start_time'],
-                        'end_time': form.cleaned_data['end_time'],
-                        'is_available': form.cleaned_data['is_available'],
-                    }
-                )
+            schedule_form = DoctorScheduleForm(request.POST, prefix='schedule', instance=DoctorSchedule(doctor=doctor))
+            if schedule_form.is_valid():
+                schedule_form.save()
                 messages.success(request, 'Your weekly schedule has been updated.')
-            return redirect('doctors:manage_schedule')
+                return redirect('doctors:manage_schedule')
 
-        elif 'submit_timeoff' in request.POST:
-            form = TimeOffForm(request.POST, prefix='timeoff')
-            if form.is_valid():
-                time_off = form.save(commit=False)
+        elif 'submit_timeoff' in request.POST or 'confirm_timeoff' in request.POST:
+            timeoff_form = TimeOffForm(request.POST, prefix='timeoff')
+            if timeoff_form.is_valid():
+                time_off = timeoff_form.save(commit=False)
                 time_off.doctor = doctor
-                time_off.save()
-                messages.success(request, 'Your time off has been added.')
-            return redirect('doctors:manage_schedule')
+                # Preview first: show the appointments the time off would cancel
+                if 'confirm_timeoff' not in request.POST:
+                    affected = affected_appointments(request.user.pk, time_off.start_datetime, time_off.end_datetime)
+                if not affected:
+                    cancelled = apply_time_off(time_off)
+                    if cancelled:
+                        messages.success(request, f'Your time off has been added and {len(cancelled)} appointment(s) were cancelled. The patients will be notified.')
+                    else:
+                        messages.success(request, 'Your time off has been added.')
+                    return redirect('doctors:manage_schedule')
 
     context = {
-        'schedules': schedules,
+        'days': schedule_days(schedules),
         'time_offs': time_offs,
         'schedule_form': schedule_form,
         'timeoff_form': timeoff_form,
+        'affected_appointments': affected,
     }
     return render(request, 'doctors/manage_schedule.html', context)
 
@@ -401,54 +457,104 @@ def available_slots(request, doctor_id):
     API endpoint: /api/doctors/<doctor_id>/available-slots/?date=YYYY-MM-DD
     Accepts a User ID (doctor_id), finds the Doctor profile, and returns available slots.
     """
-    from users.models import User
     date_str = request.GET.get('date')
-    print(f"[DEBUG] doctor_id={doctor_id}, date_str={date_str}", file=sys.stderr)
     if not date_str:
-        print("[DEBUG] Missing date parameter", file=sys.stderr)
         return JsonResponse({'error': 'Missing date parameter.'}, status=400)
     try:
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
     except ValueError:
-        print("[DEBUG] Invalid date format", file=sys.stderr)
         return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=400)
 
-    user = get_object_or_404(User, pk=doctor_id, role='DOCTOR')
-    print(f"[DEBUG] Found user: {user}", file=sys.stderr)
-    doctor = get_object_or_404(Doctor, user=user)
-    print(f"[DEBUG] Found doctor profile: {doctor}", file=sys.stderr)
-    day_of_week = date_obj.weekday()  # Monday=0, Sunday=6
-    print(f"[DEBUG] day_of_week={day_of_week}", file=sys.stderr)
-
-    # Get the doctor's schedule for that day
     try:
-        schedule = DoctorSchedule.objects.get(doctor=doctor, day_of_week=day_of_week, is_available=True)
-        print(f"[DEBUG] Found schedule: {schedule}", file=sys.stderr)
-    except DoctorSchedule.DoesNotExist:
-        print("[DEBUG] No schedule found for this day", file=sys.stderr)
-        return JsonResponse({'slots': []})  # Doctor not available on this day
-
-    # Check for time off
-    if TimeOff.objects.filter(doctor=doctor, start_datetime__lte=datetime.combine(date_obj, schedule.end_time), end_datetime__gte=datetime.combine(date_obj, schedule.start_time)).exists():
-        print("[DEBUG] Doctor is on time off for this day", file=sys.stderr)
-        return JsonResponse({'slots': []})  # Doctor is on time off for this day
-
-    # Get already booked appointments for this doctor on this date
-    booked_times = set(
-        Appointment.objects.filter(doctor=user, date=date_obj)
-        .values_list('time', flat=True)
+        slots = get_slot_cache().get_day(doctor_id, date_obj).slots()
+    except Doctor.DoesNotExist:
+        raise Http404('No doctor matches the given query.')
+    return JsonResponse({'slots': [slot.strftime('%H:%M') for slot in slots]})
+
+def filter_by_specialty(doctors, specialty):
+    """Doctors whose specialization or any DoctorSpecialty matches, case-insensitively."""
+    return doctors.filter(
+        Q(specialization__iexact=specialty)
+        | Q(pk__in=DoctorSpecialty.objects.filter(specialty__iexact=specialty).values('doctor_id'))
     )
-    print(f"[DEBUG] Booked times: {booked_times}", file=sys.stderr)
-
-    # Generate all possible slots (e.g., every 30 minutes)
-    slots = []
-    slot_length = timedelta(minutes=30)
-    current_time = datetime.combine(date_obj, schedule.start_time)
-    end_time = datetime.combine(date_obj, schedule.end_time)
-    while current_time + slot_length <= end_time:
-        slot_str = current_time.strftime('%H:%M')
-        if slot_str not in booked_times:
-            slots.append(slot_str)
-        current_time += slot_length
-    print(f"[DEBUG] Returning slots: {slots}", file=sys.stderr)
-    return JsonResponse({'slots': slots})
+
+@login_required
+def bulk_available_slots(request):
+    """
+    API endpoint: /doctors/api/available-slots/?start=YYYY-MM-DD&end=YYYY-MM-DD
+    plus either specialty=<name> or doctor_ids=<user id>,<user id>,...
+    Returns a doctor x day x slot matrix; the query count does not depend on
+    the number of doctors or days.
+    """
+    try:
+        start_date = datetime.strptime(request.GET.get('start', ''), '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.GET.get('end', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return JsonResponse({'error': 'Missing or invalid start/end. Use YYYY-MM-DD.'}, status=400)
+    if end_date < start_date:
+        return JsonResponse({'error': 'End date must be after start date.'}, status=400)
+    max_days = getattr(settings, 'AVAILABILITY_MAX_DAYS', 90)
+    if (end_date - start_date).days + 1 > max_days:
+        return JsonResponse({'error': f'Date range cannot exceed {max_days} days.'}, status=400)
+
+    doctors = Doctor.objects.filter(user__role='DOCTOR').select_related('user').order_by('user__last_name', 'user_id')
+    specialty = request.GET.get('specialty')
+    doctor_ids = request.GET.get('doctor_ids')
+    if doctor_ids:
+        try:
+            doctors = doctors.filter(user_id__in=[int(pk) for pk in doctor_ids.split(',') if pk])
+        except ValueError:
+            return JsonResponse({'error': 'doctor_ids must be a comma-separated list of IDs.'}, status=400)
+    elif specialty:
+        doctors = filter_by_specialty(doctors, specialty)
+    else:
+        return JsonResponse({'error': 'Provide a specialty or doctor_ids.'}, status=400)
+
+    availability = get_slot_cache().availability(doctors, start_date, end_date)
+    dates = availability.dates()
+    return JsonResponse({
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'slot_minutes': availability.length,
+        'dates': [date.isoformat() for date in dates],
+        'doctors': [
+            {
+                'id': doctor.user_id,
+                'name': doctor.user.get_full_name(),
+                'specialization': doctor.specialization,
+                'slots': [[slot.strftime('%H:%M') for slot in availability.slots(doctor.pk, date)] for date in dates],
+            }
+            for doctor in availability.doctors.values()
+        ],
+    })
+
+@login_required
+def earliest_slots(request):
+    """
+    API endpoint: /doctors/api/earliest-slots/?specialty=<name>&count=N
+    Returns the N earliest free slots across every doctor of the specialty.
+    """
+    specialty = request.GET.get('specialty')
+    if not specialty:
+        return JsonResponse({'error': 'Missing specialty parameter.'}, status=400)
+    try:
+        count = max(1, min(int(request.GET.get('count', 10)), 100))
+    except ValueError:
+        return JsonResponse({'error': 'count must be a number.'}, status=400)
+
+    doctors = {
+        doctor.user_id: doctor
+        for doctor in filter_by_specialty(Doctor.objects.filter(user__role='DOCTOR').select_related('user'), specialty)
+    }
+    matches = search.earliest_slots(doctors.values(), count)
+    return JsonResponse({
+        'slots': [
+            {
+                'doctor_id': doctor_id,
+                'name': doctors[doctor_id].user.get_full_name(),
+                'date': date.isoformat(),
+                'time': time.strftime('%H:%M'),
+            }
+            for date, time, doctor_id in matches
+        ],
+    })
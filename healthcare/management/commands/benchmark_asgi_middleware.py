@@ -0,0 +1,168 @@
+import asyncio
+import statistics
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+from healthcare import middleware
+
+INLINE_MIDDLEWARE = {
+    'healthcare.middleware.SecurityMiddleware',
+    'healthcare.middleware.InputSanitizationMiddleware',
+    'healthcare.middleware.AuditLogMiddleware',
+}
+
+
+class ThreadHopSecurityMiddleware(middleware.SecurityMiddleware):
+    __acall__ = MiddlewareMixin.__acall__
+
+
+class ThreadHopInputSanitizationMiddleware(middleware.InputSanitizationMiddleware):
+    __acall__ = MiddlewareMixin.__acall__
+
+
+class ThreadHopAuditLogMiddleware(middleware.AuditLogMiddleware):
+    __acall__ = MiddlewareMixin.__acall__
+
+
+def middleware_modes(paths):
+    """
+    Return (path, 'sync' or 'async') for each middleware, following the rules
+    BaseHandler.load_middleware applies under ASGI: once a sync-only
+    middleware sits in the chain, every sync-capable one outside it runs sync.
+    """
+    modes = []
+    handler_is_async = True
+    for path in reversed(paths):
+        middleware = import_string(path)
+        can_sync = getattr(middleware, 'sync_capable', True)
+        can_async = getattr(middleware, 'async_capable', False)
+        handler_is_async = can_async if handler_is_async or not can_sync else False
+        modes.append((path, 'async' if handler_is_async else 'sync'))
+    return modes[::-1]
+
+
+def thread_hop(path):
+    """The stock MiddlewareMixin copy of one of the inline middleware."""
+    if path not in INLINE_MIDDLEWARE:
+        return path
+    return f'{__name__}.ThreadHop{path.rsplit(".", 1)[1]}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests/sec and latency under ASGI of the configured middleware chain with the '
+        'chain minus its sync-only middleware, which runs async, with the healthcare middleware '
+        'run inline and with copies of them that hop to a thread for every hook'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Number of requests per run (default: 2000)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Number of requests in flight at once (default: 50)'
+        )
+        parser.add_argument(
+            '--path',
+            type=str,
+            default='/',
+            help='Path to request (default: /)'
+        )
+
+    def handle(self, *args, **options):
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'testserver'
+        configured = list(settings.MIDDLEWARE)
+        async_capable = [
+            path for path in configured
+            if getattr(import_string(path), 'async_capable', False)
+        ]
+        stacks = (
+            ('configured', configured),
+            ('async inline', async_capable),
+            ('async hops', [thread_hop(path) for path in async_capable]),
+        )
+
+        for label, stack in stacks:
+            modes = middleware_modes(stack)
+            sync = sum(1 for _, mode in modes if mode == 'sync')
+            self.stdout.write(f'{label}: {sync} of {len(modes)} middleware run sync')
+            if options['verbosity'] > 1:
+                for path, mode in modes:
+                    self.stdout.write(f'    {mode:>5}  {path}')
+            with override_settings(MIDDLEWARE=stack):
+                handler = ASGIHandler()
+                latencies, elapsed = asyncio.run(self._run(handler, host, options))
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            self.stdout.write(
+                f'{label:>12}: {len(latencies) / elapsed:,.0f} req/sec, '
+                f'p50 {statistics.median(latencies) * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms'
+            )
+
+    async def _run(self, handler, host, options):
+        latencies = []
+        remaining = options['requests']
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                status = await self._request(handler, host, options['path'])
+                latencies.append(time.perf_counter() - start)
+                if status >= 500:
+                    raise CommandError(f'{options["path"]} returned HTTP {status}')
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+        return latencies, time.perf_counter() - start
+
+    async def _request(self, handler, host, path):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'date_from=2025-01-01&status=PENDING&q=John+Smith',
+            'headers': [
+                (b'host', host.encode()),
+                (b'user-agent', b'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/126.0 Safari/537.36'),
+                (b'accept', b'text/html,application/xhtml+xml'),
+                (b'accept-language', b'en-US,en;q=0.9'),
+            ],
+            'client': ('127.0.0.1', 50000),
+            'server': (host, 80),
+        }
+        body_sent = False
+        status = None
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # Never disconnect; the handler cancels this wait when it is done.
+            await asyncio.Future()
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await handler(scope, receive, send)
+        return status
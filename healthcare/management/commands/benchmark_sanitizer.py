@@ -0,0 +1,53 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from healthcare.security import SecurityUtils
+from healthcare.tests import REALISTIC_VALUES, reference_sanitize_input
+
+
+class Command(BaseCommand):
+    help = 'Benchmark SecurityUtils.sanitize_input against the reference sanitizer on a large form body'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fields',
+            type=int,
+            default=500,
+            help='Number of fields in the synthetic form body (default: 500)'
+        )
+        parser.add_argument(
+            '--field-size',
+            type=int,
+            default=1000,
+            help='Approximate characters per form field (default: 1000)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1234,
+            help='Random seed for the form body (default: 1234)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        # Throughput on a large form body
+        body = []
+        for i in range(options['fields']):
+            text = ''
+            while len(text) < options['field_size']:
+                text += rng.choice(REALISTIC_VALUES[:6]) + ' '
+            body.append((f'field_{i}', text))
+        total_chars = sum(len(key) + len(value) for key, value in body)
+
+        for label, sanitize in (('reference', reference_sanitize_input), ('compiled', SecurityUtils.sanitize_input)):
+            start = time.perf_counter()
+            for key, value in body:
+                sanitize(key, 100)
+                sanitize(value, 1000)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{label:>10}: {len(body) * 2 / elapsed:,.0f} values/sec, '
+                f'{total_chars / elapsed / 1_000_000:.2f} MB/sec ({elapsed * 1000:.1f} ms per form)'
+            )
@@ -0,0 +1,195 @@
+"""
+Benchmark the security utilities and template filters on the fixed corpus in
+healthcare.benchmarks.corpus and compare against a baseline.
+
+Absolute ops/sec only mean something on the machine that produced them, so
+the baseline is machine-local: it is written on the first run (or with
+--save-baseline) and is not committed. It records the host and Python
+version it was measured on; on any other host or interpreter the comparison
+is reported but never fails. Background load only ever slows a run down, so
+an entry that looks regressed is re-measured (--retries) and only fails on
+its best result.
+"""
+
+import gc
+import json
+import os
+import platform
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from healthcare.benchmarks.corpus import CORPUS
+from healthcare.security import SecurityUtils, SecurityValidator
+from healthcare.templatetags.security_filters import filter_cache_clear, safe_output, sanitize_html
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'benchmarks', 'baseline.json')
+
+
+def validate_and_sanitize_text(value):
+    try:
+        return SecurityValidator.validate_and_sanitize_text(value, 'field')
+    except ValidationError:
+        return None
+
+
+# Filters are timed uncached: the memo is cleared before every pass, so each
+# corpus value is a miss and the numbers reflect the sanitization itself.
+BENCHMARKS = {
+    'sanitize_input': (SecurityUtils.sanitize_input, None),
+    'is_suspicious_input': (SecurityUtils.is_suspicious_input, None),
+    'validate_and_sanitize_text': (validate_and_sanitize_text, None),
+    'safe_output': (safe_output, filter_cache_clear),
+    'sanitize_html': (sanitize_html, filter_cache_clear),
+}
+
+
+def machine():
+    """What a baseline is only valid for: the host, its processor and the Python build."""
+    return {
+        'host': platform.node(),
+        'processor': platform.machine(),
+        'python': f'{platform.python_implementation()} {platform.python_version()}',
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the security utilities and template filters on a fixed corpus and compare against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--baseline',
+            type=str,
+            default=DEFAULT_BASELINE,
+            help='Machine-local baseline JSON file, created on first run (default: healthcare/benchmarks/baseline.json)'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Overwrite the baseline with this run instead of comparing'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Fail when ops/sec drops by more than this fraction of the baseline (default: 0.25)'
+        )
+        parser.add_argument(
+            '--min-time',
+            type=float,
+            default=0.2,
+            help='Minimum seconds per timed run (default: 0.2)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per benchmark; the best one is kept (default: 5)'
+        )
+        parser.add_argument(
+            '--retries',
+            type=int,
+            default=2,
+            help='Re-measurements of an entry that looks regressed before it counts (default: 2)'
+        )
+        parser.add_argument(
+            '--only',
+            type=str,
+            choices=sorted(BENCHMARKS),
+            help='Run a single function'
+        )
+
+    def handle(self, *args, **options):
+        names = [options['only']] if options['only'] else list(BENCHMARKS)
+        results = {}
+
+        self.stdout.write(f'{"benchmark":<44} {"ops/sec":>12} {"MB/sec":>9} {"baseline":>12} {"change":>8}')
+        stored = None if options['save_baseline'] else self._load_baseline(options['baseline'])
+        baseline = stored['results'] if stored else {}
+        same_machine = bool(stored) and stored.get('machine') == machine()
+        if stored and not same_machine:
+            self.stdout.write(self.style.WARNING(
+                f'The baseline was measured on {stored.get("machine")}, not {machine()}; '
+                'changes are shown but not enforced.'
+            ))
+        regressions = []
+
+        for name in names:
+            func, before_pass = BENCHMARKS[name]
+            for category, values in CORPUS.items():
+                key = f'{name}/{category}'
+                expected = baseline.get(key, {}).get('ops_per_sec')
+                ops, chars = self._measure(func, before_pass, values, options['min_time'], options['repeat'])
+                for _ in range(options['retries'] if expected and same_machine else 0):
+                    if ops / expected - 1 >= -options['threshold']:
+                        break
+                    ops, chars = max(
+                        (ops, chars), self._measure(func, before_pass, values, options['min_time'], options['repeat'])
+                    )
+                results[key] = {'ops_per_sec': round(ops, 1), 'bytes_per_sec': round(chars, 1)}
+
+                line = f'{key:<44} {ops:>12,.0f} {chars / 1_000_000:>9.2f}'
+                if expected:
+                    change = ops / expected - 1
+                    line += f' {expected:>12,.0f} {change:>+8.1%}'
+                    if same_machine and change < -options['threshold']:
+                        regressions.append((key, change))
+                        line = self.style.ERROR(line)
+                self.stdout.write(line)
+
+        if options['save_baseline'] or stored is None:
+            previous = self._load_baseline(options['baseline']) if options['only'] and options['save_baseline'] else None
+            if previous and previous.get('machine') == machine():
+                results = {**previous['results'], **results}
+            with open(options['baseline'], 'w') as handle:
+                json.dump({'machine': machine(), 'results': results}, handle, indent=2, sort_keys=True)
+                handle.write('\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline for this machine written to {options["baseline"]}'))
+            return
+
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} benchmark(s) regressed by more than {options["threshold"]:.0%}: '
+                + ', '.join(f'{key} ({change:+.1%})' for key, change in regressions)
+            )
+        if baseline:
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def _load_baseline(self, path):
+        """Return the stored {'machine', 'results'} mapping, or None if there is no usable baseline."""
+        if not os.path.exists(path):
+            self.stdout.write(self.style.WARNING(f'No baseline at {path}; this run becomes the baseline.'))
+            return None
+        with open(path) as handle:
+            stored = json.load(handle)
+        if 'results' not in stored:
+            self.stdout.write(self.style.WARNING(f'{path} predates machine-local baselines; this run replaces it.'))
+            return None
+        return stored
+
+    def _measure(self, func, before_pass, values, min_time, repeat):
+        """Return the best (values/sec, bytes/sec) over ``repeat`` runs of at least ``min_time`` seconds."""
+        pass_bytes = sum(len(value.encode('utf-8')) for value in values)
+        best = None
+        # Like timeit, keep the collector out of the timed loop
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                passes = 0
+                elapsed = 0.0
+                while elapsed < min_time:
+                    if before_pass:
+                        before_pass()
+                    start = time.perf_counter()
+                    for value in values:
+                        func(value)
+                    elapsed += time.perf_counter() - start
+                    passes += 1
+                rate = passes / elapsed
+                best = rate if best is None else max(best, rate)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return best * len(values), best * pass_bytes
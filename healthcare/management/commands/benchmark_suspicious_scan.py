@@ -0,0 +1,136 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from healthcare.middleware import SecurityMiddleware
+from healthcare.security import SecurityUtils, SuspiciousPatternSet
+
+
+def reference_is_suspicious_input(value):
+    """The original per-call implementation, kept as the oracle for the pattern set."""
+    if not value:
+        return False
+
+    value_lower = value.lower()
+    patterns = [
+        '<script', '</script>', 'javascript:', 'vbscript:', 'data:',
+        'onload=', 'onclick=', 'onerror=', '<iframe', '<object',
+        'document.cookie', 'window.location', 'eval(', 'alert(',
+        'union select', 'drop table', 'insert into', 'delete from',
+        'update set', 'alter table', 'create table', 'exec(',
+        'execute(', 'union all', 'or 1=1', 'or 1=1--', 'admin\'--',
+        'select *', 'select count', 'select user', 'select database'
+    ]
+    for pattern in patterns:
+        if pattern in value_lower:
+            return True
+    return False
+
+
+TYPICAL_HEADERS = {
+    'HTTP_HOST': 'macbright19.pythonanywhere.com',
+    'HTTP_USER_AGENT': (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36'
+    ),
+    'HTTP_ACCEPT': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'HTTP_ACCEPT_LANGUAGE': 'en-US,en;q=0.9',
+    'HTTP_ACCEPT_ENCODING': 'gzip, deflate, br',
+    'HTTP_COOKIE': 'csrftoken=' + 'a' * 64 + '; sessionid=' + 'b' * 32 + '; _ga=GA1.1.123456789.1700000000',
+    'HTTP_REFERER': 'https://macbright19.pythonanywhere.com/appointments/',
+}
+
+WORDS = (
+    'patient reports mild headache for three days blood pressure within normal range '
+    'heart rate seventy two hemoglobin platelets white cell count follow up in two weeks'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the suspicious-input pattern set on typical headers and large POST bodies'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='Number of header-only requests to scan (default: 2000)'
+        )
+        parser.add_argument(
+            '--body-size',
+            type=int,
+            default=1_000_000,
+            help='Size in characters of the large POST value (default: 1000000)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        patterns = SecurityUtils.get_suspicious_patterns()
+
+        # Agreement with the original implementation
+        samples = list(TYPICAL_HEADERS.values()) + [
+            "<ScRiPt>alert(1)</script>", "x' OR 1=1--", 'DATA:text/html', 'admin\'--', 'Select * from users',
+            'John Smith', 'Amoxicillin 500 mg', 'window.location="x"', 'union all', '',
+        ]
+        for sample in samples:
+            if reference_is_suspicious_input(sample) != SecurityUtils.is_suspicious_input(sample):
+                raise CommandError(f'Pattern set disagrees with the reference for {sample!r}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Pattern set agrees with the reference on {len(samples)} samples '
+            f'({len(patterns.rules)} rules).'
+        ))
+
+        # Per-request overhead for a typical header set
+        factory = RequestFactory()
+        middleware = SecurityMiddleware(lambda request: None)
+        request = factory.get('/appointments/', {'date_from': '2025-01-01', 'status': 'PENDING'}, **TYPICAL_HEADERS)
+        values = list(request.GET.values()) + list(request.headers.values())
+
+        start = time.perf_counter()
+        for _ in range(options['iterations']):
+            for value in values:
+                reference_is_suspicious_input(value)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'Typical request, reference scan: {elapsed / options["iterations"] * 1_000_000:.1f} us')
+
+        start = time.perf_counter()
+        for _ in range(options['iterations']):
+            if middleware._is_suspicious_request(request):
+                raise CommandError('Typical request was flagged as suspicious.')
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'Typical request, SecurityMiddleware: {elapsed / options["iterations"] * 1_000_000:.1f} us')
+
+        # Large POST body
+        body = []
+        size = 0
+        while size < options['body_size']:
+            word = rng.choice(WORDS)
+            body.append(word)
+            size += len(word) + 1
+        body = ' '.join(body)[:options['body_size']]
+
+        # A larger rule set shows how each approach scales with the number of rules
+        extra_rules = [f'{word} {i}=' for i in range(25) for word in ('select', 'exec', 'drop', 'onfocus')]
+        large_set = SuspiciousPatternSet.from_patterns({'extra': extra_rules, **SecurityUtils.SUSPICIOUS_PATTERNS})
+        large_list = [pattern for _, pattern in large_set.rules.values()]
+
+        def substring_scan(value):
+            value_lower = value.lower()
+            return any(pattern in value_lower for pattern in large_list)
+
+        for label, check in (
+            ('reference', reference_is_suspicious_input),
+            ('pattern set', patterns.search),
+            (f'reference, {len(large_list)} rules', substring_scan),
+            (f'pattern set, {len(large_list)} rules', large_set.search),
+        ):
+            runs = 5
+            start = time.perf_counter()
+            for _ in range(runs):
+                check(body)
+            elapsed = (time.perf_counter() - start) / runs
+            self.stdout.write(
+                f'{label:>24}: {elapsed * 1000:.2f} ms per {len(body) / 1_000_000:.1f} MB value '
+                f'({len(body) / elapsed / 1_000_000:.0f} MB/sec)'
+            )
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from healthcare.models import StageTiming
+from healthcare.timing import get_timing_recorder, load_histograms, percentile
+
+
+class Command(BaseCommand):
+    help = 'Show p50/p95/p99 of the security middleware stages per URL name'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url-name',
+            type=str,
+            help='Only show this URL name (e.g. doctors:dashboard)'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Delete all recorded timings after printing them'
+        )
+
+    def handle(self, *args, **options):
+        # Include anything this process recorded but has not flushed yet
+        get_timing_recorder().flush()
+
+        rows = StageTiming.objects.all()
+        if options['url_name']:
+            rows = rows.filter(url_name=options['url_name'])
+        histograms = load_histograms(rows.values_list('url_name', 'stage', 'bucket', 'count'))
+
+        if not histograms:
+            self.stdout.write(self.style.WARNING(
+                'No timings recorded. Set SECURITY_TIMING_ENABLED = True and serve some requests.'
+            ))
+            return
+
+        self.stdout.write(f'{"URL name":<40} {"stage":<12} {"count":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+        for (url_name, stage), histogram in sorted(histograms.items()):
+            p50, p95, p99 = (percentile(histogram, fraction) * 1000 for fraction in (0.50, 0.95, 0.99))
+            self.stdout.write(
+                f'{url_name:<40} {stage:<12} {sum(histogram.values()):>9} {p50:>9.3f} {p95:>9.3f} {p99:>9.3f}'
+            )
+
+        if options['reset']:
+            rows.delete()
+            self.stdout.write(self.style.SUCCESS('Recorded timings deleted.'))
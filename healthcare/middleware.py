@@ -2,23 +2,114 @@
 Custom middleware for XSS and SQL injection protection.
 """
 
+import hashlib
+import logging
 import re
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
 from django.http import HttpResponse, QueryDict
+from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
-from healthcare.security import SecurityUtils
+from healthcare.audit import get_audit_writer
+from healthcare.security import SecurityUtils, get_rejection_cache
+from healthcare.timing import get_timing_recorder, timing_enabled
+from healthcare.upload_handlers import UploadScanHandler
 
+logger = logging.getLogger(__name__)
 
-class SecurityMiddleware(MiddlewareMixin):
+
+class InlineHooksMiddlewareMixin(MiddlewareMixin):
+    """
+    MiddlewareMixin whose hooks run directly on the event loop under ASGI.
+    
+    The stock mixin wraps process_request and process_response in
+    sync_to_async, a thread hop each per request. The hooks in this module
+    only do CPU work on request data the ASGI handler has already read, so in
+    an async chain they are called inline. A multipart body is the
+    exception: parsing it writes uploads to temporary files, so those
+    requests still run process_request in a thread.
+    
+    Under WSGI, or under ASGI while a sync-only middleware sits further in
+    (auditlog's, in the configured MIDDLEWARE), load_middleware runs the
+    chain sync and these classes behave exactly like MiddlewareMixin. With
+    the sync views this project has, that all-sync chain is also the faster
+    one; see ``manage.py benchmark_asgi_middleware``.
+    """
+    
+    def runs_inline(self, request):
+        return request.content_type != 'multipart/form-data'
+    
+    async def __acall__(self, request):
+        response = None
+        if hasattr(self, 'process_request'):
+            if self.runs_inline(request):
+                response = self.process_request(request)
+            else:
+                response = await sync_to_async(self.process_request, thread_sensitive=True)(request)
+        response = response or await self.get_response(request)
+        if hasattr(self, 'process_response'):
+            response = self.process_response(request, response)
+        return response
+
+
+class SecurityMiddleware(InlineHooksMiddlewareMixin):
     """
     Custom security middleware for XSS and SQL injection protection.
+    
+    Requests that were rejected recently are remembered by fingerprint (client
+    IP, method, path, query string, headers and, for urlencoded forms, the
+    body) so replays are rejected before any parsing or scanning. The body is
+    only hashed when the rest of the fingerprint matches a cached rejection.
+    With SECURITY_TIMING_ENABLED, each hit records the scan time it saved as
+    the 'cache_saved' stage.
     """
     
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.timing_enabled = timing_enabled()
+        self.rejection_cache = get_rejection_cache()
+    
     def process_request(self, request):
         """
         Process incoming requests for XSS and SQL injection detection.
         """
+        # Replays of a recently rejected request skip parsing and scanning
+        fingerprint = self._fingerprint(request)
+        saved = self.rejection_cache.lookup(fingerprint, lambda: self._body_digest(request))
+        if saved is not None:
+            if self.timing_enabled:
+                request.security_timings = {'cache_saved': saved}
+            return HttpResponse("Suspicious request detected", status=400)
+        
+        # Stream multipart uploads through the scanner before anything parses them
+        scanner = self._install_upload_scanner(request)
+        
+        # Per-stage durations, recorded against the URL name in process_response
+        timings = None
+        if self.timing_enabled:
+            timings = request.security_timings = {}
+        
         # Check for suspicious patterns in request data
-        if self._is_suspicious_request(request):
+        start = time.perf_counter()
+        match = self._is_suspicious_request(request, timings)
+        if match is None and scanner is not None:
+            match = scanner.match
+        if match:
+            source, name, (category, pattern) = match
+            logger.warning(
+                "Rejected suspicious request to %s: %s %r matched %s rule %r",
+                request.path, source, name, category, pattern
+            )
+            # Only cache verdicts the fingerprint fully determines
+            scan_seconds = time.perf_counter() - start
+            if source in ('GET', 'header'):
+                self._cache_rejection(fingerprint, scan_seconds)
+            elif source == 'POST':
+                body_digest = self._body_digest(request)
+                if body_digest is not None:
+                    self._cache_rejection(fingerprint, scan_seconds, body_digest)
             return HttpResponse("Suspicious request detected", status=400)
         
         return None
@@ -36,74 +127,223 @@ class SecurityMiddleware(MiddlewareMixin):
         # Frame Options
         response['X-Frame-Options'] = 'DENY'
         
+        timings = getattr(request, 'security_timings', None)
+        if timings:
+            resolver_match = getattr(request, 'resolver_match', None)
+            url_name = resolver_match.view_name if resolver_match else '<unresolved>'
+            get_timing_recorder().record(url_name, timings)
+        
         return response
     
-    def _is_suspicious_request(self, request):
+    def _fingerprint(self, request):
+        """
+        Return a digest of the request line and headers, including the
+        content type and length the header scan checks.
+        """
+        meta = request.META
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (meta.get('REMOTE_ADDR', ''), request.method, request.path, meta.get('QUERY_STRING', '')):
+            digest.update(part.encode('utf-8', 'surrogateescape'))
+            digest.update(b'\0')
+        for key, value in meta.items():
+            if (key.startswith('HTTP_') or key in ('CONTENT_TYPE', 'CONTENT_LENGTH')) and isinstance(value, str):
+                digest.update(f'{key}={value}\0'.encode('utf-8', 'surrogateescape'))
+        return digest.hexdigest()
+    
+    def _body_digest(self, request):
+        """
+        Return a digest of the body of a urlencoded POST within
+        DATA_UPLOAD_MAX_MEMORY_SIZE, which Django would read into memory
+        anyway, or None for any other request.
+        """
+        if request.method != 'POST' or request.content_type != 'application/x-www-form-urlencoded':
+            return None
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return None
+        limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        if limit is not None and length > limit:
+            return None
+        return hashlib.blake2b(request.body, digest_size=16).hexdigest()
+    
+    def _cache_rejection(self, fingerprint, scan_seconds, body_digest=None):
+        self.rejection_cache.add(fingerprint, scan_seconds, body_digest)
+        logger.info(
+            "Rejection cache: %(hits)d hits, %(misses)d misses, %(evictions)d evictions, "
+            "%(size)d entries, %(saved_seconds).3f s of scanning saved",
+            self.rejection_cache.stats()
+        )
+    
+    def _install_upload_scanner(self, request):
+        """
+        Route multipart file parts through UploadScanHandler into temporary files.
+        
+        File bodies are never held in memory or scanned; only part names are
+        checked, and text fields are scanned with the rest of request.POST.
+        """
+        if request.method != 'POST' or request.content_type != 'multipart/form-data':
+            return None
+        
+        scanner = UploadScanHandler(request)
+        request.upload_handlers = [scanner, TemporaryFileUploadHandler(request)]
+        return scanner
+    
+    def _is_suspicious_request(self, request, timings=None):
         """
         Check if the request contains XSS or SQL injection patterns.
+        
+        Returns a (source, name, rule) tuple describing the first match, or None.
+        When a ``timings`` dict is given, the seconds spent on each stage are
+        stored in it under 'get_scan', 'post_scan' and 'header_scan'.
         """
-        # Check GET parameters
-        for key, value in request.GET.items():
-            if SecurityUtils.is_suspicious_input(value):
-                return True
+        patterns = SecurityUtils.get_suspicious_patterns()
         
-        # Check POST parameters
+        # GET parameters, then POST parameters, then headers
+        sources = [('GET', 'get_scan', lambda: request.GET.items())]
         if request.method == 'POST':
-            for key, value in request.POST.items():
-                if SecurityUtils.is_suspicious_input(value):
-                    return True
+            sources.append(('POST', 'post_scan', lambda: request.POST.items()))
+        sources.append(('header', 'header_scan', lambda: request.headers.items()))
         
-        # Check headers
-        for key, value in request.headers.items():
-            if SecurityUtils.is_suspicious_input(value):
-                return True
+        for source, stage, items in sources:
+            start = time.perf_counter()
+            match = None
+            for key, value in items():
+                rule = patterns.search(value)
+                if rule:
+                    match = source, key, rule
+                    break
+            if timings is not None:
+                timings[stage] = time.perf_counter() - start
+            if match:
+                return match
         
-        return False
+        return None
 
 
-class InputSanitizationMiddleware(MiddlewareMixin):
+class SanitizedQueryDict(QueryDict):
+    """
+    Read-only QueryDict that sanitizes a key's values the first time they are read.
+    
+    Keys are sanitized up front (they are short and needed for lookups), values
+    are kept raw until accessed and then replaced by their sanitized form, so
+    fields the view never reads cost nothing. All values of multi-valued keys
+    are kept, and fields without a length in the policy are never sanitized.
+    """
+    
+    def __init__(self, query_string=None, mutable=False, encoding=None):
+        # Keys whose values have not been sanitized yet, mapped to their max length
+        self._pending = {}
+        # Total time spent sanitizing, including the key pass in wrap()
+        self.sanitize_seconds = 0.0
+        super().__init__(query_string, mutable=mutable, encoding=encoding)
+    
+    @classmethod
+    def wrap(cls, source, field_policy, default_max_length):
+        """Build a lazily sanitized copy of ``source`` without sanitizing any value."""
+        start = time.perf_counter()
+        result = cls(mutable=True, encoding=source.encoding)
+        for key, values in source.lists():
+            sanitized_key = SecurityUtils.sanitize_input(key, 100)
+            dict.setdefault(result, sanitized_key, []).extend(values)
+            max_length = field_policy.get(sanitized_key, default_max_length)
+            if max_length is not None:
+                result._pending[sanitized_key] = max_length
+        result._mutable = False
+        result.sanitize_seconds = time.perf_counter() - start
+        return result
+    
+    def _sanitize_key(self, key):
+        max_length = self._pending.pop(key, None)
+        if max_length is not None:
+            start = time.perf_counter()
+            values = dict.__getitem__(self, key)
+            dict.__setitem__(self, key, [SecurityUtils.sanitize_input(value, max_length) for value in values])
+            self.sanitize_seconds += time.perf_counter() - start
+    
+    def __getitem__(self, key):
+        if self._pending:
+            self._sanitize_key(key)
+        return super().__getitem__(key)
+    
+    def _getlist(self, key, default=None, force_list=False):
+        if self._pending:
+            self._sanitize_key(key)
+        return super()._getlist(key, default, force_list)
+    
+    def lists(self):
+        for key in self:
+            yield key, self._getlist(key)
+
+
+class InputSanitizationMiddleware(InlineHooksMiddlewareMixin):
     """
     Middleware to sanitize user input automatically.
+    
+    Values are sanitized lazily through SanitizedQueryDict. The per-field policy
+    maps a field name to its maximum length, or to None to leave it untouched;
+    ``INPUT_SANITIZATION_FIELD_POLICY`` in settings extends the defaults below.
     """
     
+    DEFAULT_MAX_LENGTH = 1000
+    
+    FIELD_POLICY = {
+        'csrfmiddlewaretoken': None,
+        'password': None,
+        'password1': None,
+        'password2': None,
+        'old_password': None,
+        'new_password1': None,
+        'new_password2': None,
+    }
+    
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.field_policy = {**self.FIELD_POLICY, **getattr(settings, 'INPUT_SANITIZATION_FIELD_POLICY', {})}
+    
     def process_request(self, request):
         """
         Sanitize user input in request data.
         """
         # Sanitize GET parameters
         if request.GET:
-            sanitized_get = {}
-            for key, value in request.GET.items():
-                sanitized_key = SecurityUtils.sanitize_input(key, 100)
-                sanitized_value = SecurityUtils.sanitize_input(value, 1000)
-                sanitized_get[sanitized_key] = sanitized_value
-            # Create a new QueryDict with sanitized data
-            request.GET = QueryDict('', mutable=True)
-            for key, value in sanitized_get.items():
-                request.GET[key] = value
-            request.GET._mutable = False
+            request.GET = SanitizedQueryDict.wrap(request.GET, self.field_policy, self.DEFAULT_MAX_LENGTH)
         
         # Sanitize POST parameters
         if request.method == 'POST' and request.POST:
-            sanitized_post = {}
-            for key, value in request.POST.items():
-                sanitized_key = SecurityUtils.sanitize_input(key, 100)
-                sanitized_value = SecurityUtils.sanitize_input(value, 1000)
-                sanitized_post[sanitized_key] = sanitized_value
-            # Create a new QueryDict with sanitized data
-            request.POST = QueryDict('', mutable=True)
-            for key, value in sanitized_post.items():
-                request.POST[key] = value
-            request.POST._mutable = False
+            request.POST = SanitizedQueryDict.wrap(request.POST, self.field_policy, self.DEFAULT_MAX_LENGTH)
         
         return None
+    
+    def process_response(self, request, response):
+        """
+        Report the time spent sanitizing, including values read lazily by the view.
+        """
+        timings = getattr(request, 'security_timings', None)
+        if timings is not None:
+            timings['sanitize'] = sum(
+                getattr(data, 'sanitize_seconds', 0.0) for data in (request.GET, getattr(request, '_post', None))
+            )
+        return response
 
 
-class AuditLogMiddleware(MiddlewareMixin):
+class AuditLogMiddleware(InlineHooksMiddlewareMixin):
     """
     Middleware to log security-relevant events.
+    
+    Authenticated requests under a sensitive path prefix are recorded as
+    AccessLog rows through the background AuditLogWriter, so the request
+    never waits on a database insert.
     """
     
+    SENSITIVE_PATHS = [
+        '/admin/', '/api/', '/users/', '/patients/', '/doctors/',
+        '/medical-records/', '/appointments/', '/prescriptions/'
+    ]
+    
+    # Anchored alternation of the prefixes, compiled once
+    SENSITIVE_PATH_PATTERN = re.compile('|'.join(re.escape(path) for path in SENSITIVE_PATHS))
+    
     def process_request(self, request):
         """
         Log suspicious requests and authentication attempts.
@@ -114,14 +354,26 @@ class AuditLogMiddleware(MiddlewareMixin):
             pass
         
         # Log access to sensitive URLs
-        sensitive_paths = [
-            '/admin/', '/api/', '/users/', '/patients/', '/doctors/',
-            '/medical-records/', '/appointments/', '/prescriptions/'
-        ]
-        
-        for path in sensitive_paths:
-            if path in request.path and request.user.is_authenticated:
-                # Log access to sensitive areas
-                pass
+        match = self.SENSITIVE_PATH_PATTERN.match(request.path)
+        if match and request.user.is_authenticated:
+            get_audit_writer().record(
+                user_id=request.user.pk,
+                area=match.group(),
+                path=request.path[:255],
+                method=request.method,
+                ip_address=request.META.get('REMOTE_ADDR') or None,
+                timestamp=timezone.now(),
+            )
         
-        return None 
\ No newline at end of file
+        return None
+    
+    def runs_inline(self, request):
+        # Only request.path and the user are read, never the body
+        return True
+    
+    async def __acall__(self, request):
+        # request.user loads through the sync ORM on first access, so resolve
+        # it asynchronously before process_request runs on the event loop
+        if self.SENSITIVE_PATH_PATTERN.match(request.path):
+            request.user = await request.auser()
+        return await super().__acall__(request)
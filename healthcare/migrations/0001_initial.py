@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('area', models.CharField(help_text='Sensitive path prefix that matched, e.g. /patients/', max_length=50)),
+                ('path', models.CharField(max_length=255)),
+                ('method', models.CharField(max_length=10)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField()),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='access_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['user', 'timestamp'], name='healthcare__user_id_ae2c22_idx'), models.Index(fields=['area', 'timestamp'], name='healthcare__area_ec5c6d_idx')],
+            },
+        ),
+    ]
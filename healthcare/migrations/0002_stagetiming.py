@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthcare', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StageTiming',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(max_length=200)),
+                ('stage', models.CharField(max_length=30)),
+                ('bucket', models.PositiveSmallIntegerField(help_text='Log-scale duration bucket, see healthcare.timing')),
+                ('count', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['url_name', 'stage', 'bucket'],
+                'unique_together': {('url_name', 'stage', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import models
+from users.models import User
+
+
+class AccessLog(models.Model):
+    """
+    One authenticated request to a sensitive area (patient data, records, admin).
+    Written in batches by healthcare.audit.AuditLogWriter, never on the request path.
+    """
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='access_logs')
+    area = models.CharField(max_length=50, help_text='Sensitive path prefix that matched, e.g. /patients/')
+    path = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['user', 'timestamp']),
+            models.Index(fields=['area', 'timestamp']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.method} {self.path} at {self.timestamp}"
+
+
+class StageTiming(models.Model):
+    """
+    One histogram bucket of security middleware stage durations for a URL name.
+    Merged from every worker by healthcare.timing.TimingRecorder.
+    """
+    url_name = models.CharField(max_length=200)
+    stage = models.CharField(max_length=30)
+    bucket = models.PositiveSmallIntegerField(help_text='Log-scale duration bucket, see healthcare.timing')
+    count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('url_name', 'stage', 'bucket')
+        ordering = ['url_name', 'stage', 'bucket']
+
+    def __str__(self):
+        return f"{self.url_name} {self.stage} bucket {self.bucket}: {self.count}"
@@ -4,11 +4,159 @@ Security utilities for XSS and SQL injection protection.
 
 import re
 import html
+import threading
+import time
 import unicodedata
-from typing import Optional
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from django.conf import settings
 from django.core.exceptions import ValidationError
 
 
+class SuspiciousPatternSet:
+    """
+    A set of case-insensitive substring rules, built once and reused for every scan.
+    
+    The rules are compiled into a single regular expression shaped like a trie
+    (shared prefixes are factored out), so a scan is one left-to-right pass over
+    a lowercased copy of the value whose cost does not grow with the number of
+    rules. ``search`` reports the (category, pattern) rule that matched so
+    rejections can be logged.
+    """
+    
+    def __init__(self, rules: Iterable[Tuple[str, str]]):
+        self.rules: Dict[str, Tuple[str, str]] = {}
+        for category, pattern in rules:
+            pattern = pattern.lower()
+            if pattern:
+                self.rules.setdefault(pattern, (category, pattern))
+        self._regex = re.compile(self._build_trie_pattern(self.rules)) if self.rules else None
+    
+    @classmethod
+    def from_patterns(cls, patterns: Dict[str, Iterable[str]]) -> 'SuspiciousPatternSet':
+        """Build a pattern set from a ``{category: [pattern, ...]}`` mapping."""
+        return cls((category, pattern) for category, items in patterns.items() for pattern in items)
+    
+    @staticmethod
+    def _build_trie_pattern(words: Iterable[str]) -> str:
+        """Return a regex source matching any of the words, with common prefixes merged."""
+        trie: dict = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        
+        def build(node: dict) -> str:
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            if len(branches) == 1 and '' not in node:
+                return branches[0]
+            # A word ending here makes the longer continuations optional
+            return '(?:' + '|'.join(branches) + ')' + ('?' if '' in node else '')
+        
+        return build(trie)
+    
+    def search(self, value: str) -> Optional[Tuple[str, str]]:
+        """Return the leftmost (category, pattern) rule found in the value, or None."""
+        if not value or self._regex is None:
+            return None
+        
+        match = self._regex.search(value.lower())
+        if match is None:
+            return None
+        return self.rules[match.group()]
+
+
+class RejectionCache:
+    """
+    Bounded LRU of fingerprints of recently rejected requests, with a TTL.
+    
+    Scanners replay the same hostile payloads; a fingerprint hit lets the
+    middleware reject the request again without parsing or scanning it.
+    Entries are keyed by a fingerprint of the request line and headers; when
+    the body decided the rejection, the entry also holds a digest of the body,
+    which is only computed for requests whose head matches. Each entry
+    remembers how long its original scan took, so ``stats`` can report the
+    scan time saved by hits.
+    """
+    
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+    
+    def __contains__(self, fingerprint: str) -> bool:
+        return self.lookup(fingerprint) is not None
+    
+    def lookup(self, fingerprint: str, body_digest: Callable[[], Optional[str]] = None) -> Optional[float]:
+        """
+        Return the scan time the original rejection took if ``fingerprint``
+        was rejected recently, else None. ``body_digest`` is called only when
+        the matching entry was rejected for its body.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None and entry[0] < now:
+                del self._entries[fingerprint]
+                entry = None
+        if entry is not None and entry[2] is not None and (body_digest is None or body_digest() != entry[2]):
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if fingerprint in self._entries:
+                self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            self.saved_seconds += entry[1]
+        return entry[1]
+    
+    def add(self, fingerprint: str, scan_seconds: float = 0.0, body_digest: Optional[str] = None):
+        """Remember a rejected fingerprint, evicting the least recently used one if full."""
+        with self._lock:
+            self._entries[fingerprint] = (time.monotonic() + self.ttl, scan_seconds, body_digest)
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters, the current size and the scan time saved so far."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'saved_seconds': self.saved_seconds,
+            }
+
+
+_rejection_cache: Optional[RejectionCache] = None
+_rejection_cache_lock = threading.Lock()
+
+
+def get_rejection_cache() -> RejectionCache:
+    """Return the process-wide rejection cache, creating it from settings on first use."""
+    global _rejection_cache
+    if _rejection_cache is None:
+        with _rejection_cache_lock:
+            if _rejection_cache is None:
+                _rejection_cache = RejectionCache(
+                    max_size=getattr(settings, 'SECURITY_REJECTION_CACHE_SIZE', 1024),
+                    ttl=getattr(settings, 'SECURITY_REJECTION_CACHE_TTL', 300),
+                )
+    return _rejection_cache
+
+
 class SecurityUtils:
     """Utility class for XSS and SQL injection protection."""
     
@@ -26,15 +174,67 @@ class SecurityUtils:
         'onkeydown', 'onkeyup', 'onkeypress', 'onabort', 'onbeforeunload'
     ]
     
+    # Dangerous URL protocols that should be removed
+    DANGEROUS_PROTOCOLS = ['javascript:', 'vbscript:', 'data:', 'mocha:', 'livescript:']
+    
+    # Substrings that mark input as suspicious, grouped by category
+    SUSPICIOUS_PATTERNS = {
+        'xss': [
+            '<script', '</script>', 'javascript:', 'vbscript:', 'data:',
+            'onload=', 'onclick=', 'onerror=', '<iframe', '<object',
+            'document.cookie', 'window.location', 'eval(', 'alert('
+        ],
+        'sql': [
+            'union select', 'drop table', 'insert into', 'delete from',
+            'update set', 'alter table', 'create table', 'exec(',
+            'execute(', 'union all', 'or 1=1', 'or 1=1--', 'admin\'--',
+            'select *', 'select count', 'select user', 'select database'
+        ],
+    }
+    
+    # Built lazily from settings by get_suspicious_patterns()
+    _suspicious_patterns: Optional[SuspiciousPatternSet] = None
+    
+    # Precompiled patterns, built once at import time. Each stage first runs a
+    # single combined detector; the per-entry passes (which must stay sequential
+    # because one removal can expose another match) only run when it hits.
+    _TAG_DETECTOR = re.compile('</?(?:' + '|'.join(DANGEROUS_TAGS) + ')', re.IGNORECASE)
+    _TAG_PATTERNS = [
+        (re.compile(f'<{tag}[^>]*>', re.IGNORECASE), re.compile(f'</{tag}>', re.IGNORECASE))
+        for tag in DANGEROUS_TAGS
+    ]
+    _ANY_TAG = re.compile(r'<[^>]*>')
+    
+    _ATTRIBUTE_DETECTOR = re.compile('(?:' + '|'.join(DANGEROUS_ATTRIBUTES) + r')\s*=', re.IGNORECASE)
+    _ATTRIBUTE_PATTERNS = [
+        (
+            re.compile(f'{attr}\\s*=\\s*["\'][^"\']*["\']', re.IGNORECASE),
+            re.compile(f'{attr}\\s*=\\s*[^\\s>]+', re.IGNORECASE),
+        )
+        for attr in DANGEROUS_ATTRIBUTES
+    ]
+    
+    # Anchored on the trailing ':' so the scan can skip ahead with a literal search
+    _PROTOCOL_DETECTOR = re.compile(
+        ':(?:' + '|'.join(f'(?<={re.escape(protocol)})' for protocol in DANGEROUS_PROTOCOLS) + ')',
+        re.IGNORECASE
+    )
+    _PROTOCOL_PATTERNS = [re.compile(re.escape(protocol), re.IGNORECASE) for protocol in DANGEROUS_PROTOCOLS]
+    
+    # str.translate table dropping null bytes and control characters except \n, \t and \r
+    _CONTROL_CHARACTERS = dict.fromkeys(code for code in range(32) if chr(code) not in '\n\t\r')
+    _CONTROL_DETECTOR = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+    
     @staticmethod
     def sanitize_input(value: str, max_length: Optional[int] = None) -> str:
         """Sanitize user input to prevent XSS attacks."""
         if not value:
             return ''
         
-        # Convert to string and normalize unicode
+        # Convert to string and normalize unicode (NFKC is a no-op on ASCII)
         value = str(value)
-        value = unicodedata.normalize('NFKC', value)
+        if not value.isascii():
+            value = unicodedata.normalize('NFKC', value)
         
         # Remove HTML tags
         value = SecurityUtils._remove_html_tags(value)
@@ -57,75 +257,71 @@ class SecurityUtils:
     @staticmethod
     def _remove_html_tags(value: str) -> str:
         """Remove all HTML tags from the input."""
+        if '<' not in value:
+            return value
+        
         # Remove dangerous tags completely
-        for tag in SecurityUtils.DANGEROUS_TAGS:
-            value = re.sub(f'<{tag}[^>]*>', '', value, flags=re.IGNORECASE)
-            value = re.sub(f'</{tag}>', '', value, flags=re.IGNORECASE)
+        if SecurityUtils._TAG_DETECTOR.search(value):
+            for open_tag, close_tag in SecurityUtils._TAG_PATTERNS:
+                value = open_tag.sub('', value)
+                value = close_tag.sub('', value)
         
         # Remove any remaining HTML tags
-        value = re.sub(r'<[^>]*>', '', value)
-        
-        return value
+        return SecurityUtils._ANY_TAG.sub('', value)
     
     @staticmethod
     def _remove_dangerous_attributes(value: str) -> str:
         """Remove dangerous HTML attributes from the input."""
-        for attr in SecurityUtils.DANGEROUS_ATTRIBUTES:
-            value = re.sub(f'{attr}\\s*=\\s*["\'][^"\']*["\']', '', value, flags=re.IGNORECASE)
-            value = re.sub(f'{attr}\\s*=\\s*[^\\s>]+', '', value, flags=re.IGNORECASE)
+        if '=' not in value or not SecurityUtils._ATTRIBUTE_DETECTOR.search(value):
+            return value
+        
+        for quoted, unquoted in SecurityUtils._ATTRIBUTE_PATTERNS:
+            value = quoted.sub('', value)
+            value = unquoted.sub('', value)
         
         return value
     
     @staticmethod
     def _remove_dangerous_protocols(value: str) -> str:
         """Remove dangerous protocols from URLs."""
-        dangerous_protocols = ['javascript:', 'vbscript:', 'data:', 'mocha:', 'livescript:']
-        for protocol in dangerous_protocols:
-            value = re.sub(protocol, '', value, flags=re.IGNORECASE)
+        if ':' not in value or not SecurityUtils._PROTOCOL_DETECTOR.search(value):
+            return value
+        
+        for protocol in SecurityUtils._PROTOCOL_PATTERNS:
+            value = protocol.sub('', value)
         
         return value
     
     @staticmethod
     def _remove_control_characters(value: str) -> str:
         """Remove null bytes and control characters."""
-        value = value.replace('\x00', '')
-        value = ''.join(char for char in value if ord(char) >= 32 or char in '\n\t\r')
-        return value
+        if value.isprintable() or not SecurityUtils._CONTROL_DETECTOR.search(value):
+            return value
+        return value.translate(SecurityUtils._CONTROL_CHARACTERS)
+    
+    @staticmethod
+    def get_suspicious_patterns() -> SuspiciousPatternSet:
+        """
+        Return the process-wide suspicious pattern set.
+        
+        Built on first use from ``SECURITY_SUSPICIOUS_PATTERNS`` (a
+        ``{category: [pattern, ...]}`` mapping) when set, otherwise from
+        ``SUSPICIOUS_PATTERNS``.
+        """
+        if SecurityUtils._suspicious_patterns is None:
+            patterns = getattr(settings, 'SECURITY_SUSPICIOUS_PATTERNS', None) or SecurityUtils.SUSPICIOUS_PATTERNS
+            SecurityUtils._suspicious_patterns = SuspiciousPatternSet.from_patterns(patterns)
+        return SecurityUtils._suspicious_patterns
+    
+    @staticmethod
+    def find_suspicious_pattern(value: str) -> Optional[Tuple[str, str]]:
+        """Return the (category, pattern) rule matched by the input, or None."""
+        return SecurityUtils.get_suspicious_patterns().search(value)
     
     @staticmethod
     def is_suspicious_input(value: str) -> bool:
         """Check if input contains XSS or SQL injection patterns."""
-        if not value:
-            return False
-        
-        value_lower = value.lower()
-        
-        # XSS patterns
-        xss_patterns = [
-            '<script', '</script>', 'javascript:', 'vbscript:', 'data:',
-            'onload=', 'onclick=', 'onerror=', '<iframe', '<object',
-            'document.cookie', 'window.location', 'eval(', 'alert('
-        ]
-        
-        # SQL injection patterns
-        sql_patterns = [
-            'union select', 'drop table', 'insert into', 'delete from',
-            'update set', 'alter table', 'create table', 'exec(',
-            'execute(', 'union all', 'or 1=1', 'or 1=1--', 'admin\'--',
-            'select *', 'select count', 'select user', 'select database'
-        ]
-        
-        # Check for XSS patterns
-        for pattern in xss_patterns:
-            if pattern in value_lower:
-                return True
-        
-        # Check for SQL injection patterns
-        for pattern in sql_patterns:
-            if pattern in value_lower:
-                return True
-        
-        return False
+        return SecurityUtils.find_suspicious_pattern(value) is not None
 
 
 class SecurityValidator:
@@ -71,6 +71,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'healthcare.middleware.SecurityMiddleware',  # XSS and SQL injection protection
     'healthcare.middleware.InputSanitizationMiddleware',  # Input sanitization
+    'healthcare.middleware.AuditLogMiddleware',  # Sensitive-area access log
     'axes.middleware.AxesMiddleware',  # Temporarily disabled for debugging
     'auditlog.middleware.AuditlogMiddleware',  # django-auditlog middleware
 ]
@@ -172,6 +173,72 @@ SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
+# Suspicious input rules used by healthcare.middleware.SecurityMiddleware, as a
+# {category: [substring, ...]} mapping. Defaults to SecurityUtils.SUSPICIOUS_PATTERNS.
+# SECURITY_SUSPICIOUS_PATTERNS = {'xss': ['<script', ...], 'sql': ['union select', ...]}
+
+# Fingerprints of recently rejected requests kept by SecurityMiddleware so
+# replayed payloads are refused without rescanning (entries, seconds). The
+# cache counters are logged by healthcare.middleware with every new rejection,
+# and hits show up as the 'cache_saved' stage in security_timings.
+SECURITY_REJECTION_CACHE_SIZE = 1024
+SECURITY_REJECTION_CACHE_TTL = 300
+
+# Opt-in per-stage timing of the security middleware (GET/POST/header scans and
+# sanitization), merged into healthcare.StageTiming every flush interval (seconds).
+# Read the percentiles with: python manage.py security_timings
+SECURITY_TIMING_ENABLED = env.bool('SECURITY_TIMING_ENABLED', default=False)
+SECURITY_TIMING_FLUSH_INTERVAL = 60
+
+# Bounded LRU cache for the safe_output / sanitize_html template filters: number
+# of cached results per filter, and the longest input that is cached. Each
+# filter logs its hit/miss counters (logger healthcare.templatetags.security_filters)
+# every SECURITY_FILTER_CACHE_LOG_EVERY misses; 0 turns that off
+SECURITY_FILTER_CACHE_SIZE = 4096
+SECURITY_FILTER_CACHE_MAX_VALUE_LENGTH = 1024
+SECURITY_FILTER_CACHE_LOG_EVERY = 1000
+
+# Background writer for healthcare.AccessLog: bounded queue size, rows per
+# bulk_create, and the longest time (seconds) an event waits before a flush
+AUDIT_LOG_QUEUE_SIZE = 10000
+AUDIT_LOG_BATCH_SIZE = 200
+AUDIT_LOG_FLUSH_INTERVAL = 1.0
+
+# Length of a bookable appointment slot, in minutes
+APPOINTMENT_SLOT_MINUTES = 30
+
+# Longest date range the bulk availability endpoint will compute, in days
+AVAILABILITY_MAX_DAYS = 90
+
+# Availability, time off and facility closures are read from this cache, and
+# the signal handlers in doctors.signals invalidate it on every write. Set
+# CACHE_URL (e.g. redis://127.0.0.1:6379/1) to share it between workers. The
+# fallback local-memory cache only sees invalidations made by its own process,
+# so its entries are kept for a minute at most; bookings are still checked
+# against the slot calendar in the database. The stock 300-entry limit is too
+# small for one entry per doctor-day.
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://?MAX_ENTRIES=100000'),
+}
+PROCESS_LOCAL_CACHE = CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache'
+
+# Per-doctor-day slot cache: cache alias, entry lifetime (seconds) as a bound
+# on changes made without signals or in other workers, and how many days
+# ahead are cached. Hit/miss counters: `manage.py slot_cache_stats`
+SLOT_CACHE_ALIAS = 'default'
+SLOT_CACHE_TIMEOUT = 60 if PROCESS_LOCAL_CACHE else 3600
+SLOT_CACHE_HORIZON_DAYS = 90
+
+# Per-doctor time-off interval index, kept in the slot cache's backend
+TIME_OFF_INDEX_TIMEOUT = SLOT_CACHE_TIMEOUT
+
+# Facility closure calendar (public holidays), cached as a whole under one key
+FACILITY_CLOSURE_CACHE_TIMEOUT = SLOT_CACHE_TIMEOUT
+
+# Days ahead covered by the materialized slot calendar (matches the booking
+# form's 90-day limit); rolled forward nightly by `manage.py roll_slot_calendar`
+SLOT_CALENDAR_DAYS = 90
+
 # django-axes configuration
 AUTHENTICATION_BACKENDS = [
     'axes.backends.AxesBackend',
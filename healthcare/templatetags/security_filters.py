@@ -2,14 +2,83 @@
 Template filters for XSS and SQL injection protection.
 """
 
+import itertools
+import logging
 import re
+from functools import lru_cache
 from django import template
+from django.conf import settings
 from django.utils.safestring import mark_safe
 from django.utils.html import escape
 from healthcare.security import SecurityUtils
 
 register = template.Library()
 
+logger = logging.getLogger(__name__)
+
+# Process-wide memoization of the sanitizing filters. List pages render the
+# same names and short strings many times, so results are kept in a bounded
+# LRU cache keyed on the input string. Values longer than the length limit
+# are rarely repeated and are always computed directly. The counters are
+# per process, so each filter logs them every FILTER_CACHE_LOG_EVERY misses;
+# hits are never slowed down by the counting.
+FILTER_CACHE_SIZE = getattr(settings, 'SECURITY_FILTER_CACHE_SIZE', 4096)
+FILTER_CACHE_MAX_VALUE_LENGTH = getattr(settings, 'SECURITY_FILTER_CACHE_MAX_VALUE_LENGTH', 1024)
+FILTER_CACHE_LOG_EVERY = getattr(settings, 'SECURITY_FILTER_CACHE_LOG_EVERY', 1000)
+
+
+def _memoized(func):
+    """Wrap a str -> str filter body with the bounded LRU cache."""
+    name = func.__name__.lstrip('_')
+    misses = itertools.count(1)
+
+    def miss(value_str):
+        # Only called by the LRU cache on a miss
+        if FILTER_CACHE_LOG_EVERY and next(misses) % FILTER_CACHE_LOG_EVERY == 0:
+            stats = _cache_stats(cached)
+            logger.info(
+                "Filter cache %(name)s: %(hits)d hits, %(misses)d misses, %(size)d of %(max_size)d entries, "
+                "%(hit_rate).1f%% hit rate",
+                dict(stats, name=name, hit_rate=stats['hit_rate'] * 100)
+            )
+        return func(value_str)
+
+    cached = lru_cache(maxsize=FILTER_CACHE_SIZE)(miss)
+    
+    def wrapper(value_str):
+        if len(value_str) > FILTER_CACHE_MAX_VALUE_LENGTH:
+            return func(value_str)
+        return cached(value_str)
+    
+    wrapper.cache = cached
+    return wrapper
+
+
+def _cache_stats(cached):
+    info = cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'max_size': info.maxsize,
+        'hit_rate': info.hits / lookups if lookups else 0.0,
+    }
+
+
+def filter_cache_stats():
+    """Return hit/miss counters and hit rate for each memoized filter in this process."""
+    return {
+        name: _cache_stats(func.cache)
+        for name, func in (('safe_output', _safe_output), ('sanitize_html', _sanitize_html))
+    }
+
+
+def filter_cache_clear():
+    """Empty the filter caches and reset their counters."""
+    _safe_output.cache.cache_clear()
+    _sanitize_html.cache.cache_clear()
+
 
 @register.filter
 def safe_output(value):
@@ -20,8 +89,13 @@ def safe_output(value):
     if value is None:
         return ''
     
+    return _safe_output(str(value))
+
+
+@_memoized
+def _safe_output(value_str):
     # First sanitize the input
-    sanitized = SecurityUtils.sanitize_input(str(value))
+    sanitized = SecurityUtils.sanitize_input(value_str)
     
     # Then escape any remaining HTML
     return escape(sanitized)
@@ -36,8 +110,11 @@ def sanitize_html(value):
     if value is None:
         return ''
     
-    value_str = str(value)
-    
+    return _sanitize_html(str(value))
+
+
+@_memoized
+def _sanitize_html(value_str):
     # Remove dangerous HTML tags
     dangerous_tags = [
         'script', 'iframe', 'object', 'embed', 'form', 'input', 'textarea',
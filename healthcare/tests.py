@@ -0,0 +1,208 @@
+import random
+import re
+import threading
+import unicodedata
+from unittest import mock
+
+from django.contrib import admin
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TransactionTestCase
+from django.utils import timezone
+
+from healthcare.admin import AccessLogAdmin
+from healthcare.audit import AuditLogWriter
+from healthcare.middleware import SecurityMiddleware
+from healthcare.models import AccessLog
+from healthcare.security import SecurityUtils
+from healthcare.templatetags import security_filters
+from healthcare.templatetags.security_filters import filter_cache_clear, filter_cache_stats, safe_output
+
+
+def reference_sanitize_input(value, max_length=None):
+    """
+    The original multi-pass sanitizer, kept verbatim as the oracle that
+    SecurityUtils.sanitize_input must agree with (also timed by
+    ``manage.py benchmark_sanitizer``).
+    """
+    if not value:
+        return ''
+
+    value = str(value)
+    value = unicodedata.normalize('NFKC', value)
+
+    for tag in SecurityUtils.DANGEROUS_TAGS:
+        value = re.sub(f'<{tag}[^>]*>', '', value, flags=re.IGNORECASE)
+        value = re.sub(f'</{tag}>', '', value, flags=re.IGNORECASE)
+    value = re.sub(r'<[^>]*>', '', value)
+
+    for attr in SecurityUtils.DANGEROUS_ATTRIBUTES:
+        value = re.sub(f'{attr}\\s*=\\s*["\'][^"\']*["\']', '', value, flags=re.IGNORECASE)
+        value = re.sub(f'{attr}\\s*=\\s*[^\\s>]+', '', value, flags=re.IGNORECASE)
+
+    for protocol in ['javascript:', 'vbscript:', 'data:', 'mocha:', 'livescript:']:
+        value = re.sub(protocol, '', value, flags=re.IGNORECASE)
+
+    value = value.replace('\x00', '')
+    value = ''.join(char for char in value if ord(char) >= 32 or char in '\n\t\r')
+
+    if max_length and len(value) > max_length:
+        value = value[:max_length]
+
+    return value.strip()
+
+
+# Building blocks for the fuzzed differential corpus. Mixing them at random
+# produces nested and split tags (e.g. "<scr<iframe>ipt>") that exercise the
+# cascading behaviour of the sequential passes.
+FRAGMENTS = [
+    '<', '>', '</', '/>', '=', '"', "'", ' ', '\n', '\t', '\x00', '\x07', '\x1f', '\x7f',
+    'script', 'SCRIPT', 'ScRiPt', 'iframe', 'style', 'title', 'b', 'div', 'img src=x',
+    'onload', 'onerror', 'OnClick', 'onmouseover', 'alert(1)', 'javascript:', 'JaVaScRiPt:',
+    'java', 'script:', 'data:', 'vbscript:', 'mocha:', 'livescript:', 'da', 'ta:',
+    'John', 'Smith', 'Blood pressure 120/80', 'mg', '5 < 7', 'a > b',
+    'é', 'ﬁ', 'Ａ', '①', 'ſcript', '\u212a', '😀', '\u00a0', '\u3000',
+]
+
+REALISTIC_VALUES = [
+    'John Smith',
+    'jane.doe@example.com',
+    'Patient reports mild headache for 3 days; BP 120/80, HR 72.',
+    'Amoxicillin 500 mg, take 1 capsule 3 times daily for 7 days.',
+    'Hemoglobin: 13.5 g/dL (ref 12.0-15.5)\nWBC: 6.2 x10^9/L\nPlatelets: 250 x10^9/L',
+    'José Álvarez-Núñez',
+    '<script>alert(document.cookie)</script>',
+    '<img src=x onerror=alert(1)>',
+    '<a href="javascript:alert(1)">click</a>',
+    "' OR 1=1-- ",
+]
+
+
+class SanitizeInputDifferentialTests(SimpleTestCase):
+    """SecurityUtils.sanitize_input agrees with the reference sanitizer on realistic and fuzzed input."""
+
+    CASES = 5000
+    SEED = 1234
+
+    def assertAgrees(self, cases):
+        mismatches = []
+        for case in cases:
+            for max_length in (None, 20):
+                expected = reference_sanitize_input(case, max_length)
+                actual = SecurityUtils.sanitize_input(case, max_length)
+                if expected != actual:
+                    mismatches.append((case, max_length, expected, actual))
+        self.assertEqual(mismatches[:5], [], f'{len(mismatches)} mismatches (case, max_length, expected, actual)')
+
+    def test_realistic_values(self):
+        self.assertAgrees(REALISTIC_VALUES)
+
+    def test_fuzzed_values(self):
+        rng = random.Random(self.SEED)
+        self.assertAgrees([
+            ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 30)))
+            for _ in range(self.CASES)
+        ])
+
+
+class InlineHooksMiddlewareTests(SimpleTestCase):
+    """Under an async chain the healthcare middleware run their hooks on the event loop."""
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+
+    def middleware(self):
+        async def get_response(request):
+            return HttpResponse('ok')
+
+        middleware = SecurityMiddleware(get_response)
+        threads = []
+        process_request = middleware.process_request
+
+        def recording_process_request(request):
+            threads.append(threading.get_ident())
+            return process_request(request)
+
+        middleware.process_request = recording_process_request
+        return middleware, threads
+
+    async def test_hooks_run_inline(self):
+        middleware, threads = self.middleware()
+        request = self.factory.post('/', 'name=John+Smith', content_type='application/x-www-form-urlencoded')
+        response = await middleware(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        self.assertEqual(threads, [threading.get_ident()])
+
+    async def test_multipart_parsed_in_a_thread(self):
+        middleware, threads = self.middleware()
+        await middleware(self.factory.post('/', {'name': 'John Smith'}))
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+
+    async def test_suspicious_request_rejected(self):
+        middleware, _ = self.middleware()
+        response = await middleware(self.factory.get('/', {'q': '<script>alert(1)</script>'}))
+        self.assertEqual(response.status_code, 400)
+
+
+class AuditLogWriterTests(TransactionTestCase):
+    """The writer drops and counts events when its queue is full, and writes the rest on stop."""
+
+    def event(self, index):
+        return {'area': '/patients/', 'path': f'/patients/{index}/', 'method': 'GET', 'timestamp': timezone.now()}
+
+    def test_full_queue_drops_and_counts(self):
+        writer = AuditLogWriter(max_queue_size=2)
+        # Keep the background thread from draining the queue
+        with mock.patch.object(writer, '_ensure_started'):
+            results = [writer.record(**self.event(index)) for index in range(5)]
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertEqual(writer.stats(), {'enqueued': 2, 'written': 0, 'dropped': 3, 'failed': 0, 'queued': 2})
+        writer.stop()
+        self.assertEqual(AccessLog.objects.count(), 2)
+
+    def test_stop_flushes_queued_events(self):
+        writer = AuditLogWriter(batch_size=10)
+        with mock.patch.object(writer, '_ensure_started'):
+            for index in range(25):
+                writer.record(**self.event(index))
+        writer.stop()
+        self.assertEqual(writer.stats()['written'], 25)
+        self.assertEqual(writer.stats()['queued'], 0)
+        self.assertEqual(AccessLog.objects.count(), 25)
+
+    def test_stop_after_background_writes(self):
+        writer = AuditLogWriter(batch_size=10, flush_interval=0.05)
+        for index in range(25):
+            writer.record(**self.event(index))
+        writer.stop()
+        self.assertEqual(writer.stats(), {'enqueued': 25, 'written': 25, 'dropped': 0, 'failed': 0, 'queued': 0})
+        self.assertEqual(AccessLog.objects.count(), 25)
+
+
+class AccessLogAdminTests(SimpleTestCase):
+    """Access logs are append-only in the admin."""
+
+    def test_read_only(self):
+        model_admin = AccessLogAdmin(AccessLog, admin.site)
+        request = RequestFactory().get('/admin/')
+        self.assertFalse(model_admin.has_add_permission(request))
+        self.assertFalse(model_admin.has_change_permission(request))
+        self.assertFalse(model_admin.has_delete_permission(request))
+
+
+class FilterCacheLoggingTests(SimpleTestCase):
+    """The template filter caches log their per-process counters every few misses."""
+
+    def setUp(self):
+        filter_cache_clear()
+        self.addCleanup(filter_cache_clear)
+
+    def test_counters_logged_every_n_misses(self):
+        with mock.patch.object(security_filters, 'FILTER_CACHE_LOG_EVERY', 3), \
+                self.assertLogs(security_filters.logger, 'INFO') as logs:
+            for value in ('Alice', 'Alice', 'Bob', 'Carol', 'Dave', 'Eve', 'Frank'):
+                safe_output(value)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('Filter cache safe_output: 1 hits, 3 misses', logs.output[0])
+        self.assertEqual(filter_cache_stats()['safe_output']['misses'], 6)
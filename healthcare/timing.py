@@ -0,0 +1,143 @@
+"""
+Opt-in per-stage timing of the security middleware pipeline.
+
+Enabled with SECURITY_TIMING_ENABLED. Durations are bucketed into per-process
+log-scale histograms keyed by (URL name, stage) and merged into the
+StageTiming table by a background thread, so every worker contributes to the
+percentiles printed by the ``security_timings`` management command.
+"""
+
+import atexit
+import logging
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# Four buckets per power of two: bucket b covers [2**(b/4), 2**((b+1)/4)) microseconds
+BUCKETS_PER_OCTAVE = 4
+
+
+def bucket_for(seconds: float) -> int:
+    """Return the histogram bucket for a duration."""
+    microseconds = seconds * 1_000_000
+    if microseconds < 1:
+        return 0
+    return int(math.log2(microseconds) * BUCKETS_PER_OCTAVE)
+
+
+def bucket_upper_bound(bucket: int) -> float:
+    """Return the upper bound of a bucket, in seconds."""
+    return 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE) / 1_000_000
+
+
+def percentile(histogram: Dict[int, int], fraction: float) -> Optional[float]:
+    """Return the upper bound (seconds) of the bucket holding the given percentile."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return bucket_upper_bound(bucket)
+    return bucket_upper_bound(max(histogram))
+
+
+class TimingRecorder:
+    """
+    Process-wide histograms of stage durations, flushed to the database periodically.
+    """
+
+    def __init__(self, flush_interval: float = 60.0):
+        self.flush_interval = flush_interval
+        self._histograms: Dict[Tuple[str, str], Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def record(self, url_name: str, timings: Dict[str, float]):
+        """Add one request's stage durations (seconds) to the histograms."""
+        self._ensure_started()
+        with self._lock:
+            for stage, seconds in timings.items():
+                self._histograms[(url_name, stage)][bucket_for(seconds)] += 1
+
+    def flush(self):
+        """Merge the pending histograms into the StageTiming table."""
+        from healthcare.models import StageTiming
+
+        with self._lock:
+            pending, self._histograms = self._histograms, defaultdict(lambda: defaultdict(int))
+        rows = [
+            (url_name, stage, bucket, count)
+            for (url_name, stage), histogram in pending.items()
+            for bucket, count in histogram.items()
+        ]
+        if not rows:
+            return
+
+        close_old_connections()
+        try:
+            with transaction.atomic():
+                StageTiming.objects.bulk_create(
+                    [StageTiming(url_name=url_name, stage=stage, bucket=bucket, count=0)
+                     for url_name, stage, bucket, _ in rows],
+                    ignore_conflicts=True,
+                )
+                for url_name, stage, bucket, count in rows:
+                    StageTiming.objects.filter(url_name=url_name, stage=stage, bucket=bucket).update(
+                        count=F('count') + count
+                    )
+        except Exception:
+            logger.exception("Failed to flush %d security timing buckets", len(rows))
+
+    def stop(self):
+        self._stopping.set()
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='security-timing-flush', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+
+def load_histograms(rows: Iterable[Tuple[str, str, int, int]]) -> Dict[Tuple[str, str], Dict[int, int]]:
+    """Group (url_name, stage, bucket, count) rows into histograms."""
+    histograms: Dict[Tuple[str, str], Dict[int, int]] = defaultdict(dict)
+    for url_name, stage, bucket, count in rows:
+        histograms[(url_name, stage)][bucket] = count
+    return histograms
+
+
+_recorder: Optional[TimingRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def timing_enabled() -> bool:
+    return getattr(settings, 'SECURITY_TIMING_ENABLED', False)
+
+
+def get_timing_recorder() -> TimingRecorder:
+    """Return the process-wide recorder, creating it from settings on first use."""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = TimingRecorder(getattr(settings, 'SECURITY_TIMING_FLUSH_INTERVAL', 60.0))
+    return _recorder
@@ -0,0 +1,37 @@
+"""
+Streaming upload handlers used by the security middleware.
+"""
+
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from healthcare.security import SecurityUtils
+
+
+class UploadScanHandler(FileUploadHandler):
+    """
+    Scan multipart file parts as they stream in, without buffering them.
+
+    Only the part headers (field and file names) are inspected; file bodies
+    are handed unchanged to the next handler, normally
+    TemporaryFileUploadHandler, so they go straight to temporary storage. A
+    suspicious name stops the upload before the rest of the body is written
+    and is recorded in ``match`` as a (source, name, rule) tuple.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.match = None
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        patterns = SecurityUtils.get_suspicious_patterns()
+        for source, name in (('FILES', field_name), ('file name', file_name)):
+            rule = patterns.search(name)
+            if rule:
+                self.match = (source, name, rule)
+                raise StopUpload(connection_reset=False)
+
+    def receive_data_chunk(self, raw_data, start):
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None